@@ -0,0 +1,109 @@
+# benchmarks/bench_docx.py
+"""
+Per-document cost of services/formatter's DOCX output over a synthetic corpus: python-docx
+Document() per resume (the old behaviour) vs the prototype builder vs build_resumes() batches.
+Reports time per document and peak traced memory per document.
+
+    cd backend-ai && python benchmarks/bench_docx.py [-n 200] [--seed 7]
+"""
+import os, sys, time, random, asyncio, argparse, tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from docx import Document
+
+from services import formatter
+from services.docx_builder import get_prototype
+
+SKILLS = ["Python", "FastAPI", "React", "PostgreSQL", "Docker", "Kubernetes", "Git", "Agile", "Go",
+          "TypeScript", "Redis", "AWS", "Terraform", "GraphQL", "Java", "Spring", "Kafka", "Excel"]
+WORDS = ("built designed migrated scaled owned service pipeline api latency cost team users "
+         "dashboard cache queue cluster rollout tests coverage incidents").split()
+
+
+def make_corpus(n: int, seed: int) -> list:
+    rnd = random.Random(seed)
+    line = lambda k: " ".join(rnd.choice(WORDS) for _ in range(k)).capitalize()
+    corpus = []
+    for i in range(n):
+        corpus.append({
+            "name": f"Candidate {i}", "email": f"c{i}@example.com", "phone": "+1 555 010 0000",
+            "linkedin": f"linkedin.com/in/c{i}", "location": "Remote",
+            "summary": line(30),
+            "skills": rnd.sample(SKILLS, rnd.randint(5, 12)),
+            "experience": [{"title": line(2), "company": f"Company {j}", "dates": "2019 - 2022",
+                            "bullets": [line(14) for _ in range(rnd.randint(3, 6))]}
+                           for j in range(rnd.randint(1, 5))],
+            "education": [{"degree": "B.Tech CSE", "school": "State University", "dates": "2015 - 2019",
+                           "details": [line(6)]}],
+            "projects": [{"name": line(2), "dates": "2021", "description": line(10),
+                          "bullets": [line(10) for _ in range(2)]} for _ in range(rnd.randint(0, 3))],
+            "achievements": [line(8) for _ in range(rnd.randint(0, 3))],
+        })
+    return corpus
+
+
+def _python_docx(resume: dict) -> bytes:
+    doc = Document()
+    formatter._compose(doc, resume)
+    bio = BytesIO()
+    doc.save(bio)
+    return bio.getvalue()
+
+def _prototype(resume: dict) -> bytes:
+    return formatter.render_docx(resume, {})
+
+
+def _time(fn, corpus: list) -> float:
+    fn(corpus[0])   # warm-up: imports, template load, style resolution
+    start = time.perf_counter()
+    for resume in corpus:
+        fn(resume)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+def _time_batch(corpus: list) -> float:
+    pairs = [(r, {}) for r in corpus]
+    asyncio.run(formatter.build_resumes(pairs[:1]))
+    start = time.perf_counter()
+    asyncio.run(formatter.build_resumes(pairs))
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+def _peak_kib(fn, corpus: list, samples: int = 20) -> float:
+    fn(corpus[0])
+    peaks = []
+    tracemalloc.start()
+    for resume in corpus[:samples]:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn(resume)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", "--documents", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    corpus = make_corpus(args.documents, args.seed)
+    get_prototype()
+    sizes = [len(_prototype(r)) for r in corpus[:20]]
+
+    rows = [
+        ("python-docx Document() per resume (before)", _time(_python_docx, corpus), _peak_kib(_python_docx, corpus)),
+        ("prototype builder", _time(_prototype, corpus), _peak_kib(_prototype, corpus)),
+        ("build_resumes() batch", _time_batch(corpus), None),
+    ]
+    base = rows[0][1]
+    print(f"{args.documents} synthetic resumes, avg output {sum(sizes) / len(sizes) / 1024:.0f} KiB\n")
+    print(f"{'variant':<44} {'us/doc':>10} {'speedup':>8} {'peak KiB/doc':>13}")
+    for name, us, kib in rows:
+        peak = f"{kib:>13.0f}" if kib is not None else f"{'-':>13}"
+        print(f"{name:<44} {us:>10.1f} {base / us:>7.1f}x {peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_render.py
+"""
+Per-render cost of resume_modern.tex.j2: a fresh Jinja environment per render (the old
+behaviour) vs the shared environment vs a rendered-TeX cache hit.
+
+    cd backend-ai && python benchmarks/bench_render.py [-n 500]
+"""
+import os, sys, time, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from services import latex_renderer
+from services.formatter_overleaf_modern import build_context
+
+TEMPLATE = "resume_modern.tex.j2"
+
+RESUME = {
+    "name": "Jane Doe", "email": "jane@example.com", "phone": "+1 555 123 4567",
+    "linkedin": "linkedin.com/in/janedoe", "github": "github.com/janedoe",
+    "skills": ["Python", "FastAPI", "React", "PostgreSQL", "Docker", "Kubernetes", "Git", "Agile", "Go"],
+    "experience": [
+        {"title": f"Engineer {i}", "company": f"Company {i}", "dates": "2019 - 2022",
+         "bullets": [f"Built Python service {j} on Kubernetes handling 10k rps" for j in range(5)]}
+        for i in range(4)
+    ],
+    "education": [{"school": "State University", "degree": "B.Tech CSE", "dates": "Aug2015 - May2019",
+                   "details": ["C G P A : 8 . 6 / 1 0"]}],
+    "projects": [{"name": f"Project {i}", "dates": "2021", "bullets": ["Did a thing", "Did another"]} for i in range(3)],
+    "certifications": [{"name": "AWS SAA", "authority": "AWS", "date": "2022"}],
+}
+JD = {"title": "Backend Engineer", "skills_required": ["python", "kubernetes", "postgresql", "react"]}
+
+
+def _old_render(context: dict) -> bytes:
+    env = Environment(
+        loader=FileSystemLoader(latex_renderer.TEMPLATE_DIR),
+        autoescape=select_autoescape(enabled_extensions=(), default_for_string=False),
+        trim_blocks=True, lstrip_blocks=True,
+    )
+    return env.get_template(TEMPLATE).render(**context).encode("utf-8")
+
+def _shared_env_render(context: dict) -> bytes:
+    return latex_renderer.get_env().get_template(TEMPLATE).render(**context).encode("utf-8")
+
+def _cached_render(context: dict) -> bytes:
+    return latex_renderer._render_template(TEMPLATE, context)
+
+
+def _time(fn, context: dict, n: int) -> float:
+    fn(context)   # warm-up
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(context)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", "--iterations", type=int, default=500)
+    args = ap.parse_args()
+
+    context = build_context(RESUME, JD)
+    assert _old_render(context) == _shared_env_render(context) == _cached_render(context)
+
+    rows = [
+        ("fresh Environment per render (before)", _time(_old_render, context, args.iterations)),
+        ("shared Environment + bytecode cache", _time(_shared_env_render, context, args.iterations)),
+        ("rendered-TeX cache hit", _time(_cached_render, context, args.iterations)),
+    ]
+    base = rows[0][1]
+    print(f"{'variant':<40} {'us/render':>10} {'speedup':>8}")
+    for name, us in rows:
+        print(f"{name:<40} {us:>10.1f} {base / us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# benchmarks/corpus.py
+"""
+Deterministic synthetic resumes and JDs for the benchmarks.
+
+Every sample is a ground-truth resume dict rendered to text lines and written as a PDF or a
+DOCX, in three lengths (short: 1 page, medium: 2-3 pages, long: past PDF_PARALLEL_MIN_PAGES).
+Some samples carry the broken-extraction artefacts clean_extracted_text exists for, each with
+the string a correct cleanup must produce:
+  spaced_cgpa   "C G P A : 8 . 6 / 1 0"          -> "CGPA: 8.6/10"
+  vertical      a heading one character per line -> "SKILLS"
+  split_phone   "8 0 7 4 1 5 8 9 8 5"            -> "8074158985"
+  spaced_date   "A u g 2 0 2 0"                  -> "Aug 2020"
+
+Same seed, same bytes: PDFs are written by hand and DOCX zips get fixed timestamps, so
+corpus_digest() identifies the corpus a result file was measured on.
+
+    cd backend-ai && python -m benchmarks.corpus --out /tmp/corpus [-n 60] [--seed 7]
+"""
+import os, io, json, random, hashlib, zipfile, argparse, datetime
+from typing import List
+
+SKILLS = ["Python", "FastAPI", "React", "PostgreSQL", "Docker", "Kubernetes", "Git", "Agile", "Go",
+          "TypeScript", "Redis", "AWS", "Terraform", "GraphQL", "Java", "Spring", "Kafka", "Excel",
+          "Node.js", "MongoDB", "Tableau", "Figma", "Jenkins", "Linux", "Pandas", "PyTorch"]
+WORDS = ("built designed migrated scaled owned service pipeline api latency cost team users "
+         "dashboard cache queue cluster rollout tests coverage incidents reporting analytics "
+         "onboarding billing search ingestion monitoring deployment").split()
+TITLES = ["Software Engineer", "Backend Developer", "Data Analyst", "Frontend Engineer",
+          "Platform Engineer", "ML Engineer", "Site Reliability Engineer", "Full Stack Developer"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+LENGTHS = {"short": (1, 2, 3), "medium": (4, 6, 5), "long": (60, 70, 8)}   # roles min/max, bullets per role
+CASES = ("spaced_cgpa", "vertical", "split_phone", "spaced_date")
+
+LINES_PER_PAGE = 56
+CHARS_PER_LINE = 95
+
+
+# ---------------- content ----------------
+def _line(rnd: random.Random, k: int) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(k)).capitalize()
+
+def _spaced(s: str) -> str:
+    return " ".join(s.replace(" ", ""))
+
+def make_resume(rnd: random.Random, i: int, length: str) -> dict:
+    lo, hi, bullets = LENGTHS[length]
+    start = 2005 + rnd.randint(0, 10)
+    experience = []
+    for j in range(rnd.randint(lo, hi)):
+        year = start + j
+        experience.append({
+            "title": rnd.choice(TITLES), "company": f"Company {i}-{j}",
+            "dates": f"{rnd.choice(MONTHS)} {year} - {rnd.choice(MONTHS)} {year + 1}",
+            "bullets": [_line(rnd, rnd.randint(8, 16)) for _ in range(bullets)],
+        })
+    return {
+        "name": f"Candidate {i:04d}", "email": f"candidate{i}@example.com",
+        "phone": "".join(str(rnd.randint(0, 9)) for _ in range(10)),
+        "linkedin": f"linkedin.com/in/candidate{i}", "location": "Remote",
+        "summary": _line(rnd, 30),
+        "skills": rnd.sample(SKILLS, rnd.randint(6, 14)),
+        "experience": experience,
+        "education": [{"degree": "B.Tech CSE", "school": "State University", "dates": f"Aug {start - 4} - May {start}",
+                       "details": [f"CGPA: {rnd.randint(6, 9)}.{rnd.randint(0, 9)}/10"]}],
+        "projects": [{"name": _line(rnd, 2), "dates": str(start + k), "description": _line(rnd, 12),
+                      "bullets": [_line(rnd, 10) for _ in range(2)]} for k in range(rnd.randint(1, 3))],
+        "achievements": [_line(rnd, 8) for _ in range(rnd.randint(0, 3))],
+    }
+
+def make_jd(rnd: random.Random, i: int) -> dict:
+    return {
+        "title": rnd.choice(TITLES), "company": f"Employer {i}",
+        "skills_required": rnd.sample(SKILLS, 6), "nice_to_have": rnd.sample(SKILLS, 3),
+        "text": f"We are hiring. Requirements: {', '.join(rnd.sample(SKILLS, 6))}. " + _line(rnd, 60),
+    }
+
+def resume_lines(resume: dict, cases: List[str]) -> tuple:
+    """
+    (text lines as a resume PDF would show them, {case: string expected after cleanup}).
+    """
+    expect = {}
+    phone = resume["phone"]
+    if "split_phone" in cases:
+        contact = f"{resume['email']} | {_spaced(phone)} | {resume['linkedin']}"
+        expect["split_phone"] = phone
+    else:
+        contact = f"{resume['email']} | {phone} | {resume['linkedin']}"
+    lines = [resume["name"], contact, "", "SUMMARY", resume["summary"], ""]
+
+    if "vertical" in cases:
+        lines += list("SKILLS")   # rotated sidebar heading: one glyph per line
+        expect["vertical"] = "SKILLS"
+    else:
+        lines.append("SKILLS")
+    lines += [", ".join(resume["skills"]), "", "EXPERIENCE"]
+
+    for n, exp in enumerate(resume["experience"]):
+        dates = exp["dates"]
+        if n == 0 and "spaced_date" in cases:
+            month, year = dates.split(" ")[:2]
+            dates = f"{_spaced(month)} {_spaced(year)}" + dates[len(month) + len(year) + 1:]
+            expect["spaced_date"] = f"{month} {year}"
+        lines.append(f"{exp['title']} - {exp['company']}    {dates}")
+        lines += [f"- {b}" for b in exp["bullets"]]
+    lines += ["", "EDUCATION"]
+    for ed in resume["education"]:
+        lines.append(f"{ed['degree']}, {ed['school']}, {ed['dates']}")
+        for d in ed["details"]:
+            if "spaced_cgpa" in cases:
+                expect["spaced_cgpa"] = d
+                d = "C G P A : " + " ".join(d.split(":")[1].strip())
+            lines.append(d)
+    lines += ["", "PROJECTS"]
+    for p in resume["projects"]:
+        lines += [f"{p['name']} ({p['dates']})", p["description"]] + [f"- {b}" for b in p["bullets"]]
+    if resume["achievements"]:
+        lines += ["", "ACHIEVEMENTS"] + [f"- {a}" for a in resume["achievements"]]
+    return lines, expect
+
+
+# ---------------- writers ----------------
+def _wrap(lines: List[str]) -> List[str]:
+    out = []
+    for line in lines:
+        while len(line) > CHARS_PER_LINE:
+            cut = line.rfind(" ", 0, CHARS_PER_LINE)
+            cut = cut if cut > 0 else CHARS_PER_LINE
+            out.append(line[:cut])
+            line = line[cut:].lstrip()
+        out.append(line)
+    return out
+
+def pdf_bytes(lines: List[str], min_pages: int = 1) -> bytes:
+    """
+    A minimal text PDF (Helvetica, LINES_PER_PAGE lines per page), padded to min_pages.
+    """
+    lines = _wrap(lines)
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    while len(pages) < min_pages:
+        pages.append([f"Continued {len(pages) + 1}"])
+
+    objs: List[bytes] = []
+    def add(body: bytes) -> int:
+        objs.append(body)
+        return len(objs)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = 1 + 2 * len(pages) + 1   # font, (content, page) per page, then /Pages
+    kids = []
+    for page in pages:
+        ops = " ".join("(%s) '" % l.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for l in page)
+        stream = f"BT /F1 10 Tf 50 800 Td 13 TL {ops} ET".encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] /Contents %d 0 R "
+                        b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)))
+    assert add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids))) == pages_id
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, catalog, xref)
+    return bytes(out)
+
+def docx_bytes(lines: List[str]) -> bytes:
+    """
+    One paragraph per line, written by python-docx, with fixed metadata and zip timestamps.
+    """
+    from docx import Document
+    doc = Document()
+    fixed = datetime.datetime(2024, 1, 1)
+    props = doc.core_properties
+    props.created = props.modified = props.last_printed = fixed
+    for line in lines:
+        doc.add_paragraph(line)
+    raw = io.BytesIO()
+    doc.save(raw)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(raw.getvalue())) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            dst.writestr(zipfile.ZipInfo(info.filename, date_time=(1980, 1, 1, 0, 0, 0)),
+                         src.read(info.filename), zipfile.ZIP_DEFLATED)
+    return out.getvalue()
+
+
+# ---------------- corpus ----------------
+def make_corpus(n: int = 60, seed: int = 7, n_jds: int = 5) -> dict:
+    """
+    {"jds": [...], "samples": [...]}. Samples cycle through length x file kind, and every
+    broken-extraction case shows up in about a third of them.
+    """
+    rnd = random.Random(seed)
+    jds = [make_jd(rnd, i) for i in range(n_jds)]
+    samples = []
+    for i in range(n):
+        length = ("short", "medium", "long")[i % 3] if i % 9 else "short"
+        kind = "pdf" if (i // 3) % 2 == 0 else "docx"
+        cases = [c for j, c in enumerate(CASES) if (i + j) % 3 == 0]
+        resume = make_resume(rnd, i, length)
+        lines, expect = resume_lines(resume, cases)
+        data = pdf_bytes(lines, 13 if length == "long" else 1) if kind == "pdf" else docx_bytes(lines)
+        samples.append({
+            "id": f"{i:04d}-{length}.{kind}", "kind": kind, "length": length, "cases": cases,
+            "expect": expect, "resume": resume, "jd": i % n_jds, "text": "\n".join(lines), "data": data,
+        })
+    return {"jds": jds, "samples": samples}
+
+def corpus_digest(corpus: dict) -> str:
+    h = hashlib.sha256()
+    for s in corpus["samples"]:
+        h.update(s["id"].encode("ascii") + b"\x00" + s["data"])
+    h.update(json.dumps(corpus["jds"], sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--out", required=True, help="directory for the files and manifest.json")
+    ap.add_argument("-n", "--samples", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    corpus = make_corpus(args.samples, args.seed)
+    os.makedirs(args.out, exist_ok=True)
+    for s in corpus["samples"]:
+        with open(os.path.join(args.out, s["id"]), "wb") as f:
+            f.write(s["data"])
+    manifest = {"digest": corpus_digest(corpus), "jds": corpus["jds"],
+                "samples": [{k: v for k, v in s.items() if k != "data"} for s in corpus["samples"]]}
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"{len(corpus['samples'])} files in {args.out} (corpus {manifest['digest']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+# benchmarks/fake_llm.py
+"""
+Local stand-in for the OpenAI chat-completions API, for benchmarks and load tests that must
+not spend tokens or depend on provider latency. Two ways to use it:
+
+- in process: FakeOpenAI() in place of AsyncOpenAI (wrap it in ScheduledOpenAI to include the
+  scheduler), e.g. app.state.openai_client = ScheduledOpenAI(lambda: FakeOpenAI(profile), scheduler)
+- over HTTP: python -m benchmarks.fake_llm --port 8089 [profile options], then start the API with
+  OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-fake; the real SDK talks to it
+
+Answers resume prompts with a canned resume (its name taken from the resume text) and JD
+prompts with a canned JD, or with your own (--canned file.json: {"resume": {...}, "jd": {...}}).
+Streaming is supported. Usage is reported like the real API, at about 4 characters per token.
+
+A FakeProfile sets the behaviour per call:
+  latency   time to first token: "0.3", "uniform:0.2:0.8", "normal:0.5:0.1" or
+            "lognormal:0.5:0.4" (median, sigma)
+  tps       completion tokens per second after the first token (0 = instant)
+  error_429 / error_500   probability of answering with a rate limit / server error
+  retry_after             seconds advertised in retry-after-ms on 429s
+"""
+import os, json, math, time, random, asyncio, argparse
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from .corpus import make_resume
+
+CANNED_RESUME = make_resume(random.Random(0), 0, "medium")
+CANNED_JD = {
+    "title": "Backend Engineer", "company": "Employer", "skills_required": ["Python", "PostgreSQL", "Docker", "AWS"],
+    "nice_to_have": ["Kubernetes"], "projects": [], "achievements": [], "certifications": [], "awards": [],
+    "publications": [], "languages": [], "hobbies": [],
+}
+
+STREAM_CHUNK_CHARS = 24
+
+
+def latency_sampler(spec: str, rnd: random.Random) -> Callable[[], float]:
+    """
+    A function returning one latency draw (seconds, >= 0) for a spec like "uniform:0.2:0.8".
+    """
+    kind, _, params = str(spec or "0").partition(":")
+    try:
+        if not params:
+            value = float(kind)
+            return lambda: value
+        a, _, b = params.partition(":")
+        a, b = float(a), float(b or 0)
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec!r}")
+    if kind == "uniform":
+        return lambda: rnd.uniform(a, b)
+    if kind == "normal":
+        return lambda: max(0.0, rnd.gauss(a, b))
+    if kind == "lognormal":
+        mu = math.log(a) if a > 0 else 0.0
+        return lambda: rnd.lognormvariate(mu, b) if a > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {kind!r} (fixed, uniform, normal, lognormal)")
+
+
+class FakeProfile:
+    """
+    Latency, throughput and error injection for one fake endpoint. Seeded, so a run's sequence
+    of latencies and errors is reproducible.
+    """
+
+    def __init__(self, latency: str = "0", tps: float = 0.0, error_429: float = 0.0, error_500: float = 0.0,
+                 retry_after: float = 1.0, canned: Optional[dict] = None, seed: int = 0):
+        self.latency = latency
+        self.tps = tps
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.retry_after = retry_after
+        self.canned = {"resume": CANNED_RESUME, "jd": CANNED_JD, **(canned or {})}
+        self._rnd = random.Random(seed)
+        self._latency = latency_sampler(latency, self._rnd)
+        self.counters = {"calls": 0, "ok": 0, "rate_limited": 0, "server_errors": 0,
+                         "prompt_tokens": 0, "completion_tokens": 0}
+
+    @classmethod
+    def from_args(cls, args) -> "FakeProfile":
+        canned = None
+        if getattr(args, "canned", ""):
+            with open(args.canned, "r", encoding="utf-8") as f:
+                canned = json.load(f)
+        return cls(args.latency, args.tps, args.error_429, args.error_500, args.retry_after, canned, args.seed)
+
+    def answer(self, prompt: str) -> str:
+        if "Job Description" in prompt:
+            return json.dumps(self.canned["jd"])
+        data = dict(self.canned["resume"])
+        _, _, text = prompt.partition("Resume text:")
+        first = next((l.strip() for l in text.splitlines() if l.strip()), "")
+        if first:
+            data["name"] = first[:80]
+        return json.dumps(data)
+
+    def next_call(self, prompt: str) -> SimpleNamespace:
+        """
+        Decide one call: its error status (or None), latency, content and usage.
+        """
+        self.counters["calls"] += 1
+        draw = self._rnd.random()
+        status = 429 if draw < self.error_429 else 500 if draw < self.error_429 + self.error_500 else None
+        if status == 429:
+            self.counters["rate_limited"] += 1
+            return SimpleNamespace(status=status, latency=0.0)
+        latency = self._latency()
+        if status == 500:
+            self.counters["server_errors"] += 1
+            return SimpleNamespace(status=status, latency=latency)
+        content = self.answer(prompt)
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.counters["ok"] += 1
+        self.counters["prompt_tokens"] += usage["prompt_tokens"]
+        self.counters["completion_tokens"] += usage["completion_tokens"]
+        return SimpleNamespace(status=None, latency=latency, content=content, usage=usage)
+
+    def chunk_delay(self, chunk: str) -> float:
+        return (len(chunk) / 4) / self.tps if self.tps > 0 else 0.0
+
+    def error_headers(self, status: int) -> dict:
+        if status == 429:
+            return {"retry-after-ms": str(int(self.retry_after * 1000))}
+        return {}
+
+    def stats(self) -> dict:
+        return {"latency": self.latency, "tps": self.tps, "error_429": self.error_429,
+                "error_500": self.error_500, **self.counters}
+
+
+def _prompt(messages) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages or [])
+
+def _chunks(content: str):
+    for i in range(0, len(content), STREAM_CHUNK_CHARS):
+        yield content[i:i + STREAM_CHUNK_CHARS]
+
+
+# ---------------- in process ----------------
+class _Completions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def _error(self, status: int):
+        # openai is imported lazily like everywhere else; only error injection needs it
+        import openai
+        headers = self._owner.profile.error_headers(status)
+        response = SimpleNamespace(status_code=status, headers=headers, request=None)
+        cls = openai.RateLimitError if status == 429 else openai.InternalServerError
+        return cls(f"fake {status}", response=response, body={"message": f"fake {status}"})
+
+    async def create(self, model: str = "gpt-4o-mini", messages=None, stream: bool = False, **kwargs):
+        owner = self._owner
+        owner.calls += 1
+        call = owner.profile.next_call(_prompt(messages))
+        if call.latency:
+            await asyncio.sleep(call.latency)
+        if call.status:
+            raise self._error(call.status)
+        if stream:
+            include_usage = bool((kwargs.get("stream_options") or {}).get("include_usage"))
+            return self._stream(call.content, call.usage if include_usage else None)
+        await asyncio.sleep(owner.profile.chunk_delay(call.content))
+        message = SimpleNamespace(role="assistant", content=call.content)
+        return SimpleNamespace(model=model, usage=SimpleNamespace(**call.usage),
+                               choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+    async def _stream(self, content: str, usage: Optional[dict] = None):
+        for piece in _chunks(content):
+            delay = self._owner.profile.chunk_delay(piece)
+            if delay:
+                await asyncio.sleep(delay)
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)], usage=None)
+        if usage:
+            # like stream_options={"include_usage": True}: a last chunk with no choices
+            yield SimpleNamespace(choices=[], usage=SimpleNamespace(**usage))
+
+
+class FakeOpenAI:
+    """
+    Drop-in for app.state.openai_client. `latency` is a shortcut for a fixed-latency profile.
+    """
+
+    def __init__(self, profile: Optional[FakeProfile] = None, latency: Optional[float] = None):
+        self.profile = profile or FakeProfile(latency=str(latency or 0))
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+
+# ---------------- over HTTP ----------------
+def make_app(profile: FakeProfile):
+    """
+    A FastAPI app serving POST /v1/chat/completions (JSON and SSE) with the OpenAI schemas,
+    plus GET /v1/models and GET /stats.
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Fake OpenAI")
+    seq = {"n": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+        call = profile.next_call(_prompt(body.get("messages")))
+        if call.latency:
+            await asyncio.sleep(call.latency)
+        if call.status:
+            kind = "rate_limit_error" if call.status == 429 else "server_error"
+            return JSONResponse({"error": {"message": f"fake {call.status}", "type": kind, "param": None,
+                                           "code": kind}},
+                                status_code=call.status, headers=profile.error_headers(call.status))
+
+        seq["n"] += 1
+        ident, created = f"chatcmpl-fake-{seq['n']}", int(time.time())
+        if not body.get("stream"):
+            await asyncio.sleep(profile.chunk_delay(call.content))
+            return {"id": ident, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": call.content},
+                                 "finish_reason": "stop", "logprobs": None}],
+                    "usage": call.usage}
+
+        async def events():
+            def chunk(delta: dict, finish=None) -> bytes:
+                data = {"id": ident, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}]}
+                return f"data: {json.dumps(data)}\n\n".encode("utf-8")
+            yield chunk({"role": "assistant", "content": ""})
+            for piece in _chunks(call.content):
+                delay = profile.chunk_delay(piece)
+                if delay:
+                    await asyncio.sleep(delay)
+                yield chunk({"content": piece})
+            yield chunk({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"id": ident, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [], "usage": call.usage}
+                yield f"data: {json.dumps(usage)}\n\n".encode("utf-8")
+            yield b"data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "fake"}
+                                           for m in ("gpt-4o-mini", "gpt-4o-2024-08-06")]}
+
+    @app.get("/stats")
+    async def stats():
+        return profile.stats()
+
+    return app
+
+
+def add_profile_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency", default="0", help='fixed seconds or "uniform:a:b" / "normal:mean:sd" / "lognormal:median:sigma"')
+    ap.add_argument("--tps", type=float, default=0.0, help="completion tokens per second (0 = instant)")
+    ap.add_argument("--error-429", type=float, default=0.0, help="probability of a 429 per call")
+    ap.add_argument("--error-500", type=float, default=0.0, help="probability of a 500 per call")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="seconds advertised on 429s")
+    ap.add_argument("--canned", default="", help='JSON file with {"resume": {...}, "jd": {...}} answers')
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Fake OpenAI chat-completions server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.getenv("FAKE_LLM_PORT", "8089")))
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    import uvicorn
+    print(f"Fake OpenAI on http://{args.host}:{args.port}/v1 "
+          f"(set OPENAI_BASE_URL to this and OPENAI_API_KEY to anything)")
+    uvicorn.run(make_app(FakeProfile.from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# benchmarks/loadtest.py
+"""
+Open-loop load generator for the API. Requests are started on a fixed schedule (--rps) whether
+or not earlier ones have finished, and latency is measured from each request's scheduled start,
+so a backed-up server shows up as latency instead of as a quietly lower send rate.
+
+Targets:
+  --url http://127.0.0.1:8000    a running server (point its OPENAI_BASE_URL at benchmarks.fake_llm)
+  --in-process                   the app in this process over ASGI, with FakeOpenAI behind the real
+                                 LLM scheduler; the fake's profile comes from the options below
+
+    cd backend-ai && python -m benchmarks.loadtest --in-process --rps 20 --duration 30 \\
+        --latency lognormal:0.8:0.4 --tps 80 --error-429 0.02 [--endpoint parse] [--unique-jd] [--json out.json]
+
+Reports throughput, p50/p95/p99/max latency and errors by status, plus the LLM scheduler's
+counters and, in process, the fake's call counts.
+"""
+import os, sys, json, time, asyncio, argparse, tempfile
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from benchmarks.corpus import make_corpus
+from benchmarks.fake_llm import FakeOpenAI, FakeProfile, add_profile_args
+
+MIMES = {"pdf": "application/pdf",
+         "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+ENDPOINTS = {"parse": "/api/parse", "parse_stream": "/api/parse/stream", "format": "/api/format"}
+
+
+def percentile(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+
+def _in_process_app(profile: FakeProfile):
+    """
+    The API app with scratch caches, no RPM/TPM budgets unless asked for, and a FakeOpenAI
+    behind the real scheduler. Env has to be set before main is imported.
+    """
+    scratch = tempfile.mkdtemp(prefix="resume-load-")
+    for var, sub in (("PARSE_CACHE_DIR", "parse_cache"), ("PARSED_STORE_DIR", "parsed_store"),
+                     ("CONVERT_CACHE_DIR", "convert_cache"), ("TEX_PDF_CACHE_DIR", "tex_cache"),
+                     ("TECTONIC_WORK_ROOT", "tectonic"), ("BATCH_DIR", "batches")):
+        os.environ.setdefault(var, os.path.join(scratch, sub))
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest-fake"
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+    os.environ.setdefault("STARTUP_WARMUP", "0")
+
+    import main
+    from services.llm_scheduler import ScheduledOpenAI
+    fake = FakeOpenAI(profile)
+    main.app.state.openai_client = ScheduledOpenAI(lambda: fake, main.app.state.llm_scheduler)
+    main.app.state.ready = True
+    return main.app, fake
+
+
+class LoadTest:
+    def __init__(self, client, args, corpus: dict):
+        self.client = client
+        self.args = args
+        self.samples = corpus["samples"]
+        self.jds = corpus["jds"]
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.in_flight = 0
+        self.dropped = 0
+        self.ids: Optional[dict] = None
+
+    def _form(self, i: int):
+        s = self.samples[i % len(self.samples)]
+        jd = self.jds[s["jd"]]["text"]
+        if self.args.unique_jd:
+            jd += f"\nReq #{i}"   # defeats the JD caches
+        data = {"jd_text": jd, "mode": self.args.mode}
+        if self.args.no_cache:
+            data["no_cache"] = "true"
+        if self.args.endpoint == "format":
+            data.update({"style": self.args.style, "format": "docx"})
+            if self.ids:
+                data.update(self.ids)
+                data.pop("jd_text")
+                return data, None
+        return data, {"resume": (s["id"], s["data"], MIMES[s["kind"]])}
+
+    async def _one(self, i: int, scheduled: float) -> None:
+        self.in_flight += 1
+        status = "exception"
+        try:
+            data, files = self._form(i)
+            path = ENDPOINTS[self.args.endpoint]
+            async with self.client.stream("POST", path, data=data, files=files) as r:
+                async for _ in r.aiter_raw():   # read the whole body, streams included
+                    pass
+                status = str(r.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        finally:
+            self.in_flight -= 1
+            self.latencies.append(time.perf_counter() - scheduled)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    async def prepare(self) -> None:
+        # /format by id: parse once so the load measures rendering only
+        if self.args.endpoint == "format" and not self.args.upload:
+            data, files = self._form(0)
+            r = await self.client.post(ENDPOINTS["parse"], data=data, files=files)
+            r.raise_for_status()
+            meta = r.json()["meta"]
+            self.ids = {"resume_id": meta["resume_id"], "job_id": meta["job_id"]}
+
+    async def run(self) -> float:
+        total = int(self.args.rps * self.args.duration)
+        tasks = []
+        started = time.perf_counter()
+        for i in range(total):
+            scheduled = started + i / self.args.rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.args.max_in_flight and self.in_flight >= self.args.max_in_flight:
+                self.dropped += 1   # client-side saturation; counted, not sent
+                continue
+            tasks.append(asyncio.create_task(self._one(i, scheduled)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+async def _run(args) -> dict:
+    import httpx
+    corpus = make_corpus(args.samples, args.seed_corpus)
+    profile = FakeProfile.from_args(args)
+    timeout = httpx.Timeout(args.timeout)
+    if args.in_process:
+        app, fake = _in_process_app(profile)
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout)
+    else:
+        fake = None
+        limits = httpx.Limits(max_connections=args.max_in_flight or 1000)
+        client = httpx.AsyncClient(base_url=args.url.rstrip("/"), timeout=timeout, limits=limits)
+
+    async with client:
+        lt = LoadTest(client, args, corpus)
+        await lt.prepare()
+        elapsed = await lt.run()
+        llm = None
+        if args.in_process:
+            llm = app.state.llm_scheduler.stats()
+        else:
+            try:
+                llm = (await client.get("/api/llm/status")).json()
+            except Exception:
+                pass
+
+    ok = sum(n for s, n in lt.statuses.items() if s.startswith("2"))
+    sent = sum(lt.statuses.values())
+    ms = lambda s: round(s * 1000, 1)
+    return {
+        "target": "in-process" if args.in_process else args.url,
+        "endpoint": args.endpoint, "mode": args.mode, "rps_target": args.rps, "duration_s": args.duration,
+        "sent": sent, "ok": ok, "dropped": lt.dropped,
+        "error_rate": round((sent - ok) / sent, 4) if sent else 0.0,
+        "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {"p50": ms(percentile(lt.latencies, 0.50)), "p95": ms(percentile(lt.latencies, 0.95)),
+                       "p99": ms(percentile(lt.latencies, 0.99)), "max": ms(max(lt.latencies, default=0.0))},
+        "statuses": dict(sorted(lt.statuses.items())),
+        "llm_scheduler": {k: llm[k] for k in ("counters", "tokens_by_model") if k in llm} if llm else None,
+        "fake_llm": profile.stats() if fake else None,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Open-loop load test for the resume API")
+    target = ap.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8000")
+    target.add_argument("--in-process", action="store_true")
+    ap.add_argument("--endpoint", choices=sorted(ENDPOINTS), default="parse")
+    ap.add_argument("--rps", type=float, default=10.0)
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of sending")
+    ap.add_argument("--max-in-flight", type=int, default=0, help="skip sends past this many open requests (0 = unbounded)")
+    ap.add_argument("--timeout", type=float, default=300.0)
+    ap.add_argument("--mode", default="full", help="parse mode sent with each request")
+    ap.add_argument("--no-cache", action="store_true", help="send no_cache=true (every request hits the LLM)")
+    ap.add_argument("--unique-jd", action="store_true", help="make every JD distinct")
+    ap.add_argument("--style", default="docx_default", help="style for --endpoint format")
+    ap.add_argument("--upload", action="store_true", help="--endpoint format: upload the file each time instead of using ids")
+    ap.add_argument("--samples", type=int, default=30, help="corpus size to cycle through")
+    ap.add_argument("--seed-corpus", type=int, default=7)
+    ap.add_argument("--json", default="", help="also write the report here")
+    add_profile_args(ap)
+    args = ap.parse_args()
+
+    report = asyncio.run(_run(args))
+    lat = report["latency_ms"]
+    print(f"{report['target']} {report['endpoint']}: {report['sent']} sent at {args.rps:g} rps target, "
+          f"{report['ok']} ok, {report['dropped']} dropped")
+    print(f"throughput {report['throughput_rps']} rps, error rate {report['error_rate'] * 100:.2f}%")
+    print(f"latency ms  p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  max {lat['max']}")
+    print(f"statuses {report['statuses']}")
+    if report["llm_scheduler"]:
+        print(f"llm scheduler {report['llm_scheduler']['counters']}")
+    if report["fake_llm"]:
+        print(f"fake llm {report['fake_llm']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+# benchmarks/run.py
+"""
+Stage benchmarks over the synthetic corpus: extract_text, clean_extracted_text, group_skills,
+_score_experience, tailor (JD relevance ranking), build_resume, _render_template and the
+whole /api/parse request against an in-process fake LLM. Writes a JSON report (per-stage
+n / mean / p50 / p95 / min / max in ms, cleanup checks, corpus digest, git commit) so runs
+can be compared across commits.
+
+    cd backend-ai && python -m benchmarks.run [-n 60] [--seed 7] [--repeat 3] [--only extract_text,api_parse]
+                                              [--out results.json] [--compare previous.json]
+"""
+import os, sys, json, time, asyncio, platform, argparse, tempfile, subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+# Caches and stores go to a scratch dir (so every run starts cold), the scheduler's RPM/TPM
+# budgets are off (they'd throttle the fake), and no real key is ever picked up from .env.
+# All of this must be set before the app modules read their tunables.
+_SCRATCH = tempfile.mkdtemp(prefix="resume-bench-")
+for _var, _sub in (("PARSE_CACHE_DIR", "parse_cache"), ("PARSED_STORE_DIR", "parsed_store"),
+                   ("CONVERT_CACHE_DIR", "convert_cache"), ("TEX_PDF_CACHE_DIR", "tex_cache"),
+                   ("TECTONIC_WORK_ROOT", "tectonic"),
+                   ("BATCH_DIR", "batches"), ("ALLOWED_SAVE_ROOT", "saved"),
+                   ("SAVED_INDEX_PATH", "saved_index.sqlite3"), ("SAVED_GZIP_CACHE_DIR", "saved_gz")):
+    os.environ.setdefault(_var, os.path.join(_SCRATCH, _sub))
+os.environ["OPENAI_API_KEY"] = "sk-benchmark-fake"
+os.environ.setdefault("LLM_RPM", "0")
+os.environ.setdefault("LLM_TPM", "0")
+os.environ.setdefault("STARTUP_WARMUP", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils import text_extractor
+from utils.text_normalizer import clean_extracted_text
+from services import formatter, latex_renderer, relevance
+from services.skill_index import group_skills, jd_matcher
+from services.formatter_overleaf_modern import _score_experience, build_context
+
+from benchmarks.corpus import make_corpus, corpus_digest
+from benchmarks.fake_llm import FakeOpenAI
+
+TEMPLATE = "resume_modern.tex.j2"
+STAGES = ("extract_text", "clean_extracted_text", "group_skills", "_score_experience", "tailor",
+          "build_resume", "_render_template", "api_parse")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+# ---------------- stats ----------------
+def summarize(seconds: List[float]) -> dict:
+    xs = sorted(seconds)
+    n = len(xs)
+    pct = lambda p: xs[min(n - 1, int(round(p * (n - 1))))]
+    ms = lambda s: round(s * 1000, 4)
+    return {"n": n, "mean_ms": ms(sum(xs) / n), "p50_ms": ms(pct(0.50)), "p95_ms": ms(pct(0.95)),
+            "min_ms": ms(xs[0]), "max_ms": ms(xs[-1])}
+
+class Recorder:
+    def __init__(self):
+        self.times: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.times.setdefault(stage, []).append(seconds)
+
+    def time(self, stage: str, fn: Callable, *args):
+        started = time.perf_counter()
+        out = fn(*args)
+        self.add(stage, time.perf_counter() - started)
+        return out
+
+    async def time_async(self, stage: str, coro):
+        started = time.perf_counter()
+        out = await coro
+        self.add(stage, time.perf_counter() - started)
+        return out
+
+    def report(self) -> dict:
+        return {stage: summarize(ts) for stage, ts in sorted(self.times.items())}
+
+
+# ---------------- stages ----------------
+async def bench_extract(corpus: dict, rec: Recorder, checks: dict) -> None:
+    await text_extractor.extract_text(corpus["samples"][0]["data"])   # warm: imports
+    for s in corpus["samples"]:
+        text = await rec.time_async(f"extract_text/{s['kind']}/{s['length']}", text_extractor.extract_text(s["data"]))
+        for case, expected in s["expect"].items():
+            c = checks.setdefault(case, {"passed": 0, "total": 0})
+            c["total"] += 1
+            c["passed"] += expected in text
+
+def bench_clean(corpus: dict, rec: Recorder, repeat: int) -> None:
+    for _ in range(repeat):
+        for s in corpus["samples"]:
+            rec.time(f"clean_extracted_text/{s['length']}", clean_extracted_text, s["text"])
+
+def bench_skills(corpus: dict, rec: Recorder, repeat: int) -> None:
+    for _ in range(repeat):
+        for s in corpus["samples"]:
+            rec.time("group_skills", group_skills, s["resume"]["skills"])
+
+def bench_score(corpus: dict, rec: Recorder, repeat: int) -> None:
+    for _ in range(repeat):
+        for s in corpus["samples"]:
+            matcher = jd_matcher(corpus["jds"][s["jd"]]["skills_required"])
+            for exp in s["resume"]["experience"]:
+                rec.time("_score_experience", _score_experience, exp, matcher)
+
+def bench_tailor(corpus: dict, rec: Recorder, repeat: int) -> None:
+    relevance.score_texts(["warm"], {"skills_required": ["numpy"]})   # warm: numpy import
+    # The first pass pays for tokenizing and the per-JD vectors; later passes hit their caches
+    for i in range(repeat + 1):
+        for s in corpus["samples"]:
+            r = s["resume"]
+            stage = f"tailor/{s['length']}" if i else "tailor/cold"
+            rec.time(stage, relevance.tailor, r["experience"], r.get("projects"), corpus["jds"][s["jd"]])
+
+async def bench_build(corpus: dict, rec: Recorder) -> None:
+    await formatter.build_resume(corpus["samples"][0]["resume"], {}, "docx")   # warm: template load
+    for s in corpus["samples"]:
+        jd = corpus["jds"][s["jd"]]
+        await rec.time_async(f"build_resume/{s['length']}", formatter.build_resume(s["resume"], jd, "docx"))
+
+def bench_render(corpus: dict, rec: Recorder) -> None:
+    latex_renderer.get_env()
+    for s in corpus["samples"]:
+        context = build_context(s["resume"], corpus["jds"][s["jd"]])
+        latex_renderer._tex_cache.clear()
+        rec.time(f"_render_template/{s['length']}", latex_renderer._render_template, TEMPLATE, context)
+        rec.time("_render_template/cached", latex_renderer._render_template, TEMPLATE, context)
+
+def bench_api(corpus: dict, rec: Recorder, mode: str) -> dict:
+    from fastapi.testclient import TestClient
+    import main
+    from services.llm_scheduler import ScheduledOpenAI
+
+    fake = FakeOpenAI()
+    mimes = {"pdf": "application/pdf",
+             "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+    statuses: Dict[str, int] = {}
+    with TestClient(main.app) as client:
+        main.app.state.openai_client = ScheduledOpenAI(lambda: fake, main.app.state.llm_scheduler)
+        for i, s in enumerate([corpus["samples"][0]] + corpus["samples"]):
+            form = {"jd_text": corpus["jds"][s["jd"]]["text"], "mode": mode, "no_cache": "true"}
+            files = {"resume": (s["id"], s["data"], mimes[s["kind"]])}
+            started = time.perf_counter()
+            r = client.post("/api/parse", files=files, data=form)
+            elapsed = time.perf_counter() - started
+            if i:   # the first request is a warm-up
+                rec.add(f"api_parse/{s['kind']}/{s['length']}", elapsed)
+                statuses[str(r.status_code)] = statuses.get(str(r.status_code), 0) + 1
+    return {"mode": mode, "llm_calls": fake.calls, "statuses": statuses}
+
+
+# ---------------- report ----------------
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+def print_report(report: dict, previous: dict = None) -> None:
+    prev = (previous or {}).get("stages", {})
+    header = f"{'stage':<36} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}"
+    print(header + (f" {'p50 vs prev':>12}" if previous else ""))
+    for stage, s in report["stages"].items():
+        line = f"{stage:<36} {s['n']:>5} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} {s['mean_ms']:>10.3f}"
+        if previous:
+            old = prev.get(stage)
+            line += f" {(s['p50_ms'] / old['p50_ms'] - 1) * 100:>+11.1f}%" if old and old["p50_ms"] else f" {'new':>12}"
+        print(line)
+    print()
+    for case, c in report["checks"].items():
+        print(f"cleanup {case:<14} {c['passed']}/{c['total']}")
+    if "api" in report:
+        print(f"api_parse: {report['api']}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("-n", "--samples", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--repeat", type=int, default=3, help="passes over the corpus for the in-memory stages")
+    ap.add_argument("--mode", default="full", help="parse mode for api_parse (full | hybrid | fast)")
+    ap.add_argument("--only", default="", help=f"comma-separated subset of: {', '.join(STAGES)}")
+    ap.add_argument("--out", default="", help="report path (default: benchmarks/results/<time>-<commit>.json)")
+    ap.add_argument("--compare", default="", help="previous report to diff p50s against")
+    args = ap.parse_args()
+
+    only = {s.strip() for s in args.only.split(",") if s.strip()} or set(STAGES)
+    unknown = only - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    corpus = make_corpus(args.samples, args.seed)
+    rec, checks, report = Recorder(), {}, {}
+    started = time.perf_counter()
+    if "extract_text" in only:
+        asyncio.run(bench_extract(corpus, rec, checks))
+    if "clean_extracted_text" in only:
+        bench_clean(corpus, rec, args.repeat)
+    if "group_skills" in only:
+        bench_skills(corpus, rec, args.repeat)
+    if "_score_experience" in only:
+        bench_score(corpus, rec, args.repeat)
+    if "tailor" in only:
+        bench_tailor(corpus, rec, args.repeat)
+    if "build_resume" in only:
+        asyncio.run(bench_build(corpus, rec))
+    if "_render_template" in only:
+        bench_render(corpus, rec)
+    if "api_parse" in only:
+        report["api"] = bench_api(corpus, rec, args.mode)
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    report = {
+        "meta": {
+            "commit": commit, "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "corpus": {"digest": corpus_digest(corpus), "samples": args.samples, "seed": args.seed},
+            "repeat": args.repeat, "stages": sorted(only), "seconds": round(time.perf_counter() - started, 2),
+        },
+        "stages": rec.report(),
+        "checks": checks,
+        **report,
+    }
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("meta", {}).get("corpus", {}).get("digest") != report["meta"]["corpus"]["digest"]:
+            print("warning: the previous report was measured on a different corpus\n")
+    print_report(report, previous)
+    print(f"\nreport: {out}")
+
+
+if __name__ == "__main__":
+    main()
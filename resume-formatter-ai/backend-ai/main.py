@@ -1,16 +1,43 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from routers import resume, saved
+from routers import format, metrics, resume, saved, status
+from services import warmup, batch_runner
+from services.llm_scheduler import LLMScheduler, ScheduledOpenAI
+from utils.uploads import UploadLimitMiddleware, UPLOAD_FORM_SLACK
+from utils.metrics import ServerTimingMiddleware
+import asyncio
 import logging
 import os
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Resume Formatter AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy libraries load on first use unless STARTUP_WARMUP asks for them up front
+    task = None
+    if warmup.STARTUP_WARMUP in ("1", "true", "yes"):
+        await warmup.run(app)
+    elif warmup.STARTUP_WARMUP == "background":
+        task = asyncio.create_task(warmup.run(app))
+    else:
+        app.state.ready = True
+    yield
+    if task and not task.done():
+        task.cancel()
+
+app = FastAPI(title="Resume Formatter AI Service", lifespan=lifespan)
+app.state.ready = False
+app.state.warmup = {"status": "disabled" if warmup.STARTUP_WARMUP in ("0", "false", "no", "") else "pending"}
+
+# Single-resume uploads are capped while the body streams in (UPLOAD_MAX_BYTES);
+# batch uploads have their own per-file limit and a cap on the whole body (BATCH_MAX_TOTAL_BYTES)
+app.add_middleware(UploadLimitMiddleware, paths=["/api/parse", "/api/parse/stream", "/api/format"])
+app.add_middleware(UploadLimitMiddleware, paths=["/api/parse/batch"],
+                   max_bytes=batch_runner.BATCH_MAX_TOTAL_BYTES + UPLOAD_FORM_SLACK)
 
 # CORS (adjust origins as needed)
 app.add_middleware(
@@ -19,18 +46,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Resume-Id", "X-Job-Id", "X-Batch-Id", "Content-Disposition", "Server-Timing"],
 )
 
+# Outermost: per-request stage spans -> Server-Timing, request latency -> /metrics
+app.add_middleware(ServerTimingMiddleware)
+
 # Shared OpenAI client on app.state
 api_key = os.getenv("OPENAI_API_KEY")
 if not api_key:
     logger.warning("OPENAI_API_KEY is not set; formatting may fail when calling OpenAI.")
 
-app.state.openai_client = AsyncOpenAI(api_key=api_key) if api_key else None
+def _make_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+# Every chat completion goes through the scheduler (RPM/TPM budgets, shared backoff, retries),
+# so the SDK's own retry loop is disabled. The SDK client itself is built on first use.
+app.state.llm_scheduler = LLMScheduler()
+app.state.openai_client = (
+    ScheduledOpenAI(_make_openai_client, app.state.llm_scheduler)
+    if api_key else None
+)
 
 # Optional save location exposed on app.state
 app.state.allowed_save_root = os.getenv("ALLOWED_SAVE_ROOT", "./saved_resumes")
 
 # Routers
 app.include_router(resume.router, prefix="/api", tags=["resume"])
+app.include_router(format.router, prefix="/api", tags=["format"])
 app.include_router(saved.router,  prefix="/api", tags=["saved"])
+app.include_router(status.router, prefix="/api", tags=["status"])
+app.include_router(metrics.router, tags=["metrics"])   # /metrics, where Prometheus expects it
@@ -0,0 +1,92 @@
+# models/common.py
+"""
+Lenient field types for LLM output. The model is asked for strings and lists of strings but
+sometimes sends null, numbers, a bare string where a list belongs, a dict of groups, or a
+string where an object belongs; these coerce all of that in the same validation pass that
+fills in defaults, so code downstream can rely on the shape.
+"""
+import json
+from typing import Annotated, Any, ClassVar, List, Type
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, ValidationError, model_validator
+
+
+def _text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, str):
+        return v.strip()
+    if isinstance(v, (list, tuple)):
+        return ", ".join(t for t in map(_text, v) if t)
+    if isinstance(v, dict):
+        return ", ".join(t for t in map(_text, v.values()) if t)
+    return str(v)
+
+def _text_list(v: Any) -> List[str]:
+    if v is None or v == "":
+        return []
+    if isinstance(v, dict):
+        # {"Languages": [...], "Tools": [...]} -> flattened values
+        v = [x for group in v.values() for x in (group if isinstance(group, list) else [group])]
+    elif not isinstance(v, (list, tuple)):
+        v = [v]
+    return [t for t in map(_text, v) if t]
+
+def _item_list(v: Any) -> list:
+    if v is None or v == "":
+        return []
+    if not isinstance(v, (list, tuple)):
+        v = [v]
+    return [x for x in v if x not in (None, "", {})]
+
+
+Text = Annotated[str, BeforeValidator(_text)]
+TextList = Annotated[List[str], BeforeValidator(_text_list)]
+ItemList = BeforeValidator(_item_list)   # Annotated[List[Item], ItemList]
+
+
+class Item(BaseModel):
+    """
+    An entry in a list section. A bare string becomes {text_field: string}.
+    """
+    model_config = ConfigDict(extra="ignore")
+    text_field: ClassVar[str] = "name"
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_text(cls, v: Any) -> Any:
+        if isinstance(v, dict):
+            return v
+        return {cls.text_field: _text(v)}
+
+
+class Parsed(BaseModel):
+    """
+    Base for parse results: unknown keys are dropped, missing ones get defaults.
+    """
+    model_config = ConfigDict(extra="ignore")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _require_object(cls, v: Any) -> Any:
+        if not isinstance(v, dict):
+            raise ValueError(f"expected a JSON object, got {type(v).__name__}")
+        return v
+
+
+class ParseFailure(BaseModel):
+    """
+    What a parser returns when the model's answer isn't usable: its raw text and why.
+    """
+    raw: str
+    error: str
+
+
+def validated(model: Type[Parsed], data: Any, raw: str = "") -> dict:
+    """
+    `data` checked and filled in by `model`, as a plain dict; a ParseFailure dict if it can't be.
+    """
+    try:
+        return model.model_validate(data).model_dump()
+    except ValidationError as e:
+        return {"raw": raw or json.dumps(data, default=str), "error": f"Schema validation failed ({e.error_count()} errors)"}
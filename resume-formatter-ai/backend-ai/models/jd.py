@@ -1,9 +1,20 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from typing import Annotated, List
 
-class ParsedJD(BaseModel):
-    title: Optional[str]
-    company: Optional[str]
-    skills_required: List[str] = []
-    nice_to_have: List[str] = []
-    raw_text: str = ""
+from .common import ItemList, Parsed, Text, TextList
+from .resume import Award, Certification, Project, Publication
+
+class ParsedJD(Parsed):
+    """
+    Every field the JD prompt asks for.
+    """
+    title: Text = ""
+    company: Text = ""
+    skills_required: TextList = []
+    nice_to_have: TextList = []
+    projects: Annotated[List[Project], ItemList] = []
+    achievements: TextList = []
+    certifications: Annotated[List[Certification], ItemList] = []
+    awards: Annotated[List[Award], ItemList] = []
+    publications: Annotated[List[Publication], ItemList] = []
+    languages: TextList = []
+    hobbies: TextList = []
@@ -1,23 +1,69 @@
-from pydantic import BaseModel
-from typing import List, Optional
-
-class Experience(BaseModel):
-    title: Optional[str]
-    company: Optional[str]
-    dates: Optional[str]
-    bullets: List[str] = []
-
-class Education(BaseModel):
-    school: Optional[str]
-    degree: Optional[str]
-    dates: Optional[str]
-
-class ParsedResume(BaseModel):
-    name: Optional[str]
-    email: Optional[str]
-    phone: Optional[str]
-    summary: Optional[str]
-    skills: List[str] = []
-    experience: List[Experience] = []
-    education: List[Education] = []
-    raw_text: str = ""
+from typing import Annotated, ClassVar, List
+
+from .common import Item, ItemList, Parsed, Text, TextList
+
+class Experience(Item):
+    text_field: ClassVar[str] = "title"
+    title: Text = ""
+    company: Text = ""
+    dates: Text = ""
+    location: Text = ""
+    bullets: TextList = []
+    impact: Text = ""
+
+class Education(Item):
+    text_field: ClassVar[str] = "school"
+    school: Text = ""
+    degree: Text = ""
+    dates: Text = ""
+    location: Text = ""
+    details: TextList = []
+
+class Project(Item):
+    name: Text = ""
+    dates: Text = ""
+    description: Text = ""
+    bullets: TextList = []
+    tech: TextList = []
+
+class Certification(Item):
+    name: Text = ""
+    authority: Text = ""
+    date: Text = ""
+
+class Award(Item):
+    text_field: ClassVar[str] = "title"
+    title: Text = ""
+    issuer: Text = ""
+    date: Text = ""
+
+class Publication(Item):
+    text_field: ClassVar[str] = "title"
+    title: Text = ""
+    publisher: Text = ""
+    date: Text = ""
+
+class ParsedResume(Parsed):
+    """
+    Every field the resume prompt asks for, plus what local extraction adds (profile links)
+    and `degraded` for answers built without the LLM after it failed.
+    """
+    name: Text = ""
+    email: Text = ""
+    phone: Text = ""
+    location: Text = ""
+    linkedin: Text = ""
+    github: Text = ""
+    links: TextList = []
+    summary: Text = ""
+    skills: TextList = []
+    experience: Annotated[List[Experience], ItemList] = []
+    education: Annotated[List[Education], ItemList] = []
+    projects: Annotated[List[Project], ItemList] = []
+    achievements: TextList = []
+    certifications: Annotated[List[Certification], ItemList] = []
+    awards: Annotated[List[Award], ItemList] = []
+    publications: Annotated[List[Publication], ItemList] = []
+    languages: TextList = []
+    hobbies: TextList = []
+    degraded: bool = False
@@ -0,0 +1,136 @@
+# routers/format.py
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import Response
+from typing import TYPE_CHECKING, Optional, Union
+import os, re, logging, asyncio
+
+from models.jd import ParsedJD
+from models.resume import ParsedResume
+from utils.uploads import open_upload
+from utils.file_converter import convert_to_pdf, ConversionError
+from services import formatter, parsed_store, resume_parser
+from services.formatter_overleaf_modern import build_overleaf_modern
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+STYLES = ("overleaf_single", "docx_default")
+
+
+def _client(request: Request) -> "AsyncOpenAI":
+    client = request.app.state.openai_client
+    if not client:
+        raise HTTPException(status_code=500, detail="OpenAI client not configured")
+    return client
+
+def _load(item_id: str, what: str) -> dict:
+    try:
+        return parsed_store.load(item_id)
+    except parsed_store.UnknownId:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired {what}_id; send the {what} again.")
+
+def _download_name(filename: Optional[str], ext: str) -> str:
+    stem = os.path.splitext(os.path.basename(filename or ""))[0]
+    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", stem).strip("._") or "resume"
+    return f"{stem}_tailored{ext}"
+
+
+async def _render(style: str, format: str, resume: dict, job: dict, client) -> tuple:
+    if style == "overleaf_single":
+        return await build_overleaf_modern(resume, job, client)
+    docx_bytes = await formatter.build_resume(resume, job, format="docx", client=client)
+    if format != "pdf":
+        return docx_bytes, formatter.DOCX_MT, ".docx"
+    try:
+        return await convert_to_pdf(docx_bytes), formatter.PDF_MT, ".pdf"
+    except ConversionError as e:
+        logger.warning("PDF conversion failed, returning DOCX: %s", e)
+        return docx_bytes, formatter.DOCX_MT, ".docx"
+
+
+@router.post("/format")
+async def format_resume(
+    request: Request,
+    resume: Optional[UploadFile] = File(None),
+    resume_id: str = Form(None, description="id from /parse; replaces the upload"),
+    jd_text: str = Form(None),
+    prompt: str = Form(None),
+    job_id: str = Form(None, description="id from /parse; replaces jd_text"),
+    style: str = Form("overleaf_single", description="overleaf_single | docx_default"),
+    format: str = Form("docx", description="docx | pdf (docx_default only)"),
+    no_cache: bool = Form(False),
+    mode: str = Form(None, description="full | hybrid | fast (default: PARSE_MODE)"),
+):
+    """
+    Render a tailored resume file. The resume and JD come either as ids returned by /parse
+    (no extraction, no LLM call) or as an upload and jd_text, which are parsed and stored
+    first, exactly as /parse would. The ids used are returned in X-Resume-Id / X-Job-Id so
+    the next template or JD can be tried without sending the file again.
+    """
+    if style not in STYLES:
+        raise HTTPException(status_code=400, detail=f"Unknown style {style!r}; expected one of {', '.join(STYLES)}.")
+    format = (format or "docx").lower()
+    if format not in ("docx", "pdf"):
+        raise HTTPException(status_code=400, detail="format must be docx or pdf.")
+    if not resume_id and resume is None:
+        raise HTTPException(status_code=400, detail="Send a resume file or a resume_id.")
+    if not job_id and not (jd_text and jd_text.strip()):
+        raise HTTPException(status_code=400, detail="Send jd_text or a job_id.")
+
+    try:
+        mode = resume_parser.resolve_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    jd_task = None
+    try:
+        filename = None
+        if job_id:
+            parsed_jd = await asyncio.to_thread(_load, job_id, "job")
+        else:
+            jd_task = asyncio.create_task(parsed_store.resolve_job(
+                parsed_store.effective_jd_text(jd_text, prompt), _client(request), use_cache=not no_cache))
+
+        if resume_id:
+            parsed_resume = await asyncio.to_thread(_load, resume_id, "resume")
+        else:
+            filename = resume.filename or "resume"
+            upload = await open_upload(resume)
+            resume_id, parsed_resume = await parsed_store.resolve_resume(
+                upload, _client(request), mode, use_cache=not no_cache,
+                mime_type=resume.content_type, filename=filename,
+            )
+
+        if jd_task:
+            job_id, parsed_jd = await jd_task
+
+        content, media_type, ext = await _render(style, format, parsed_resume, parsed_jd,
+                                                 request.app.state.openai_client)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error formatting resume")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if jd_task and not jd_task.done():
+            jd_task.cancel()
+
+    headers = {"Content-Disposition": f'attachment; filename="{_download_name(filename, ext)}"'}
+    if resume_id:
+        headers["X-Resume-Id"] = resume_id
+    if job_id:
+        headers["X-Job-Id"] = job_id
+    return Response(content, media_type=media_type, headers=headers)
+
+
+@router.get("/parsed/{item_id}", response_model=Union[ParsedResume, ParsedJD])
+async def get_parsed(item_id: str):
+    """
+    The stored parse behind a resume_id or job_id.
+    """
+    what = "job" if item_id.startswith("j_") else "resume"
+    data = await asyncio.to_thread(_load, item_id, what)
+    return (ParsedJD if what == "job" else ParsedResume).model_validate(data)
@@ -0,0 +1,79 @@
+# routers/metrics.py
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from typing import List
+
+from utils import metrics, prompt_compactor
+from utils.file_converter import converter
+from services import latex_renderer
+from services.parse_cache import parse_cache
+from services.parsed_store import parsed_store
+from services.tex_compiler import tex_compiler
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _caches() -> List[str]:
+    """
+    Hits by tier, misses and hit ratio for every cache, from their own counters.
+    """
+    rows = []   # (cache, mem hits, disk hits, misses)
+    c = parse_cache.stats()
+    rows.append(("parse", c["mem_hits"], c["disk_hits"], c["misses"]))
+    for name, s in parsed_store.stats().items():
+        rows.append((f"parsed_{name}", s["mem_hits"], s["disk_hits"], s["misses"]))
+    r = latex_renderer.render_cache_stats()
+    rows.append(("tex_render", r["hits"], 0, r["misses"]))
+    t = tex_compiler.stats()["counters"]
+    rows.append(("tex_pdf", t["mem_hits"], t["disk_hits"], t["requests"] - t["mem_hits"] - t["disk_hits"]))
+    v = converter.stats()["counters"]
+    rows.append(("convert_pdf", v["mem_hits"], v["disk_hits"], v["requests"] - v["mem_hits"] - v["disk_hits"]))
+
+    hits, misses, ratio = [], [], []
+    for cache, mem, disk, miss in rows:
+        hits += [({"cache": cache, "tier": "memory"}, mem), ({"cache": cache, "tier": "disk"}, disk)]
+        misses.append(({"cache": cache}, max(miss, 0)))
+        lookups = mem + disk + max(miss, 0)
+        ratio.append(({"cache": cache}, round((mem + disk) / lookups, 4) if lookups else 0.0))
+    return (metrics.family("cache_hits_total", "counter", "Cache hits by tier.", hits)
+            + metrics.family("cache_misses_total", "counter", "Cache misses.", misses)
+            + metrics.family("cache_hit_ratio", "gauge", "Hits / lookups since start.", ratio))
+
+
+def _pools(request: Request) -> List[str]:
+    pools = {"tectonic": tex_compiler.stats(), "convert": converter.stats()}
+    scheduler = getattr(request.app.state, "llm_scheduler", None)
+    if scheduler is not None:
+        pools["llm"] = scheduler.stats()
+    return (metrics.family("queue_depth", "gauge", "Callers waiting for a slot.",
+                           [({"pool": p}, s["queue_depth"]) for p, s in pools.items()])
+            + metrics.family("in_flight", "gauge", "Calls currently running.",
+                             [({"pool": p}, s["in_flight"]) for p, s in pools.items()]))
+
+
+def _llm(request: Request) -> List[str]:
+    scheduler = getattr(request.app.state, "llm_scheduler", None)
+    if scheduler is None:
+        return []
+    s = scheduler.stats()
+    tokens = [({"model": model, "type": kind.replace("_tokens", "")}, n)
+              for model, counts in sorted(s["tokens_by_model"].items()) for kind, n in counts.items()]
+    calls = [({"outcome": k}, s["counters"][k]) for k in ("completed", "failed", "retries", "rate_limited")]
+    saved = [({"kind": kind}, v["tokens_saved"]) for kind, v in prompt_compactor.stats().items() if isinstance(v, dict)]
+    return (metrics.family("llm_tokens_total", "counter", "Tokens reported by the API, per model.", tokens)
+            + metrics.family("llm_calls_total", "counter", "Chat completion outcomes.", calls)
+            + metrics.family("llm_paused_seconds", "gauge", "Remaining shared rate-limit pause.",
+                             [({}, s["paused_for_s"])])
+            + metrics.family("prompt_tokens_saved_total", "counter", "Estimated input tokens removed by compaction.", saved))
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """
+    Prometheus text exposition: stage/request latency histograms, cache hit rates, queue
+    depths and LLM token counts. Values are for this worker process.
+    """
+    body = metrics.render([_caches(), _pools(request), _llm(request)])
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
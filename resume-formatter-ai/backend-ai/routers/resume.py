@@ -1,52 +1,92 @@
 # routers/resume.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
-import tempfile, os, logging
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, List, Optional, Union
+import os, json, logging, asyncio
 
-from openai import AsyncOpenAI
+from models.common import ParseFailure
+from models.jd import ParsedJD
+from models.resume import ParsedResume
 from utils import text_extractor
-from services import resume_parser, jd_parser
+from utils.uploads import open_upload
+from services import resume_parser, batch_runner
+from services.parse_cache import parse_cache
+from services import parsed_store
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/parse")
+# Seconds of silence before the stream endpoint sends a keep-alive ping
+STREAM_KEEPALIVE = float(os.getenv("PARSE_STREAM_KEEPALIVE", "15"))
+
+def _parse_mode(mode: str | None) -> str:
+    try:
+        return resume_parser.resolve_mode(mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class ParseMeta(BaseModel):
+    filename: str
+    has_prompt: bool
+    resume_id: Optional[str] = None
+    job_id: Optional[str] = None
+
+class ParseResponse(BaseModel):
+    # A failure is tried first: it needs `raw` and `error`, which a parse result never has
+    resume: Union[ParseFailure, ParsedResume] = Field(union_mode="left_to_right")
+    job: Union[ParseFailure, ParsedJD] = Field(union_mode="left_to_right")
+    meta: ParseMeta
+
+@router.post("/parse", response_model=ParseResponse)
 async def parse_resume_and_jd(
     request: Request,
     resume: UploadFile = File(...),
     jd_text: str = Form(...),
     prompt: str = Form(None),
+    no_cache: bool = Form(False),
+    mode: str = Form(None, description="full | hybrid | fast (default: PARSE_MODE)"),
 ):
-    tmp_path = None
+    mode = _parse_mode(mode)
+    jd_task = None
     try:
         client: AsyncOpenAI = request.app.state.openai_client
         if not client:
             raise HTTPException(status_code=500, detail="OpenAI client not configured")
 
-        # Save resume to temp
-        orig_filename = resume.filename or "resume"
-        orig_root, orig_ext = os.path.splitext(orig_filename)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=orig_ext or ".docx") as tmp:
-            tmp.write(await resume.read())
-            tmp_path = tmp.name
+        effective_jd_text = parsed_store.effective_jd_text(jd_text, prompt)
+
+        # Start the JD parse right away; it overlaps with upload handling,
+        # extraction and the resume LLM call below.
+        jd_task = asyncio.create_task(
+            parsed_store.resolve_job(effective_jd_text, client, use_cache=not no_cache)
+        )
 
-        # Extract text & parse resume
-        text = await text_extractor.extract_text(tmp_path, resume.content_type)
-        parsed_resume = await resume_parser.parse_resume(text, client)
+        # Check the spooled upload (size, real file type); it's read in place, not copied
+        orig_filename = resume.filename or "resume"
+        upload = await open_upload(resume)
 
-        # Merge tailoring prompt into JD text if provided
-        effective_jd_text = jd_text.strip()
-        if prompt and prompt.strip():
-            effective_jd_text += f"\n\n[TAILORING_INSTRUCTIONS]\n{prompt.strip()}"
+        # Extract text (off the event loop) & parse resume, unless this file was parsed before
+        resume_id, parsed_resume = await parsed_store.resolve_resume(
+            upload, client, mode, use_cache=not no_cache,
+            mime_type=resume.content_type, filename=orig_filename,
+        )
 
-        parsed_jd = await jd_parser.parse_jd(effective_jd_text, client)
+        job_id, parsed_jd = await jd_task
 
-        # Return structured JSON for frontend templates
+        # Return structured JSON for frontend templates; the ids let /format render
+        # this resume again without re-uploading or re-parsing it
         return {
             "resume": parsed_resume,
             "job": parsed_jd,
             "meta": {
                 "filename": orig_filename,
                 "has_prompt": bool(prompt and prompt.strip()),
+                "resume_id": resume_id,
+                "job_id": job_id,
             }
         }
 
@@ -56,8 +96,192 @@ async def parse_resume_and_jd(
         logger.exception("Error parsing resume/JD")
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except Exception:
-                logger.warning("Failed to remove temp file: %s", tmp_path)
+        if jd_task and not jd_task.done():
+            jd_task.cancel()
+
+
+@router.post("/parse/stream")
+async def parse_resume_and_jd_stream(
+    request: Request,
+    resume: UploadFile = File(...),
+    jd_text: str = Form(...),
+    prompt: str = Form(None),
+    no_cache: bool = Form(False),
+    mode: str = Form(None, description="full | hybrid | fast (default: PARSE_MODE)"),
+):
+    """
+    Streaming variant of /parse. Responds with NDJSON, one event per line, as work finishes:
+      {"event": "text", "chars": ..., "words": ...}
+      {"event": "job", "data": {...}}
+      {"event": "resume_field", "key": "name", "value": ...}   (one per top-level resume field)
+      {"event": "done", "resume": {...}, "job": {...}, "meta": {..., "resume_id": ..., "job_id": ...}}
+    Failures arrive as {"event": "error", "stage": ..., "detail": ...};
+    {"event": "ping"} is sent while idle so proxies don't drop the connection.
+    """
+    mode = _parse_mode(mode)
+    client: AsyncOpenAI = request.app.state.openai_client
+    if not client:
+        raise HTTPException(status_code=500, detail="OpenAI client not configured")
+
+    effective_jd_text = parsed_store.effective_jd_text(jd_text, prompt)
+    orig_filename = resume.filename or "resume"
+    content_type = resume.content_type
+    queue: asyncio.Queue = asyncio.Queue()
+
+    ids = {"resume_id": None, "job_id": None}
+
+    async def run_jd():
+        try:
+            ids["job_id"], job = await parsed_store.resolve_job(effective_jd_text, client, use_cache=not no_cache)
+            await queue.put({"event": "job", "data": job})
+            return job
+        except Exception as e:
+            logger.exception("Error parsing JD (stream)")
+            await queue.put({"event": "error", "stage": "job", "detail": str(e)})
+        finally:
+            await queue.put(None)
+
+    async def run_resume(upload):
+        try:
+            rid = parsed_store.resume_id(await asyncio.to_thread(parsed_store.file_sha256, upload), mode)
+            stored = await asyncio.to_thread(parsed_store.parsed_store.get, rid) if not no_cache else None
+            if stored is not None:
+                # parsed before: replay the stored fields, no extraction or LLM call
+                for field, value in stored.items():
+                    await queue.put({"event": "resume_field", "key": field, "value": value})
+                ids["resume_id"] = rid
+                return stored
+
+            text, layout = await text_extractor.extract_text_with_layout(upload, content_type)
+            await queue.put({"event": "text", "chars": len(text), "words": len(text.split())})
+            parsed = {}
+            async for field, value in resume_parser.parse_resume_stream(text, client, use_cache=not no_cache,
+                                                                          mode=mode, layout=layout):
+                parsed[field] = value
+                await queue.put({"event": "resume_field", "key": field, "value": value})
+            if await asyncio.to_thread(parsed_store.remember, rid, parsed, filename=orig_filename, mode=mode):
+                ids["resume_id"] = rid
+            return parsed
+        except Exception as e:
+            logger.exception("Error parsing resume (stream)")
+            await queue.put({"event": "error", "stage": "resume", "detail": str(e)})
+        finally:
+            await queue.put(None)
+
+    # JD starts before the upload is even checked
+    jd_task = asyncio.create_task(run_jd())
+    try:
+        upload = await open_upload(resume)
+    except BaseException:
+        jd_task.cancel()
+        raise
+    resume_task = asyncio.create_task(run_resume(upload))
+
+    async def events():
+        pending = 2
+        try:
+            while pending:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b'{"event": "ping"}\n'
+                    continue
+                if event is None:
+                    pending -= 1
+                    continue
+                yield (json.dumps(event) + "\n").encode("utf-8")
+
+            parsed_resume, parsed_jd = resume_task.result(), jd_task.result()
+            if parsed_resume is not None and parsed_jd is not None:
+                done = {
+                    "event": "done",
+                    "resume": parsed_resume,
+                    "job": parsed_jd,
+                    "meta": {
+                        "filename": orig_filename,
+                        "has_prompt": bool(prompt and prompt.strip()),
+                        **ids,
+                    },
+                }
+                yield (json.dumps(done) + "\n").encode("utf-8")
+        finally:
+            for t in (jd_task, resume_task):
+                if not t.done():
+                    t.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/parse/batch")
+async def parse_batch(
+    request: Request,
+    jd_text: str = Form(...),
+    prompt: str = Form(None),
+    resumes: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None, description="Zip of .pdf/.docx resumes"),
+    no_cache: bool = Form(False),
+    mode: str = Form(None, description="full | hybrid | fast (default: PARSE_MODE)"),
+):
+    """
+    Parse many resumes against one JD. The JD is parsed once; resumes are extracted and parsed
+    with bounded concurrency (BATCH_CONCURRENCY). Streams NDJSON events:
+      {"event": "batch", "batch_id": ..., "total": ...}
+      {"event": "job", "data": {...}, "job_id": ...}
+      {"event": "result", "index": ..., "filename": ..., "status": "ok", "resume": {...}, "match": {...}, "resume_id": ...}
+      {"event": "done", "ok": ..., "degraded": ..., "failed": ...,
+       "ranking": [{"index": ..., "filename": ..., "score": ..., "status": "ok" | "degraded"}, ...]}
+    The batch keeps running if the client disconnects. Reconnect with
+    GET /parse/batch/{batch_id}?offset=<events already received>, or re-upload the same files
+    to resume a batch interrupted by a restart (finished files are not re-parsed).
+    """
+    mode = _parse_mode(mode)
+    client: AsyncOpenAI = request.app.state.openai_client
+    if not client:
+        raise HTTPException(status_code=500, detail="OpenAI client not configured")
+    if not resumes and archive is None:
+        raise HTTPException(status_code=400, detail="Upload resumes or a zip archive.")
+
+    try:
+        job = await batch_runner.start_batch(
+            parsed_store.effective_jd_text(jd_text, prompt), resumes or [], archive, client,
+            use_cache=not no_cache, mode=mode,
+        )
+    except batch_runner.BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except batch_runner.BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        job.follow(),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": job.batch_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/parse/batch/{batch_id}")
+async def parse_batch_results(batch_id: str, offset: int = Query(0, ge=0)):
+    """
+    Replay a batch's events from `offset`, following it live if it is still running.
+    """
+    job = batch_runner.get_job(batch_id)
+    if job:
+        return StreamingResponse(job.follow(offset), media_type="application/x-ndjson",
+                                 headers={"X-Batch-Id": batch_id, "Cache-Control": "no-cache"})
+
+    lines = await asyncio.to_thread(batch_runner.replay_from_disk, batch_id, offset)
+    if lines is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return StreamingResponse((line + "\n" for line in lines), media_type="application/x-ndjson",
+                             headers={"X-Batch-Id": batch_id})
+
+
+@router.get("/parse/cache")
+async def parse_cache_stats():
+    """
+    Hit/miss counters for the LLM parse cache.
+    """
+    return parse_cache.stats()
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, HTTPException, Query, Request
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from pathlib import Path
-from typing import Optional, List
+from typing import Literal, Optional
 import os
 import math
+import stat
+import asyncio
 import mimetypes
 from datetime import datetime
 
+from services import saved_index
+from services.saved_index import CursorError, SAVED_PAGE_LIMIT, SAVED_PAGE_MAX
+from utils import http_cache
+
 router = APIRouter()
 
 def _root(request: Request) -> Path:
@@ -28,17 +34,18 @@ def _fmt_size(bytes_: int) -> str:
     s = round(bytes_ / p, 2)
     return f"{s} {units[i]}"
 
-def _file_info(p: Path, base: Path, request: Request) -> dict:
-    stat = p.stat()
-    rel_path = str(p.relative_to(base)).replace("\\", "/")
+def _index(request: Request) -> saved_index.SavedIndex:
+    return saved_index.get_index(str(_root(request)))
+
+def _file_info(row: dict) -> dict:
     return {
-        "name": p.name,
-        "path": rel_path,
-        "size_bytes": stat.st_size,
-        "size": _fmt_size(stat.st_size),
-        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        "is_dir": p.is_dir(),
-        "download_url": f"/api/saved/download?path={rel_path}" if p.is_file() else None,
+        "name": row["name"],
+        "path": row["path"],
+        "size_bytes": row["size"],
+        "size": _fmt_size(row["size"]),
+        "modified": datetime.fromtimestamp(row["mtime"]).isoformat(),
+        "is_dir": bool(row["is_dir"]),
+        "download_url": None if row["is_dir"] else f"/api/saved/download?path={row['path']}",
     }
 
 @router.get("/saved")
@@ -46,41 +53,87 @@ async def list_saved(
     request: Request,
     subdir: Optional[str] = Query(None, description="Subdirectory under ALLOWED_SAVE_ROOT"),
     pattern: Optional[str] = Query(None, description="Optional filename contains filter"),
+    prefix: Optional[str] = Query(None, description="Optional filename prefix filter"),
     include_dirs: bool = Query(False, description="Include directories in listing"),
+    sort: Literal["modified", "size", "name"] = Query("modified", description="Sort key"),
+    order: Literal["desc", "asc"] = Query("desc", description="Sort direction"),
+    limit: int = Query(SAVED_PAGE_LIMIT, ge=1, le=SAVED_PAGE_MAX, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """
-    List files saved under ALLOWED_SAVE_ROOT (optionally in a subdirectory).
+    List files saved under ALLOWED_SAVE_ROOT (optionally in a subdirectory), one page at a time.
+    Directories come first, then files; pass next_cursor back to get the following page.
+    Served from the saved-files index (services/saved_index.py), not a directory scan.
     """
     base = _root(request)
     target = _safe_resolve(request, subdir)
-    if not target.exists():
-        return {"root": str(base), "items": []}
-
-    items: List[dict] = []
-    for entry in target.iterdir():
-        if entry.is_dir() and not include_dirs:
-            continue
-        if pattern and pattern.lower() not in entry.name.lower():
-            continue
-        items.append(_file_info(entry, base, request))
-
-    # Sort: directories first, then files by modified desc
-    items.sort(key=lambda x: (not x["is_dir"], x["modified"]), reverse=True)
-    return {"root": str(base), "dir": str(target), "items": items}
-
-@router.get("/saved/download")
+    if not target.is_dir():
+        return {"root": str(base), "items": [], "next_cursor": None}
+
+    index = _index(request)
+    index.maybe_reconcile()
+    rel = "" if target == base else str(target.relative_to(base)).replace("\\", "/")
+
+    def _page():
+        index.refresh_dir(rel)
+        return index.list_dir(rel, include_dirs=include_dirs, sort=sort, order=order,
+                              prefix=prefix, pattern=pattern, limit=limit, cursor=cursor)
+    try:
+        rows, next_cursor = await asyncio.to_thread(_page)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"root": str(base), "dir": str(target), "items": [_file_info(r) for r in rows],
+            "next_cursor": next_cursor}
+
+@router.post("/saved/reindex")
+async def reindex_saved(request: Request):
+    """
+    Run a full reconcile of the saved-files index now and report what changed.
+    """
+    index = _index(request)
+    stats = await asyncio.to_thread(index.reconcile)
+    return {"entries": await asyncio.to_thread(index.count), **stats}
+
+@router.api_route("/saved/download", methods=["GET", "HEAD"])
 async def download_saved(request: Request, path: str = Query(..., description="Path relative to ALLOWED_SAVE_ROOT")):
     """
     Download a single saved file (must be within ALLOWED_SAVE_ROOT).
+    Sends strong ETag / Last-Modified validators and answers If-None-Match / If-Modified-Since
+    with 304; byte ranges (Range / If-Range) are served for PDF viewers. Clients that accept
+    gzip get a precompressed copy of .tex/.docx files (utils/http_cache.py).
     """
-    base = _root(request)
     target = _safe_resolve(request, path)
-    if not target.exists() or not target.is_file():
+    try:
+        st = await asyncio.to_thread(os.stat, target)
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found.")
+    if not stat.S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="File not found.")
 
     media_type, _ = mimetypes.guess_type(target.name)
-    headers = {"Content-Disposition": f'attachment; filename="{target.name}"'}
-    return FileResponse(path=str(target), media_type=media_type or "application/octet-stream", headers=headers)
+    etag = await asyncio.to_thread(http_cache.file_etag, str(target), st)
+    send_path, send_stat, encoding = str(target), st, None
+    if http_cache.accepts_gzip(request.headers):
+        gz = await asyncio.to_thread(http_cache.gzip_variant, str(target), etag, st)
+        if gz:
+            send_path, send_stat, encoding = gz, await asyncio.to_thread(os.stat, gz), "gzip"
+            etag = http_cache.variant_etag(etag, "gzip")
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_cache.last_modified(st),
+        "Cache-Control": http_cache.cache_control(),
+        "Vary": "Accept-Encoding",
+    }
+    if http_cache.not_modified(request.headers, etag, st):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{target.name}"'
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path=send_path, media_type=media_type or "application/octet-stream",
+                        headers=headers, stat_result=send_stat)
 
 @router.delete("/saved")
 async def delete_saved(request: Request, path: str = Query(..., description="File path relative to ALLOWED_SAVE_ROOT")):
@@ -92,6 +145,7 @@ async def delete_saved(request: Request, path: str = Query(..., description="Fil
         raise HTTPException(status_code=404, detail="File not found.")
     try:
         target.unlink()
+        await asyncio.to_thread(_index(request).forget, str(target))
         return JSONResponse({"deleted": path})
     except PermissionError:
         raise HTTPException(status_code=403, detail="Permission denied.")
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from utils import prompt_compactor
+from services import latex_renderer
+from services.tex_compiler import tex_compiler
+from utils.file_converter import converter
+
+router = APIRouter()
+
+@router.get("/llm/status")
+async def llm_status(request: Request):
+    """
+    Live LLM scheduler state: queue depth, in-flight calls, RPM/TPM budget usage and token counts,
+    plus input tokens saved by prompt compaction.
+    """
+    scheduler = getattr(request.app.state, "llm_scheduler", None)
+    if scheduler is None:
+        return {"enabled": False, "compaction": prompt_compactor.stats()}
+    return {"enabled": True, **scheduler.stats(), "compaction": prompt_compactor.stats()}
+
+
+@router.get("/tex/status")
+async def tex_status():
+    """
+    Tectonic compile pool: queue depth, in-flight compiles, PDF cache hits and compile times,
+    plus rendered-TeX cache counters.
+    """
+    return {**tex_compiler.stats(), "render_cache": latex_renderer.render_cache_stats()}
+
+
+@router.get("/convert/status")
+async def convert_status():
+    """
+    DOCX -> PDF conversion pool: queue depth, in-flight conversions, cache hits and timings.
+    """
+    return converter.stats()
+
+
+@router.get("/health")
+async def health():
+    """
+    Liveness: the process is up and serving.
+    """
+    return {"ok": True}
+
+@router.get("/ready")
+async def ready(request: Request):
+    """
+    Readiness: 200 once start-up warm-up (STARTUP_WARMUP) has finished, 503 before that.
+    """
+    state = request.app.state
+    body = {"ready": bool(getattr(state, "ready", False)), "warmup": getattr(state, "warmup", {})}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
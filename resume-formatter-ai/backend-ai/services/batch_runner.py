@@ -0,0 +1,371 @@
+# services/batch_runner.py
+import os, json, time, shutil, asyncio, hashlib, logging, tempfile, zipfile
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from fastapi import UploadFile
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+from utils import text_extractor
+from . import resume_parser, parsed_store
+from .formatter_overleaf_modern import score_resume
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable)
+BATCH_DIR            = os.getenv("BATCH_DIR", "./.batches")
+BATCH_CONCURRENCY    = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_FILES      = int(os.getenv("BATCH_MAX_FILES", "5000"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(20 * 1024 * 1024)))
+BATCH_MAX_TOTAL_BYTES = int(os.getenv("BATCH_MAX_TOTAL_BYTES", str(512 * 1024 * 1024)))   # all files, zip contents included
+BATCH_TTL            = float(os.getenv("BATCH_TTL", str(7 * 24 * 3600)))   # seconds since last write, 0 = forever
+BATCH_KEEPALIVE      = float(os.getenv("BATCH_KEEPALIVE", "15"))
+BATCH_KEEP_FINISHED  = 32     # finished jobs kept in memory for fast replay
+
+SUPPORTED_EXTS = (".pdf", ".docx")
+_CHUNK = 1024 * 1024
+
+
+class BatchError(ValueError):
+    pass
+
+class BatchTooLarge(BatchError):
+    pass
+
+
+# ---------------- Upload staging ----------------
+
+def _stage_bytes_from(src, dest_dir: str, ext: str, budget: Optional[int] = None) -> tuple[str, str, int]:
+    """
+    Copy a binary stream into dest_dir as <sha256><ext>, enforcing BATCH_MAX_FILE_BYTES and,
+    if given, the bytes left in the batch's budget. Returns (sha256, path, size).
+    """
+    h, size = hashlib.sha256(), 0
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = src.read(_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > BATCH_MAX_FILE_BYTES or (budget is not None and size > budget):
+                out.close()
+                os.remove(tmp_path)
+                if size > BATCH_MAX_FILE_BYTES:
+                    raise BatchError(f"File exceeds {BATCH_MAX_FILE_BYTES} bytes")
+                raise BatchTooLarge(f"Batch exceeds {BATCH_MAX_TOTAL_BYTES} bytes")
+            h.update(chunk)
+            out.write(chunk)
+    digest = h.hexdigest()
+    path = os.path.join(dest_dir, f"{digest}{ext}")
+    os.replace(tmp_path, path)
+    return digest, path, size
+
+def _stage_archive(archive_path: str, dest_dir: str, budget: int) -> List[dict]:
+    inputs = []
+    with zipfile.ZipFile(archive_path) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            base = os.path.basename(name)
+            ext = os.path.splitext(base)[1].lower()
+            if info.is_dir() or name.startswith("__MACOSX/") or base.startswith(".") or ext not in SUPPORTED_EXTS:
+                continue
+            if info.file_size > BATCH_MAX_FILE_BYTES:
+                raise BatchError(f"{name}: file exceeds {BATCH_MAX_FILE_BYTES} bytes")
+            # declared sizes can lie; the copy counts the real bytes against the budget
+            with zf.open(info) as src:
+                digest, path, size = _stage_bytes_from(src, dest_dir, ext, budget)
+            budget -= size
+            inputs.append({"filename": name, "file_hash": digest, "path": path})
+    return inputs
+
+async def stage_uploads(
+    resumes: List[UploadFile], archive: Optional[UploadFile], staging_dir: str
+) -> List[dict]:
+    """
+    Copy every uploaded resume (and every .pdf/.docx inside an optional zip) into staging_dir,
+    at most BATCH_MAX_TOTAL_BYTES in all.
+    """
+    inputs: List[dict] = []
+    budget = BATCH_MAX_TOTAL_BYTES
+    for up in resumes or []:
+        name = up.filename or "resume"
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in SUPPORTED_EXTS:
+            raise BatchError(f"Unsupported file type: {name}")
+        await up.seek(0)
+        digest, path, size = await asyncio.to_thread(_stage_bytes_from, up.file, staging_dir, ext, budget)
+        budget -= size
+        inputs.append({"filename": name, "file_hash": digest, "path": path})
+
+    if archive is not None:
+        await archive.seek(0)
+        _, zip_path, _ = await asyncio.to_thread(_stage_bytes_from, archive.file, staging_dir, ".zip")
+        try:
+            inputs.extend(await asyncio.to_thread(_stage_archive, zip_path, staging_dir, budget))
+        except zipfile.BadZipFile:
+            raise BatchError("Archive is not a valid zip file")
+        finally:
+            await asyncio.to_thread(os.remove, zip_path)
+
+    if not inputs:
+        raise BatchError("No .pdf or .docx resumes found in the upload")
+    if len(inputs) > BATCH_MAX_FILES:
+        raise BatchError(f"Too many files ({len(inputs)} > {BATCH_MAX_FILES})")
+    return inputs
+
+def make_batch_id(jd_text: str, inputs: List[dict], mode: str = "full") -> str:
+    h = hashlib.sha256(jd_text.encode("utf-8"))
+    if mode != "full":
+        h.update(b"\x00mode=" + mode.encode("ascii"))
+    for item in sorted(inputs, key=lambda i: (i["filename"], i["file_hash"])):
+        h.update(b"\x00" + item["filename"].encode("utf-8") + b"\x00" + item["file_hash"].encode("ascii"))
+    return h.hexdigest()[:24]
+
+
+# ---------------- Job ----------------
+
+class BatchJob:
+    """
+    One batch run. Events are appended to <BATCH_DIR>/<id>/results.ndjson as they happen,
+    so a dropped client can replay from any offset and a re-upload after a restart
+    only re-parses the files that have no successful result yet.
+    """
+
+    def __init__(self, batch_id: str, root: str, jd_text: str, inputs: List[dict], use_cache: bool = True,
+                 mode: str = "full"):
+        self.batch_id = batch_id
+        self.root = root
+        self.jd_text = jd_text
+        self.inputs = inputs
+        self.use_cache = use_cache
+        self.mode = mode
+        self.events: List[str] = []
+        self.finished = False
+        self.task: Optional[asyncio.Task] = None
+        self._cond = asyncio.Condition()
+        self._write_lock = asyncio.Lock()   # FIFO, so the file keeps the order of self.events
+
+    @property
+    def results_path(self) -> str:
+        return os.path.join(self.root, "results.ndjson")
+
+    def _load_previous(self) -> Dict[tuple, dict]:
+        done = {}
+        try:
+            with open(self.results_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ev = json.loads(line)
+                    except ValueError:
+                        continue   # torn last line from a crash
+                    if ev.get("event") == "result" and ev.get("status") == "ok":
+                        done[(ev["filename"], ev["file_hash"])] = ev
+        except FileNotFoundError:
+            pass
+        return done
+
+    def _append(self, line: str) -> None:
+        with open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _truncate(self) -> None:
+        open(self.results_path, "w").close()
+
+    async def _emit(self, event: dict) -> None:
+        line = json.dumps(event)
+        self.events.append(line)
+        async with self._write_lock:
+            await asyncio.to_thread(self._append, line)
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def run(self, client: "AsyncOpenAI") -> None:
+        try:
+            previous = await asyncio.to_thread(self._load_previous)
+            # Start a fresh log; successful results from earlier runs are re-emitted below
+            await asyncio.to_thread(self._truncate)
+
+            await self._emit({"event": "batch", "batch_id": self.batch_id, "total": len(self.inputs),
+                              "resumed": len(previous)})
+
+            # The JD is parsed exactly once per batch
+            job_id, jd = await parsed_store.resolve_job(self.jd_text, client, use_cache=self.use_cache)
+            await self._emit({"event": "job", "data": jd, "job_id": job_id})
+
+            # Keyed by upload position: several files can share a name ("resume.pdf")
+            results: Dict[int, dict] = {}
+            todo = []
+            for index, item in enumerate(self.inputs):
+                prior = previous.get((item["filename"], item["file_hash"]))
+                if prior:
+                    await self._emit({**prior, "index": index, "resumed": True})
+                    results[index] = {"index": index, "filename": item["filename"],
+                                      "score": prior["match"]["score"], "status": "ok"}
+                else:
+                    todo.append((index, item))
+
+            sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+            async def one(index: int, item: dict) -> None:
+                async with sem:
+                    ev = {"event": "result", "index": index, "filename": item["filename"], "file_hash": item["file_hash"]}
+                    try:
+                        text, layout = await text_extractor.extract_text_with_layout(item["path"], "application/octet-stream")
+                        parsed = await resume_parser.parse_resume(text, client, use_cache=self.use_cache,
+                                                                  mode=self.mode, layout=layout)
+                        if parsed.get("error"):
+                            raise ValueError(parsed["error"])
+                        match = score_resume(parsed, jd)
+                        # degraded (local-only) results are reported but re-parsed when the batch is resumed
+                        status = "degraded" if parsed.get("degraded") else "ok"
+                        results[index] = {"index": index, "filename": item["filename"],
+                                          "score": match["score"], "status": status}
+                        ev.update({"status": status, "resume": parsed, "match": match})
+                        # stored under the same id /parse would give this file, for /format
+                        rid = parsed_store.resume_id(item["file_hash"], self.mode)
+                        if await asyncio.to_thread(parsed_store.remember, rid, parsed,
+                                                   filename=item["filename"], mode=self.mode):
+                            ev["resume_id"] = rid
+                    except Exception as e:
+                        logger.warning("Batch %s: failed on %s: %s", self.batch_id, item["filename"], e)
+                        ev.update({"status": "error", "detail": str(e)})
+                    await self._emit(ev)
+
+            await asyncio.gather(*(one(i, item) for i, item in todo))
+
+            ranking = sorted(results.values(), key=lambda r: (-r["score"], r["index"]))
+            degraded = sum(1 for r in ranking if r["status"] == "degraded")
+            await self._emit({
+                "event": "done",
+                "batch_id": self.batch_id,
+                "total": len(self.inputs),
+                "ok": len(ranking) - degraded,
+                "degraded": degraded,
+                "failed": len(self.inputs) - len(ranking),
+                "ranking": ranking,
+            })
+        except Exception as e:
+            logger.exception("Batch %s failed", self.batch_id)
+            await self._emit({"event": "error", "detail": str(e)})
+        finally:
+            self.finished = True
+            async with self._cond:
+                self._cond.notify_all()
+
+    async def follow(self, offset: int = 0) -> AsyncIterator[bytes]:
+        """
+        Yield NDJSON lines from event number `offset`, waiting for new ones until the job finishes.
+        Keep-alive pings are not counted in offsets.
+        """
+        i = offset
+        while True:
+            while i < len(self.events):
+                yield (self.events[i] + "\n").encode("utf-8")
+                i += 1
+            if self.finished:
+                return
+            async with self._cond:
+                if i >= len(self.events) and not self.finished:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout=BATCH_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        yield b'{"event": "ping"}\n'
+
+
+# ---------------- Registry ----------------
+
+_jobs: Dict[str, BatchJob] = {}
+
+def _prune() -> None:
+    finished = [bid for bid, job in _jobs.items() if job.finished]
+    for bid in finished[:-BATCH_KEEP_FINISHED]:
+        del _jobs[bid]
+
+def _sweep(running: set) -> List[str]:
+    """
+    Delete batch directories (and leftover staging dirs) not written to for BATCH_TTL seconds.
+    Batches in `running` are kept whatever their age. Returns the removed batch ids.
+    """
+    if BATCH_TTL <= 0:
+        return []
+    cutoff = time.time() - BATCH_TTL
+    removed = []
+    try:
+        names = os.listdir(BATCH_DIR)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        root = os.path.join(BATCH_DIR, name)
+        if name in running or not os.path.isdir(root):
+            continue
+        try:
+            # results.ndjson is appended to on every event; a staging dir only has its own mtime
+            last = max(os.path.getmtime(p) for p in (root, os.path.join(root, "results.ndjson"))
+                       if os.path.exists(p))
+        except (OSError, ValueError):
+            continue
+        if last < cutoff:
+            shutil.rmtree(root, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+def _move_inputs(inputs: List[dict], input_dir: str) -> None:
+    os.makedirs(input_dir, exist_ok=True)
+    for item in inputs:
+        dest = os.path.join(input_dir, os.path.basename(item["path"]))
+        if not os.path.exists(dest):
+            os.replace(item["path"], dest)
+        item["path"] = dest
+
+async def start_batch(
+    jd_text: str,
+    resumes: List[UploadFile],
+    archive: Optional[UploadFile],
+    client: "AsyncOpenAI",
+    use_cache: bool = True,
+    mode: str = "full",
+) -> BatchJob:
+    """
+    Stage uploads, then start (or join) the batch identified by the JD text and file contents.
+    """
+    await asyncio.to_thread(os.makedirs, BATCH_DIR, exist_ok=True)
+    running = {bid for bid, job in _jobs.items() if not job.finished}
+    for bid in await asyncio.to_thread(_sweep, running):
+        _jobs.pop(bid, None)
+    staging_dir = await asyncio.to_thread(tempfile.mkdtemp, dir=BATCH_DIR, prefix=".staging-")
+    try:
+        inputs = await stage_uploads(resumes, archive, staging_dir)
+        batch_id = make_batch_id(jd_text, inputs, mode)
+
+        running = _jobs.get(batch_id)
+        if running and not running.finished:
+            return running
+
+        root = os.path.join(BATCH_DIR, batch_id)
+        await asyncio.to_thread(_move_inputs, inputs, os.path.join(root, "inputs"))
+    finally:
+        await asyncio.to_thread(shutil.rmtree, staging_dir, True)
+
+    job = BatchJob(batch_id, root, jd_text, inputs, use_cache=use_cache, mode=mode)
+    _jobs[batch_id] = job
+    _prune()
+    # Runs independently of the HTTP connection so a dropped client doesn't stop the batch
+    job.task = asyncio.create_task(job.run(client))
+    return job
+
+def get_job(batch_id: str) -> Optional[BatchJob]:
+    return _jobs.get(batch_id)
+
+def replay_from_disk(batch_id: str, offset: int = 0) -> Optional[List[str]]:
+    """
+    Stored events for a batch that is no longer in memory (e.g. after a restart).
+    """
+    if not batch_id.isalnum():
+        return None
+    path = os.path.join(BATCH_DIR, batch_id, "results.ndjson")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line.strip()][offset:]
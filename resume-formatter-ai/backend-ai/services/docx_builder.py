@@ -0,0 +1,177 @@
+# services/docx_builder.py
+"""
+Prototype-based DOCX builder for services/formatter.
+
+python-docx's Document() unzips and parses its base template (a 400+ KB styles.xml) for every
+document, and each add_paragraph() looks its style up by name. Here the base template
+(DOCX_TEMPLATE_PATH, default: python-docx's own) is loaded once into a DocxPrototype:
+- every part except word/document.xml is packed into an in-memory zip once
+- paragraph style names are resolved to style ids once, on first use
+- a new document clones that zip from bytes and appends only its own document.xml
+
+The API mirrors the python-docx calls the formatter used (add_heading, add_paragraph with a
+style name), and any body content already in the template is kept above the new paragraphs.
+"""
+import os, re, logging, threading, zipfile
+import importlib.util
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+logger = logging.getLogger(__name__)
+
+DOCX_TEMPLATE_PATH = os.getenv("DOCX_TEMPLATE_PATH", "")   # "" = python-docx's default template
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_DOCUMENT_PART = "word/document.xml"
+
+# XML 1.0 can't carry most C0 controls; python-docx would raise on them
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_RUN_BREAKS = re.compile(r"(\t|\r\n|\n|\r)")
+
+
+def default_template_path() -> str:
+    """
+    python-docx's bundled default.docx, located without importing python-docx.
+    """
+    spec = importlib.util.find_spec("docx")
+    if spec is None or not spec.submodule_search_locations:
+        raise RuntimeError("python-docx is not installed and DOCX_TEMPLATE_PATH is not set")
+    return os.path.join(list(spec.submodule_search_locations)[0], "templates", "default.docx")
+
+
+class DocxPrototype:
+    def __init__(self, template_bytes: bytes):
+        with zipfile.ZipFile(BytesIO(template_bytes)) as src:
+            document_xml = src.read(_DOCUMENT_PART).decode("utf-8")
+            styles_xml = src.read("word/styles.xml") if "word/styles.xml" in src.namelist() else b""
+            # every part except document.xml, with its original compression
+            out = BytesIO()
+            with zipfile.ZipFile(out, "w") as dst:
+                for info in src.infolist():
+                    if info.filename != _DOCUMENT_PART:
+                        dst.writestr(info, src.read(info), compress_type=info.compress_type)
+        self._package = out.getvalue()
+
+        prefix = re.search(r'xmlns:(\w+)="%s"' % re.escape(_W_NS), document_xml)
+        if prefix is None:
+            raise ValueError("base template's document.xml does not declare the WordprocessingML namespace")
+        self.w = w = prefix.group(1)
+
+        # Split document.xml around the insertion point: before the body-level sectPr if there
+        # is one (it must stay last), else before </w:body>
+        body_end = document_xml.rfind(f"</{w}:body>")
+        if body_end == -1:
+            raise ValueError("base template's document.xml has no body")
+        sect = document_xml.rfind(f"<{w}:sectPr", 0, body_end)
+        last_para = document_xml.rfind(f"</{w}:p>", 0, body_end)
+        insert_at = sect if sect != -1 and sect > last_para else body_end
+        self._head, self._tail = document_xml[:insert_at], document_xml[insert_at:]
+
+        self._style_names = self._paragraph_styles(styles_xml)
+        self._ppr: Dict[Optional[str], str] = {None: ""}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = "") -> "DocxPrototype":
+        path = path or default_template_path()
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    @staticmethod
+    def _paragraph_styles(styles_xml: bytes) -> Dict[str, str]:
+        """
+        Lower-cased style name -> style id for the template's paragraph styles. Word stores
+        built-ins as "heading 1" while python-docx calls them "Heading 1", hence the lower().
+        """
+        if not styles_xml:
+            return {}
+        names = {}
+        q = lambda tag: f"{{{_W_NS}}}{tag}"
+        for style in ET.fromstring(styles_xml).iter(q("style")):
+            if style.get(q("type")) != "paragraph":
+                continue
+            name = style.find(q("name"))
+            if name is not None and style.get(q("styleId")):
+                names[name.get(q("val"), "").lower()] = style.get(q("styleId"))
+        return names
+
+    def paragraph_props(self, style: Optional[str]) -> str:
+        """
+        <w:pPr> for a style name, resolved once per prototype.
+        """
+        ppr = self._ppr.get(style)
+        if ppr is None:
+            style_id = self._style_names.get(style.lower())
+            if style_id is None:
+                logger.warning("DOCX template has no paragraph style %r; using the default", style)
+                ppr = ""
+            else:
+                w, val = self.w, escape(style_id, {'"': "&quot;"})
+                ppr = f'<{w}:pPr><{w}:pStyle {w}:val="{val}"/></{w}:pPr>'
+            with self._lock:
+                self._ppr[style] = ppr
+        return ppr
+
+    def new(self) -> "DocxDocument":
+        return DocxDocument(self)
+
+    def package(self, body_xml: str) -> bytes:
+        """
+        A copy of the template with body_xml appended to its body.
+        """
+        bio = BytesIO(self._package)
+        with zipfile.ZipFile(bio, "a", compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr(_DOCUMENT_PART, self._head + body_xml + self._tail)
+        return bio.getvalue()
+
+
+class DocxDocument:
+    """
+    A document being built from a prototype; call to_bytes() for the .docx.
+    """
+
+    def __init__(self, prototype: DocxPrototype):
+        self._proto = prototype
+        self._parts: List[str] = []
+
+    def _runs(self, text: str) -> str:
+        # same mapping as python-docx's run.text: tabs -> <w:tab/>, line breaks -> <w:br/>
+        w = self._proto.w
+        out = []
+        for piece in _RUN_BREAKS.split(_INVALID_XML.sub("", text)):
+            if piece == "\t":
+                out.append(f"<{w}:tab/>")
+            elif piece in ("\r\n", "\n", "\r"):
+                out.append(f"<{w}:br/>")
+            elif piece:
+                out.append(f'<{w}:t xml:space="preserve">{escape(piece)}</{w}:t>')
+        return f"<{w}:r>{''.join(out)}</{w}:r>" if out else ""
+
+    def add_paragraph(self, text: str = "", style: Optional[str] = None) -> None:
+        w = self._proto.w
+        self._parts.append(f"<{w}:p>{self._proto.paragraph_props(style)}{self._runs(str(text or ''))}</{w}:p>")
+
+    def add_heading(self, text: str = "", level: int = 1) -> None:
+        if not 0 <= level <= 9:
+            raise ValueError("level must be in range 0-9, got %d" % level)
+        self.add_paragraph(text, "Title" if level == 0 else f"Heading {level}")
+
+    def to_bytes(self) -> bytes:
+        return self._proto.package("".join(self._parts))
+
+
+_prototype: Optional[DocxPrototype] = None
+_prototype_lock = threading.Lock()
+
+def get_prototype() -> DocxPrototype:
+    """
+    The shared prototype for DOCX_TEMPLATE_PATH, loaded on first use.
+    """
+    global _prototype
+    if _prototype is None:
+        with _prototype_lock:
+            if _prototype is None:
+                _prototype = DocxPrototype.load(DOCX_TEMPLATE_PATH)
+    return _prototype
@@ -1,71 +1,26 @@
-from typing import Tuple, Optional
-from io import BytesIO
-import os
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Optional
+import asyncio, logging
 
-from docx import Document
-from openai import AsyncOpenAI
+from utils.file_converter import convert_to_pdf, ConversionError
+from utils.metrics import span
+from .docx_builder import get_prototype
+from .skill_index import group_skills
 
-from utils.file_converter import convert_to_pdf
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 # Content types
 DOCX_MT = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
 PDF_MT  = "application/pdf"
 
-# ---------------- Skill Grouping ----------------
-def _group_skills(skills: list[str]) -> list[dict]:
-    """
-    Auto-group a flat list of skills into common categories.
-    """
-    groups = {
-        "Frontend": ["html", "css", "javascript", "typescript", "react", "angular", "vue"],
-        "Backend": ["java", "python", "go", "c#", "node", "php", "spring", "django", "flask"],
-        "Frameworks": ["spring boot", "express", "hibernate", "jpa", "next.js", "fastapi"],
-        "Databases": ["mysql", "postgres", "mongodb", "oracle", "sqlite", "redis", "dynamodb"],
-        "Tools": ["git", "docker", "kubernetes", "maven", "gradle", "postman", "vscode", "intellij"],
-        "Concepts": ["oop", "object-oriented", "microservices", "algorithms", "data structures", "ci/cd", "agile"],
-    }
-
-    result = []
-    if not skills:
-        return result
-
-    for label, keywords in groups.items():
-        found = [s for s in skills if any(k in s.lower() for k in keywords)]
-        if found:
-            result.append({"label": label, "items": found})
-
-    # Leftover uncategorized skills
-    categorized = {s for g in result for s in g["items"]}
-    leftover = [s for s in skills if s not in categorized]
-    if leftover:
-        result.append({"label": "Other", "items": leftover})
-
-    return result
-
-
 # ---------------- Resume Builder ----------------
-async def build_resume(
-    resume: dict,
-    jd: dict,
-    format: str = "docx",
-    client: Optional[AsyncOpenAI] = None
-) -> bytes:
+def _compose(doc, resume: dict) -> None:
     """
-    Build a tailored resume as DOCX in memory.
-    If format='pdf', convert the DOCX to PDF via utils.file_converter.convert_to_pdf.
-
-    Skills are grouped into categories (Frontend, Backend, Frameworks, Databases, Tools, Concepts).
+    Write the resume sections into doc (a docx_builder.DocxDocument; a python-docx
+    Document works too, the calls are the same).
     """
-
-    # Defensive defaults
-    if not isinstance(resume, dict):
-        resume = {}
-    if not isinstance(jd, dict):
-        jd = {}
-
-    # --- Build DOCX in memory ---
-    doc = Document()
-
     # Header
     name = resume.get("name", "Candidate Name")
     email = resume.get("email", "")
@@ -87,7 +42,7 @@ async def build_resume(
 
     # Skills (grouped)
     skills = resume.get("skills", []) or []
-    skills_groups = _group_skills(skills)
+    skills_groups = group_skills(skills)
 
     if skills_groups:
         doc.add_heading("Skills", level=1)
@@ -123,11 +78,12 @@ async def build_resume(
                 line = f"{line} ({dates})" if line else dates
             if line:
                 doc.add_paragraph(line)
-            details = edu.get("details", [])
-            # optional details list support
-            all_details =  details
-            doc.add_paragraph(all_details, style="List Bullet")
-
+            # optional details: a list of lines or a single string
+            details = edu.get("details") or []
+            if isinstance(details, str):
+                details = [details]
+            for d in details:
+                doc.add_paragraph(str(d), style="List Bullet")
 
     # Projects 
     projects = resume.get("projects", []) or []
@@ -154,16 +110,61 @@ async def build_resume(
         for a in achievements:
             doc.add_paragraph(str(a), style="List Bullet")
 
-    # Save DOCX to memory
-    bio = BytesIO()
-    doc.save(bio)
-    docx_bytes = bio.getvalue()
 
-    # Convert to PDF if requested
-    if str(format).lower() == "pdf":
-        return await convert_to_pdf(docx_bytes)
+def render_docx(resume: dict, jd: dict) -> bytes:
+    """
+    The tailored resume as DOCX bytes, built from the shared base-template prototype.
+    """
+    # Defensive defaults
+    if not isinstance(resume, dict):
+        resume = {}
+    if not isinstance(jd, dict):
+        jd = {}
 
-    return docx_bytes
+    with span("docx_render"):
+        doc = get_prototype().new()
+        _compose(doc, resume)
+        return doc.to_bytes()
+
+
+async def build_resume(
+    resume: dict,
+    jd: dict,
+    format: str = "docx",
+    client: Optional["AsyncOpenAI"] = None
+) -> bytes:
+    """
+    Build a tailored resume as DOCX in memory.
+    If format='pdf', convert the DOCX to PDF via utils.file_converter.convert_to_pdf
+    (raises ConversionError if that fails).
+
+    Skills are grouped into categories (Frontend, Backend, Frameworks, Databases, Tools, Concepts).
+    """
+    with span("build_resume"):
+        docx_bytes = render_docx(resume, jd)
+
+        # Convert to PDF if requested
+        if str(format).lower() == "pdf":
+            return await convert_to_pdf(docx_bytes)
+
+        return docx_bytes
+
+
+async def build_resumes(
+    items: Iterable[Tuple[dict, dict]],
+    format: str = "docx",
+    client: Optional["AsyncOpenAI"] = None
+) -> List[bytes]:
+    """
+    Batch version of build_resume for (resume, jd) pairs, in order. The DOCX builds run in one
+    worker thread so a large batch doesn't hold up the event loop; PDF conversions go through
+    the converter pool concurrently. Raises ConversionError if any conversion fails.
+    """
+    items = list(items)
+    docs = await asyncio.to_thread(lambda: [render_docx(r, j) for r, j in items])
+    if str(format).lower() == "pdf":
+        return list(await asyncio.gather(*(convert_to_pdf(d) for d in docs)))
+    return docs
 
 
 # ---------------- Shim for backward compatibility ----------------
@@ -173,17 +174,18 @@ async def update_resume_to_match_jd(
     original_path: str,
     original_ext: str,
     original_content_type: Optional[str],
-    client: Optional[AsyncOpenAI]
+    client: Optional["AsyncOpenAI"]
 ) -> Tuple[bytes, str, str]:
     """
     Compatibility shim.
-    Produces DOCX or PDF with grouped skills.
+    Produces DOCX or PDF with grouped skills. If PDF conversion fails the DOCX is
+    returned instead, labelled as DOCX.
     """
-    ext = (original_ext or "").lower()
-    if ext == ".pdf":
-        fmt = "pdf"; media_type = PDF_MT; out_ext = ".pdf"
-    else:
-        fmt = "docx"; media_type = DOCX_MT; out_ext = ".docx"
-
-    file_bytes = await build_resume(parsed_resume, parsed_jd, format=fmt, client=client)
-    return file_bytes, media_type, out_ext
+    docx_bytes = await build_resume(parsed_resume, parsed_jd, format="docx", client=client)
+    if (original_ext or "").lower() != ".pdf":
+        return docx_bytes, DOCX_MT, ".docx"
+    try:
+        return await convert_to_pdf(docx_bytes), PDF_MT, ".pdf"
+    except ConversionError as e:
+        logger.warning("PDF conversion failed, returning DOCX: %s", e)
+        return docx_bytes, DOCX_MT, ".docx"
@@ -1,24 +1,45 @@
 # services/formatter_overleaf_modern.py
-import os, json, re
-from typing import List, Tuple, Optional
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING, Tuple, Optional
+from utils.text_normalizer import normalize_gpa_line, normalize_dates
+from utils.metrics import span
 from .latex_renderer import render_tex_or_pdf
+from .skill_index import JDMatcher, group_skills, jd_matcher
+from .relevance import tailor
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-def _score_experience(exp: dict, jd_skills: List[str]) -> int:
-    s, jd_lower = 0, [x.lower() for x in (jd_skills or [])]
+
+def _score_experience(exp: dict, matcher: JDMatcher) -> int:
+    s = 0
     for field in [exp.get("title",""), exp.get("company",""), exp.get("location","")]:
-        fl = str(field).lower()
-        s += sum(1 for js in jd_lower if js in fl)
+        s += matcher.count(field)
     for b in exp.get("bullets", []) or []:
-        bl = str(b).lower()
-        s += sum(1 for js in jd_lower if js in bl)
+        s += matcher.count(b)
     return s
 
-def _reorder_experience(exps: List[dict], jd_skills: List[str]) -> List[dict]:
-    return sorted(exps or [], key=lambda e: _score_experience(e, jd_skills), reverse=True)
+def score_resume(resume: dict, jd: dict) -> dict:
+    """
+    JD match score for ranking: _score_experience hits across all roles
+    plus the number of required JD skills found in the resume's skill list.
+    """
+    jd_skills = (jd or {}).get("skills_required", []) or []
+    matcher = jd_matcher(jd_skills)
+    exp_hits = sum(_score_experience(e or {}, matcher) for e in (resume or {}).get("experience", []) or [])
+    found = set()
+    for have in (resume or {}).get("skills", []) or []:
+        found |= matcher.matched(have)
+    matched = [js for i, js in enumerate(jd_skills) if i in found]
+    missing = [js for js in jd_skills if js not in matched]
+    return {
+        "score": exp_hits + len(matched),
+        "experience_hits": exp_hits,
+        "skills_matched": matched,
+        "skills_missing": missing,
+    }
 
 def _trim_one_page(education, experience, projects, skills_groups, skills_list, certifications):
+    # Roles, projects and their bullets arrive ranked by JD relevance, so the cuts keep the best
     edu = (education or [])[:2]
     ex  = [{**e, "bullets": (e.get("bullets") or [])[:4]} for e in (experience or [])[:3]]
     pr  = [{**p, "bullets": (p.get("bullets") or [])[:3]} for p in (projects or [])[:2]]
@@ -27,36 +48,6 @@ def _trim_one_page(education, experience, projects, skills_groups, skills_list,
     certs   = (certifications or [])[:4]
     return edu, ex, pr, sgroups, slist, certs
 
-def _group_skills(skills: list[str]) -> list[dict]:
-    """
-    Auto-group a flat list of skills into common categories.
-    """
-    groups = {
-        "Frontend": ["html", "css", "javascript", "typescript", "react", "angular", "vue"],
-        "Backend": ["java", "python", "go", "c#", "node", "php", "spring", "django", "flask"],
-        "Frameworks": ["spring boot", "express", "hibernate", "jpa", "next.js", "fastapi"],
-        "Databases": ["mysql", "postgres", "mongodb", "oracle", "sqlite", "redis", "dynamodb"],
-        "Tools": ["git", "docker", "kubernetes", "maven", "gradle", "postman", "vscode", "intellij"],
-        "Concepts": ["oop", "object-oriented", "microservices", "algorithms", "data structures", "ci/cd", "agile"],
-    }
-
-    result = []
-    if not skills:
-        return result
-
-    for label, keywords in groups.items():
-        found = [s for s in skills if any(k in s.lower() for k in keywords)]
-        if found:
-            result.append({"label": label, "items": found})
-
-    # Leftover uncategorized skills
-    categorized = {s for g in result for s in g["items"]}
-    leftover = [s for s in skills if s not in categorized]
-    if leftover:
-        result.append({"label": "Other", "items": leftover})
-
-    return result
-
 # ---------------------- Education detail sanitizers ----------------------
 
 def _normalize_cgpa_gpa_line(s: str) -> str:
@@ -65,23 +56,7 @@ def _normalize_cgpa_gpa_line(s: str) -> str:
     'C G P A : 8 . 6 / 1 0' -> 'CGPA: 8.6/10'
     Also removes stray bullets/dots and shrinks whitespace.
     """
-    if not s:
-        return s
-    s2 = s.replace("•", " ").replace("●", " ")
-    s2 = re.sub(r"\s+", " ", s2).strip()
-    # Force tokens CGPA/GPA if spaced out
-    s2 = re.sub(r"C\s*G\s*P\s*A", "CGPA", s2, flags=re.I)
-    s2 = re.sub(r"G\s*P\s*A", "GPA", s2, flags=re.I)
-    # Join digit-by-digit numbers like "8 0 7 4 ..." -> "8074..."
-    s2 = re.sub(r"(?:\d\s+){5,}\d", lambda m: m.group(0).replace(" ", ""), s2)
-    # Normalize values: "CGPA : 8 . 6 / 1 0" -> "CGPA: 8.6/10"
-    s2 = re.sub(
-        r"\b(CGPA|GPA)\b\s*[:\-\s]*([0-9\s\.]+/[0-9\s\.]+)",
-        lambda m: f"{m.group(1).upper()}: {m.group(2).replace(' ', '')}",
-        s2,
-        flags=re.I,
-    )
-    return s2
+    return normalize_gpa_line(s)
 
 def _collapse_char_details(details: list[str]) -> list[str]:
     """
@@ -106,15 +81,13 @@ def _collapse_char_details(details: list[str]) -> list[str]:
 
 # ------------------------------------------------------------------------
 
-async def build_overleaf_modern(
-    resume: dict, jd: dict, client: Optional[AsyncOpenAI]
-) -> Tuple[bytes, str, str]:
-    jd_skills = jd.get("skills_required", []) or []
-
-    # Normalize inputs
+def build_context(resume: dict, jd: dict) -> dict:
+    """
+    Normalized template context for resume_modern.tex.j2 (JD-ordered, sanitized, trimmed to one page).
+    """
+    # Normalize inputs; roles, projects and bullets most relevant to the JD first
     education    = resume.get("education", [])
-    experience   = _reorder_experience(resume.get("experience", []), jd_skills)
-    projects     = resume.get("projects", [])
+    experience, projects = tailor(resume.get("experience", []), resume.get("projects", []), jd)
     certifications = resume.get("certifications", [])
     achievements = resume.get("achievements", [])  # rendered by template if present
 
@@ -130,11 +103,7 @@ async def build_overleaf_modern(
                 e["details"] = [_normalize_cgpa_gpa_line(e["details"])]
         # Also normalize dates that might arrive broken like "A u g 2 0 2 0"
         if e.get("dates"):
-            e["dates"] = re.sub(
-                r"([A-Za-z]{3,9})\s*([0-9]{4})",
-                lambda m: f"{m.group(1)} {m.group(2)}",
-                str(e["dates"])
-            )
+            e["dates"] = normalize_dates(str(e["dates"]))
         sanitized_education.append(e)
 
     # Skills
@@ -144,7 +113,7 @@ async def build_overleaf_modern(
 
     # If parser didn't already group, auto-group them
     if not skills_groups and skills:
-        skills_groups = _group_skills(skills)
+        skills_groups = group_skills(skills)
 
     # Trim to fit one page
     edu, ex, pr, sgroups, slist, certs = _trim_one_page(
@@ -168,7 +137,14 @@ async def build_overleaf_modern(
         "certifications": certs,
         "achievements": achievements,
     }
+    return context
+
 
-    pdf_or_tex, ext = render_tex_or_pdf("resume_modern.tex.j2", context)
+async def build_overleaf_modern(
+    resume: dict, jd: dict, client: Optional["AsyncOpenAI"]
+) -> Tuple[bytes, str, str]:
+    with span("build_overleaf_modern"):
+        context = build_context(resume, jd)
+        pdf_or_tex, ext = await render_tex_or_pdf("resume_modern.tex.j2", context)
     media_type = "application/pdf" if ext == ".pdf" else "application/x-tex"
     return pdf_or_tex, media_type, ext
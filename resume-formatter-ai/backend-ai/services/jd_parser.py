@@ -1,7 +1,28 @@
 import os, json
-from openai import AsyncOpenAI
+from typing import TYPE_CHECKING
+
+from utils.prompt_compactor import compact_jd_text
+from models.common import validated
+from models.jd import ParsedJD
+from .parse_cache import parse_cache, make_key
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Bump whenever the prompt below (or ParsedJD) changes so cached results are not reused
+PROMPT_VERSION = "2"
+
+async def parse_jd(text: str, client: "AsyncOpenAI", use_cache: bool = True) -> dict:
+    text = compact_jd_text(text)
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = make_key("jd", text, model, PROMPT_VERSION)
+    if use_cache:
+        cached = await parse_cache.aget(key)
+        if cached is not None:
+            return cached
+    else:
+        parse_cache.note_bypass()
 
-async def parse_jd(text: str, client: AsyncOpenAI) -> dict:
     prompt = f"""
 Extract the following fields from this Job Description and return valid JSON only.
 If a field is not present, return an empty string or empty list (do not omit).
@@ -23,7 +44,7 @@ Job description:
 {text}
 """
     resp = await client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        model=model,
         messages=[{"role": "user", "content": prompt}],
         response_format={"type": "json_object"},
     )
@@ -34,17 +55,10 @@ Job description:
     except Exception:
         return {"raw": raw, "error": "JSON parse failed"}
 
-    # Ensure all fields exist (fallbacks if model omits them)
-    data.setdefault("title", "")
-    data.setdefault("company", "")
-    data.setdefault("skills_required", [])
-    data.setdefault("nice_to_have", [])
-    data.setdefault("projects", [])
-    data.setdefault("achievements", [])
-    data.setdefault("certifications", [])
-    data.setdefault("awards", [])
-    data.setdefault("publications", [])
-    data.setdefault("languages", [])
-    data.setdefault("hobbies", [])
+    # One pass: missing fields get defaults, wrong types are coerced or rejected
+    data = validated(ParsedJD, data, raw)
+    if "error" in data:
+        return data
 
+    await parse_cache.aset(key, data)
     return data
@@ -1,46 +1,96 @@
 # services/latex_renderer.py
-import os, shutil, subprocess, tempfile
+import os, json, hashlib, threading
+from collections import OrderedDict
 from typing import Tuple
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from utils.metrics import span
+from .tex_compiler import tex_compiler, tectonic_available as _tectonic_available
 
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "templates")
 
-def _render_template(template_name: str, context: dict) -> bytes:
-    env = Environment(
+# Templates are only re-checked on disk in dev mode (APP_ENV=dev)
+DEV_MODE = os.getenv("APP_ENV", "").lower() in ("dev", "development")
+# Compiled template bytecode survives restarts; defaults to a per-user dir under the system temp dir
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR") or None
+TEX_RENDER_CACHE_ENTRIES = int(os.getenv("TEX_RENDER_CACHE_ENTRIES", "256"))   # 0 disables
+
+_env = None
+_env_lock = threading.Lock()
+
+def get_env():
+    """
+    The shared Jinja environment, created (and jinja2 imported) on first use.
+    """
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                _env = _make_env()
+    return _env
+
+def _make_env():
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+    if JINJA_CACHE_DIR:
+        os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    return Environment(
         loader=FileSystemLoader(TEMPLATE_DIR),
         autoescape=select_autoescape(enabled_extensions=(), default_for_string=False),
         trim_blocks=True, lstrip_blocks=True,
+        auto_reload=DEV_MODE,
+        bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
     )
-    return env.get_template(template_name).render(**context).encode("utf-8")
 
-def _tectonic_available() -> bool:
-    return shutil.which("tectonic") is not None
+# ---------------- Rendered TeX cache ----------------
+
+_tex_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_tex_lock = threading.Lock()
+_tex_stats = {"hits": 0, "misses": 0}
+
+def _context_key(template_name: str, context: dict) -> str:
+    h = hashlib.sha256(template_name.encode("utf-8"))
+    if DEV_MODE:
+        # the template may change under us; make edits invalidate cached output
+        h.update(str(os.path.getmtime(os.path.join(TEMPLATE_DIR, template_name))).encode("ascii"))
+    h.update(json.dumps(context, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def render_cache_stats() -> dict:
+    with _tex_lock:
+        return {**_tex_stats, "entries": len(_tex_cache), "max_entries": TEX_RENDER_CACHE_ENTRIES}
+
+def _render_template(template_name: str, context: dict) -> bytes:
+    if TEX_RENDER_CACHE_ENTRIES <= 0:
+        with span("jinja"):
+            return get_env().get_template(template_name).render(**context).encode("utf-8")
+
+    key = _context_key(template_name, context)
+    with _tex_lock:
+        tex = _tex_cache.get(key)
+        if tex is not None:
+            _tex_cache.move_to_end(key)
+            _tex_stats["hits"] += 1
+            return tex
+        _tex_stats["misses"] += 1
+
+    with span("jinja"):
+        tex = get_env().get_template(template_name).render(**context).encode("utf-8")
+    with _tex_lock:
+        _tex_cache[key] = tex
+        while len(_tex_cache) > TEX_RENDER_CACHE_ENTRIES:
+            _tex_cache.popitem(last=False)
+    return tex
 
 # NEW: public helper used by the router
 def tectonic_available() -> bool:
     return _tectonic_available()
 
-def render_tex_or_pdf(template_name: str, context: dict) -> Tuple[bytes, str]:
+async def render_tex_or_pdf(template_name: str, context: dict) -> Tuple[bytes, str]:
     """
     Returns (bytes, ext) where ext is '.pdf' if Tectonic is available and compilation succeeds,
     otherwise '.tex' (so you can open on Overleaf).
     """
     tex_bytes = _render_template(template_name, context)
-    if not _tectonic_available():
+    pdf = await tex_compiler.compile(tex_bytes)
+    if pdf is None:
         return tex_bytes, ".tex"
-
-    with tempfile.TemporaryDirectory() as workdir:
-        tex_path = os.path.join(workdir, "resume.tex")
-        pdf_path = os.path.join(workdir, "resume.pdf")
-        with open(tex_path, "wb") as f:
-            f.write(tex_bytes)
-
-        proc = subprocess.run(
-            ["tectonic", "-X", "compile", tex_path, "--outdir", workdir, "--keep-logs"],
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=workdir
-        )
-        if proc.returncode != 0 or not os.path.exists(pdf_path):
-            return tex_bytes, ".tex"
-
-        with open(pdf_path, "rb") as f:
-            return f.read(), ".pdf"
+    return pdf, ".pdf"
@@ -0,0 +1,403 @@
+# services/llm_scheduler.py
+import os, re, time, random, asyncio, logging
+from types import SimpleNamespace
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+from utils.metrics import span, record
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable); 0 disables a limit
+LLM_RPM             = int(os.getenv("LLM_RPM", "500"))
+LLM_TPM             = int(os.getenv("LLM_TPM", "200000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES     = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE    = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))    # seconds
+LLM_BACKOFF_MAX     = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+# Completion budget assumed when a call doesn't set max_tokens
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1000"))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def estimate_tokens(messages: list, max_tokens: Optional[int] = None) -> int:
+    """
+    Cheap token estimate (~4 chars/token plus per-message overhead) and the completion budget.
+    """
+    chars = 0
+    for m in messages or []:
+        content = m.get("content") if isinstance(m, dict) else None
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            chars += sum(len(str(part.get("text", ""))) for part in content if isinstance(part, dict))
+    prompt_tokens = chars // 4 + 4 * len(messages or []) + 3
+    return prompt_tokens + (max_tokens or LLM_EXPECTED_COMPLETION_TOKENS)
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def _parse_duration(value: str) -> Optional[float]:
+    # OpenAI reset headers look like "1s", "6m0s", "20ms"
+    parts = _DURATION_RE.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+def retry_delay_from_headers(headers) -> Optional[float]:
+    """
+    Seconds to wait according to Retry-After / retry-after-ms / x-ratelimit-reset-* headers.
+    """
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    ra = headers.get("retry-after")
+    if ra:
+        try:
+            return float(ra)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [_parse_duration(headers.get(h, "")) for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    """
+    Continuous-refill bucket sized for one minute of budget.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        # positive delta refunds, negative debits (may go below zero)
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+    def drain(self) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def snapshot(self) -> dict:
+        if self.unlimited:
+            return {"limit_per_minute": 0, "available": None, "used_pct": 0.0}
+        self._refill()
+        return {
+            "limit_per_minute": int(self.capacity),
+            "available": int(self.tokens),
+            "used_pct": round(100.0 * (1 - max(self.tokens, 0.0) / self.capacity), 1),
+        }
+
+
+class LLMScheduler:
+    """
+    Gate for every chat completion: FIFO admission against RPM/TPM token buckets and a
+    concurrency cap, shared backoff when the provider signals rate limiting, and jittered
+    retries for transient failures.
+    """
+
+    def __init__(self, rpm: int = LLM_RPM, tpm: int = LLM_TPM, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self._admission = asyncio.Lock()
+        self._paused_until = 0.0
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "retries": 0, "rate_limited": 0,
+                         "estimated_tokens": 0}
+        self.tokens_by_model: dict[str, dict] = {}
+
+    # ---------------- admission ----------------
+    async def _admit(self, est_tokens: int) -> None:
+        self.queued += 1
+        try:
+            async with self._admission:   # FIFO: only the head of the queue waits on the buckets
+                while True:
+                    delay = max(
+                        self._paused_until - time.monotonic(),
+                        self.requests.wait_time(1),
+                        self.tokens.wait_time(est_tokens),
+                    )
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                self.requests.take(1)
+                self.tokens.take(est_tokens)
+        finally:
+            self.queued -= 1
+
+    def _pause(self, seconds: float) -> None:
+        # Everyone waits, not just the caller that hit the limit
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    def _record_usage(self, model: str, resp: Any, est_tokens: int) -> None:
+        usage = getattr(resp, "usage", None)
+        if not usage:
+            return
+        prompt_t = getattr(usage, "prompt_tokens", 0) or 0
+        completion_t = getattr(usage, "completion_tokens", 0) or 0
+        m = self.tokens_by_model.setdefault(model, {"prompt_tokens": 0, "completion_tokens": 0})
+        m["prompt_tokens"] += prompt_t
+        m["completion_tokens"] += completion_t
+        # Reconcile the estimate with what was actually charged
+        self.tokens.adjust(est_tokens - (prompt_t + completion_t))
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        if self._slots:
+            self._slots.release()
+
+    # ---------------- public API ----------------
+    async def run(self, create, **kwargs) -> Any:
+        """
+        Call `create(**kwargs)` (an OpenAI chat.completions.create) under the scheduler.
+        With stream=True the returned stream keeps the concurrency slot until it is exhausted
+        or closed; its usage is recorded then.
+        """
+        import openai   # deferred: keeps the SDK off the import path until the first call
+        est = estimate_tokens(kwargs.get("messages"), kwargs.get("max_tokens") or kwargs.get("max_completion_tokens"))
+        model = str(kwargs.get("model", ""))
+        self.counters["requests"] += 1
+        self.counters["estimated_tokens"] += est
+        if kwargs.get("stream") and "stream_options" not in kwargs:
+            # the last chunk then carries usage, so TPM can be reconciled for streams too
+            kwargs["stream_options"] = {"include_usage": True}
+
+        attempt = 0
+        while True:
+            with span("llm_queue"):
+                await self._admit(est)
+                if self._slots:
+                    try:
+                        await self._slots.acquire()
+                    except asyncio.CancelledError:
+                        # admitted but never sent: the budget goes back to the next caller
+                        self.requests.adjust(1)
+                        self.tokens.adjust(est)
+                        raise
+            self.in_flight += 1
+            handed_off = False
+            try:
+                if kwargs.get("stream"):
+                    started = time.perf_counter()
+                    stream = await create(**kwargs)
+                    handed_off = True
+                    budget = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or LLM_EXPECTED_COMPLETION_TOKENS
+                    return _ScheduledStream(stream, self, model, est, budget, started)
+                with span("llm"):
+                    resp = await create(**kwargs)
+                self._record_usage(model, resp, est)
+                self.counters["completed"] += 1
+                return resp
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                status = getattr(e, "status_code", None)
+                retryable = isinstance(e, openai.APIConnectionError) or status in _RETRYABLE_STATUS
+                if not retryable or attempt >= self.max_retries:
+                    self.counters["failed"] += 1
+                    raise
+                response = getattr(e, "response", None)
+                delay = retry_delay_from_headers(getattr(response, "headers", None))
+                if status == 429:
+                    self.counters["rate_limited"] += 1
+                    self.tokens.drain()
+                    pause = delay if delay is not None else self._backoff(attempt)
+                    self._pause(pause + random.uniform(0, 0.25 * pause + 0.05))
+                    delay = 0.0   # the shared pause already covers this caller
+                elif delay is None:
+                    delay = self._backoff(attempt)
+                self.counters["retries"] += 1
+                attempt += 1
+                logger.warning("LLM call failed (%s); retry %d/%d", status or type(e).__name__, attempt, self.max_retries)
+            except Exception:
+                self.counters["failed"] += 1
+                raise
+            finally:
+                if not handed_off:
+                    self._release()
+            if delay:
+                await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 3),
+            "requests_budget": self.requests.snapshot(),
+            "tokens_budget": self.tokens.snapshot(),
+            "counters": dict(self.counters),
+            "tokens_by_model": {k: dict(v) for k, v in self.tokens_by_model.items()},
+        }
+
+
+class _ScheduledStream:
+    """
+    A streamed completion that holds its scheduler slot until the stream ends: exhausted,
+    failed or closed. Then the slot is released, the "llm" span recorded and usage
+    reconciled (from the usage chunk, or estimated from the streamed text without one).
+    Callers that stop early should close() it.
+    """
+
+    def __init__(self, inner, scheduler: "LLMScheduler", model: str, est_tokens: int, budget: int, started: float):
+        self._inner = inner
+        self._it = inner.__aiter__()
+        self._scheduler = scheduler
+        self._model = model
+        self._est = est_tokens
+        self._budget = budget
+        self._started = started
+        self._chars = 0
+        self._usage = None
+        self._done = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            chunk = await self._it.__anext__()
+        except StopAsyncIteration:
+            self._finish(ok=True)
+            raise
+        except BaseException:
+            self._finish(ok=False)
+            raise
+        if getattr(chunk, "usage", None):
+            self._usage = chunk.usage
+        for choice in getattr(chunk, "choices", None) or []:
+            delta = getattr(choice, "delta", None)
+            self._chars += len(getattr(delta, "content", None) or "")
+        return chunk
+
+    def _finish(self, ok: bool) -> None:
+        if self._done:
+            return
+        self._done = True
+        s = self._scheduler
+        record("llm", time.perf_counter() - self._started)
+        if self._usage is not None:
+            s._record_usage(self._model, SimpleNamespace(usage=self._usage), self._est)
+        else:
+            # no usage chunk: charge the prompt estimate plus what actually streamed
+            s.tokens.adjust(self._budget - self._chars // 4)
+        s.counters["completed" if ok else "failed"] += 1
+        s._release()
+
+    async def close(self) -> None:
+        try:
+            closer = getattr(self._inner, "close", None) or getattr(self._inner, "aclose", None)
+            if closer is not None:
+                await closer()
+        finally:
+            self._finish(ok=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __del__(self):
+        # last resort for a caller that dropped the stream unclosed: never leak the slot
+        if not self._done:
+            self._finish(ok=False)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+# ---------------- Client wrapper ----------------
+
+class _ScheduledCompletions:
+    def __init__(self, inner, scheduler: LLMScheduler):
+        self._inner = inner
+        self._scheduler = scheduler
+
+    async def create(self, **kwargs):
+        return await self._scheduler.run(self._inner.create, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+class _ScheduledChat:
+    def __init__(self, inner, scheduler: LLMScheduler):
+        self._inner = inner
+        self.completions = _ScheduledCompletions(inner.completions, scheduler)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+class ScheduledOpenAI:
+    """
+    Drop-in wrapper around AsyncOpenAI: client.chat.completions.create goes through the scheduler,
+    everything else is passed through. Create the inner client with max_retries=0 so retries
+    only happen here. `client` may also be a zero-argument factory; the client is then built
+    on first use, which keeps `import openai` out of worker boot.
+    """
+
+    def __init__(self, client, scheduler: LLMScheduler):
+        self._factory = None if hasattr(client, "chat") else client
+        self._inner = None if self._factory else client
+        self._chat = None
+        self.scheduler = scheduler
+
+    @property
+    def client(self):
+        if self._inner is None:
+            self._inner = self._factory()
+        return self._inner
+
+    @property
+    def chat(self) -> _ScheduledChat:
+        if self._chat is None:
+            self._chat = _ScheduledChat(self.client.chat, self.scheduler)
+        return self._chat
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
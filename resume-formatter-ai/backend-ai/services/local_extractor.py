@@ -0,0 +1,190 @@
+# services/local_extractor.py
+"""
+Deterministic, LLM-free extraction of the easy resume fields: name, phone, profile links,
+section boundaries and the skills section.
+
+Section headers are found on the lines of the text before cleaning (which joins every line):
+only a whole line that is a known label, in ALL CAPS or ending in ":", counts, so prose like
+"strong Communication Skills and 5 years Experience." never opens a section.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.text_normalizer import clean_extracted_text, merge_lines
+
+# Bump when extraction changes what hybrid mode asks the LLM for (it is part of that cache key)
+EXTRACTOR_VERSION = "2"
+
+# Section header labels (matched case-insensitively against a whole line)
+_SECTION_NAMES = {
+    "summary":        ["Professional Summary", "Summary", "Profile", "Career Objective", "Objective", "About Me"],
+    "experience":     ["Work Experience", "Professional Experience", "Employment History", "Experience", "Internships"],
+    "education":      ["Education", "Academic Details", "Academics"],
+    "skills":         ["Technical Skills", "Key Skills", "Core Competencies", "Skills"],
+    "projects":       ["Academic Projects", "Personal Projects", "Projects"],
+    "certifications": ["Certifications", "Certificates"],
+    "achievements":   ["Achievements", "Accomplishments"],
+    "awards":         ["Awards", "Honors"],
+    "publications":   ["Publications"],
+    "languages":      ["Languages"],
+    "hobbies":        ["Hobbies", "Interests"],
+}
+
+_LABEL_TO_SECTION = {label.lower(): key for key, labels in _SECTION_NAMES.items() for label in labels}
+
+_PHONE_RE = re.compile(r"(?<![\w/])\+?\(?\d[\d\s().-]{7,16}\d(?![\w/])")
+_YEAR_RANGE_RE = re.compile(r"(?:19|20)\d\d\s*[-–]\s*(?:19|20)?\d\d")
+_LINKEDIN_RE = re.compile(r"(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[A-Za-z0-9_%-]+/?", re.I)
+_GITHUB_RE = re.compile(r"(?:https?://)?(?:www\.)?github\.com/[A-Za-z0-9_-]+/?", re.I)
+_URL_RE = re.compile(r"https?://[^\s,;|]+", re.I)
+_EMAIL_LIKE_RE = re.compile(r"\S+@\S+")
+_NAME_WORD_RE = re.compile(r"^[A-Z][A-Za-z'.-]*$|^[A-Z]{2,}$")
+_SKILL_SPLIT_RE = re.compile(r"\s*[,;|•●]\s*|\s{2,}|\s+-\s+")
+_WS_RE = re.compile(r"\s+")
+_LIST_SEP_RE = re.compile(r"[,;|•●]")
+
+_NAME_SKIP = {"resume", "curriculum", "vitae", "cv", "biodata"}
+# Words that make up sub-labels inside a skills section ("Programming Languages:", "Tools & Platforms:")
+_LABEL_WORDS = {
+    "languages", "language", "frameworks", "framework", "libraries", "tools", "technologies", "platforms",
+    "databases", "database", "cloud", "devops", "testing", "methodologies", "concepts", "skills", "stack",
+    "programming", "scripting", "soft", "technical", "web", "mobile", "frontend", "backend", "version",
+    "control", "other", "others", "os", "ides", "ide", "operating", "systems", "and", "&", "/",
+}
+
+
+def _header(line: str) -> Optional[Tuple[str, bool]]:
+    # (section, colon-terminated) if the whole line is a header, else None
+    s = line.strip()
+    colon = s.endswith(":")
+    label = _WS_RE.sub(" ", s.rstrip(":").strip())
+    if not label or len(label) > 40 or not (colon or label.isupper()):
+        return None
+    key = _LABEL_TO_SECTION.get(label.lower())
+    return (key, colon) if key else None
+
+def find_sections(lines: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    (section, start, end) line ranges for the first header line of each known section; each
+    range runs to the next header. Content starts on the line after the header.
+    """
+    hits: List[Tuple[int, str]] = []
+    seen = set()
+    for i, line in enumerate(lines):
+        h = _header(line)
+        if h is None:
+            continue
+        key, colon = h
+        # "Languages:" inside a skills block is a label, not a section
+        if key == "languages" and colon and hits and hits[-1][1] == "skills":
+            continue
+        if key not in seen:
+            seen.add(key)
+            hits.append((i, key))
+    spans = []
+    for n, (i, key) in enumerate(hits):
+        end = hits[n + 1][0] if n + 1 < len(hits) else len(lines)
+        spans.append((key, i + 1, end))
+    return spans
+
+def extract_phone(text: str) -> str:
+    for m in _PHONE_RE.finditer(text or ""):
+        cand = m.group(0).strip()
+        digits = re.sub(r"\D", "", cand)
+        if not 10 <= len(digits) <= 13 or _YEAR_RANGE_RE.search(cand):
+            continue
+        return cand
+    return ""
+
+def extract_links(text: str) -> Dict[str, object]:
+    text = text or ""
+    linkedin = _LINKEDIN_RE.search(text)
+    github = _GITHUB_RE.search(text)
+    links = []
+    for m in [linkedin, github, *_URL_RE.finditer(text)]:
+        if m and m.group(0).rstrip("/.") not in links:
+            links.append(m.group(0).rstrip("/."))
+    return {
+        "linkedin": linkedin.group(0).rstrip("/.") if linkedin else "",
+        "github": github.group(0).rstrip("/.") if github else "",
+        "links": links,
+    }
+
+def extract_name(text: str) -> str:
+    """
+    The leading run of 2-4 capitalized words of a line, stopping at any contact detail.
+    """
+    head = (text or "")[:200]
+    words = []
+    for raw in head.split():
+        w = raw.strip(",|:;")
+        if not words and w.lower() in _NAME_SKIP:
+            continue
+        if not w or not _NAME_WORD_RE.match(w) or _EMAIL_LIKE_RE.match(w):
+            break
+        words.append(w)
+        if len(words) == 4:
+            break
+    if len(words) < 2:
+        return ""
+    name = " ".join(words)
+    return name.title() if name.isupper() else name
+
+def _strip_label(head: str) -> str:
+    # "Python, Go Frameworks" -> the trailing label words go, the skill before them stays
+    words = head.split()
+    while words and words[-1].lower() in _LABEL_WORDS:
+        words.pop()
+    return " ".join(words)
+
+def _join_list_lines(lines: List[str]) -> str:
+    # A line break ends an item, unless the line was a list that wrapped mid-item
+    # ("Python, Machine" / "Learning, Go")
+    out = ""
+    for line in lines:
+        if out:
+            wrapped = _LIST_SEP_RE.search(prev) and not _LIST_SEP_RE.search(prev[-1])
+            out += " " if wrapped else " | "
+        out += line
+        prev = line
+    return out
+
+def extract_skills(lines: List[str], spans: List[Tuple[str, int, int]]) -> List[str]:
+    for key, start, end in spans:
+        if key != "skills":
+            continue
+        tokens = []
+        for tok in _SKILL_SPLIT_RE.split(_join_list_lines(lines[start:end])):
+            *labels, last = tok.split(":")
+            tokens.extend(_strip_label(h) for h in labels)
+            tokens.append(last)
+        skills, seen = [], set()
+        for tok in tokens:
+            tok = tok.strip(" .:-")
+            if not tok or len(tok) > 40 or len(tok.split()) > 5 or tok.lower() in seen:
+                continue
+            seen.add(tok.lower())
+            skills.append(tok)
+        return skills
+    return []
+
+
+def extract_local(text: str, layout: Optional[str] = None) -> dict:
+    """
+    Everything the local extractor can fill without an LLM, from the cleaned text and the
+    same text before cleaning (layout; text itself when not given, which finds no sections
+    unless it is a single header). Email is left to resume_parser._best_email_from_text.
+    """
+    lines = [clean_extracted_text(l) for l in merge_lines(text if layout is None else layout)]
+    spans = find_sections(lines)
+    head = lines[:spans[0][1] - 1] if spans else lines
+    # the name is on one of the first lines, alone or ahead of the contact details
+    name = next((n for n in map(extract_name, head[:3]) if n), "")
+    out = {
+        "name": name,
+        "phone": extract_phone(text),
+        "skills": extract_skills(lines, spans),
+        "sections": [{"section": k, "start": s, "end": e} for k, s, e in spans],
+    }
+    out.update(extract_links(text))
+    return out
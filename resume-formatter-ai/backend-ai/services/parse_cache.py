@@ -0,0 +1,237 @@
+# services/parse_cache.py
+import os, json, time, asyncio, hashlib, tempfile, threading, logging
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable)
+CACHE_DIR         = os.getenv("PARSE_CACHE_DIR", "./.parse_cache")
+CACHE_TTL         = int(os.getenv("PARSE_CACHE_TTL", str(7 * 24 * 3600)))      # seconds
+CACHE_MEM_ENTRIES = int(os.getenv("PARSE_CACHE_MEM_ENTRIES", "512"))
+CACHE_DISK_BYTES  = int(os.getenv("PARSE_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+CACHE_ENABLED     = os.getenv("PARSE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# How many disk writes between size-based eviction sweeps
+_EVICT_EVERY = 64
+
+
+def make_key(kind: str, text: str, model: str, prompt_version: str) -> str:
+    """
+    Content-addressed key: sha256 over kind, model, prompt version and the cleaned text.
+    """
+    h = hashlib.sha256()
+    for part in (kind, model, prompt_version):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    h.update((text or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+class ParseCache:
+    """
+    Two-tier cache for LLM parse results.
+    - memory: per-process LRU of serialized JSON
+    - disk:   one JSON file per key, shared by every worker pointing at the same dir
+    Both tiers honor the TTL, counted from when the entry was written. On disk a file's mtime is
+    its creation time and its atime its last use, so the sweep applies the same TTL as get() and
+    trims least recently used files first when the tier grows past max_disk_bytes.
+
+    get/set touch the disk; async code uses aget/aset, which answer memory hits inline and do
+    the file I/O (and any eviction sweep) in a worker thread.
+    """
+
+    def __init__(self, cache_dir: str, ttl: int, max_entries: int, max_disk_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.enabled = enabled
+        self._mem: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._sweeping = False
+        self.counters = {"mem_hits": 0, "disk_hits": 0, "misses": 0, "bypass": 0, "writes": 0, "evictions": 0}
+
+    # ---------------- paths ----------------
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and (time.time() - created) > self.ttl
+
+    # ---------------- public API ----------------
+    def get(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        hit = self._get_mem(key)
+        return hit if hit is not None else self._get_disk(key)
+
+    async def aget(self, key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        hit = self._get_mem(key)
+        return hit if hit is not None else await asyncio.to_thread(self._get_disk, key)
+
+    def _get_mem(self, key: str) -> Optional[dict]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                created, payload = hit
+                if not self._expired(created):
+                    self._mem.move_to_end(key)
+                    self.counters["mem_hits"] += 1
+                    return json.loads(payload)
+                del self._mem[key]
+        return None
+
+    def _get_disk(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            created = float(entry["created"])
+            if self._expired(created):
+                os.remove(path)
+            else:
+                payload = json.dumps(entry["value"])
+                self._remember(key, created, payload)
+                try:
+                    os.utime(path, (time.time(), created))   # atime = last use, mtime stays = created
+                except OSError:
+                    pass
+                with self._lock:
+                    self.counters["disk_hits"] += 1
+                return entry["value"]
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.warning("Dropping unreadable parse cache entry: %s", path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: dict) -> None:
+        if not self.enabled:
+            return
+        created = time.time()
+        payload = json.dumps(value)
+        self._remember(key, created, payload)
+        self._write(key, created, payload)
+
+    async def aset(self, key: str, value: dict) -> None:
+        if not self.enabled:
+            return
+        created = time.time()
+        payload = json.dumps(value)
+        self._remember(key, created, payload)   # visible to this process right away
+        await asyncio.to_thread(self._write, key, created, payload)
+
+    def _write(self, key: str, created: float, payload: str) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # atomic write so concurrent workers never read a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(f'{{"created": {created}, "value": {payload}}}')
+            os.utime(tmp_path, (created, created))
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Failed to write parse cache entry: %s", path)
+            return
+
+        with self._lock:
+            self.counters["writes"] += 1
+            self._writes += 1
+            sweep = self._writes % _EVICT_EVERY == 0 and not self._sweeping
+            if sweep:
+                self._sweeping = True
+        if sweep:
+            try:
+                self.evict()
+            finally:
+                with self._lock:
+                    self._sweeping = False
+
+    def note_bypass(self) -> None:
+        with self._lock:
+            self.counters["bypass"] += 1
+
+    def evict(self) -> int:
+        """
+        Remove expired files (mtime = creation time), then the least recently used ones (atime)
+        until the disk tier fits max_disk_bytes. Returns the number of files removed.
+        Walks the whole directory: call it off the event loop.
+        """
+        entries, total = [], 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+        removed = 0
+        entries.sort()
+        now = time.time()
+        for _, mtime, size, p in entries:
+            stale = p.endswith(".tmp") and now - mtime > 60
+            expired = self.ttl > 0 and now - mtime > self.ttl
+            if not (stale or expired or total > self.max_disk_bytes):
+                continue
+            try:
+                os.remove(p)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self.counters["evictions"] += removed
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = dict(self.counters)
+            c["mem_entries"] = len(self._mem)
+        lookups = c["mem_hits"] + c["disk_hits"] + c["misses"]
+        c["hit_rate"] = round((c["mem_hits"] + c["disk_hits"]) / lookups, 4) if lookups else 0.0
+        c["enabled"] = self.enabled
+        return c
+
+    # ---------------- internals ----------------
+    def _remember(self, key: str, created: float, payload: str) -> None:
+        with self._lock:
+            self._mem[key] = (created, payload)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+
+# Shared instance used by the parsers
+parse_cache = ParseCache(
+    cache_dir=CACHE_DIR,
+    ttl=CACHE_TTL,
+    max_entries=CACHE_MEM_ENTRIES,
+    max_disk_bytes=CACHE_DISK_BYTES,
+    enabled=CACHE_ENABLED,
+)
@@ -0,0 +1,166 @@
+# services/parsed_store.py
+"""
+Parsed resumes and JDs kept under stable ids, so a resume can be rendered again (another
+template, another JD) without re-extracting it or spending LLM tokens.
+
+Ids are content hashes, identical on every worker and across restarts:
+  resume: "r_" + sha256(uploaded file bytes, parse mode, model, prompt + extractor versions)
+  job:    "j_" + sha256(effective JD text (tailoring prompt included), model, prompt version)
+so re-uploading the same file or JD also finds the stored parse without any work, and a
+model change or prompt bump gets a fresh parse, as it does in the parse cache.
+
+Entries live in ParseCache instances (memory LRU + one JSON file per id under PARSED_STORE_DIR)
+with a longer TTL than the LLM cache. An expired or evicted id is just unknown again.
+Degraded (local-only) parses are not stored, so the next request retries the LLM.
+"""
+import os, asyncio, hashlib, logging
+from typing import TYPE_CHECKING, BinaryIO, Optional, Tuple
+
+from utils import text_extractor
+from . import resume_parser, jd_parser, local_extractor
+from .parse_cache import ParseCache
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable)
+STORE_DIR         = os.getenv("PARSED_STORE_DIR", "./.parsed_store")
+STORE_TTL         = int(os.getenv("PARSED_STORE_TTL", str(30 * 24 * 3600)))    # seconds
+STORE_MEM_ENTRIES = int(os.getenv("PARSED_STORE_MEM_ENTRIES", "256"))
+STORE_DISK_BYTES  = int(os.getenv("PARSED_STORE_DISK_BYTES", str(512 * 1024 * 1024)))
+
+_ID_HEX = 32
+
+
+class UnknownId(KeyError):
+    pass
+
+
+def _digest(*parts: bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+        h.update(b"\x00")
+    return h.hexdigest()[:_ID_HEX]
+
+def file_sha256(f: BinaryIO) -> str:
+    """
+    sha256 of a seekable binary file, read in chunks. Leaves f at position 0. Blocking.
+    """
+    h = hashlib.sha256()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(1024 * 1024), b""):
+        h.update(chunk)
+    f.seek(0)
+    return h.hexdigest()
+
+def effective_jd_text(jd_text: str, prompt: Optional[str] = None) -> str:
+    # Merge tailoring prompt into JD text if provided; this is the text a job id covers
+    text = jd_text.strip()
+    if prompt and prompt.strip():
+        text += f"\n\n[TAILORING_INSTRUCTIONS]\n{prompt.strip()}"
+    return text
+
+def _model() -> bytes:
+    # the parsers read it per call too
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini").encode("utf-8")
+
+def resume_id(file_hash: str, mode: str) -> str:
+    return "r_" + _digest(file_hash.encode("ascii"), mode.encode("utf-8"), _model(),
+                          resume_parser.PROMPT_VERSION.encode("ascii"),
+                          local_extractor.EXTRACTOR_VERSION.encode("ascii"))
+
+def job_id(jd_text: str) -> str:
+    return "j_" + _digest(jd_text.encode("utf-8"), _model(), jd_parser.PROMPT_VERSION.encode("ascii"))
+
+
+class ParsedStore:
+    """
+    Resumes and jobs by id. Values are stored as {"data": parsed, "meta": {...}}.
+    """
+
+    def __init__(self, store_dir: str, ttl: int, max_entries: int, max_disk_bytes: int):
+        self._stores = {
+            prefix: ParseCache(os.path.join(store_dir, sub), ttl, max_entries, max_disk_bytes // 2)
+            for prefix, sub in (("r_", "resumes"), ("j_", "jobs"))
+        }
+
+    def _split(self, item_id: str) -> Tuple[Optional[ParseCache], str]:
+        store, key = self._stores.get(item_id[:2]), item_id[2:]
+        if len(key) != _ID_HEX or any(c not in "0123456789abcdef" for c in key):
+            return None, key
+        return store, key
+
+    def get(self, item_id: str) -> Optional[dict]:
+        store, key = self._split(item_id or "")
+        entry = store.get(key) if store else None
+        return entry["data"] if entry else None
+
+    def put(self, item_id: str, data: dict, **meta) -> None:
+        store, key = self._split(item_id)
+        if store is None:
+            raise ValueError(f"Malformed id: {item_id!r}")
+        store.set(key, {"data": data, "meta": meta})
+
+    def stats(self) -> dict:
+        return {sub: s.stats() for sub, s in zip(("resumes", "jobs"), self._stores.values())}
+
+
+parsed_store = ParsedStore(STORE_DIR, STORE_TTL, STORE_MEM_ENTRIES, STORE_DISK_BYTES)
+
+
+# ---------------- lookups ----------------
+def load(item_id: str) -> dict:
+    """
+    The stored parse for item_id; UnknownId if it was never stored or has expired.
+    """
+    data = parsed_store.get(item_id)
+    if data is None:
+        raise UnknownId(item_id)
+    return data
+
+def remember(item_id: str, data: dict, **meta) -> bool:
+    """
+    Store a fresh parse unless it's degraded or an error. Returns whether it was stored.
+    """
+    if not data or data.get("degraded") or data.get("error"):
+        return False
+    parsed_store.put(item_id, data, **meta)
+    return True
+
+
+# ---------------- parse-or-load ----------------
+async def resolve_job(jd_text: str, client: "AsyncOpenAI", use_cache: bool = True) -> Tuple[Optional[str], dict]:
+    """
+    (job_id, parsed JD): from the store when this JD was parsed before, else parsed and stored.
+    use_cache=False always re-parses (and refreshes the stored copy). The id is None when the
+    parse could not be stored.
+    """
+    jid = job_id(jd_text)
+    if use_cache:
+        data = await asyncio.to_thread(parsed_store.get, jid)
+        if data is not None:
+            return jid, data
+    data = await jd_parser.parse_jd(jd_text, client, use_cache=use_cache)
+    stored = await asyncio.to_thread(remember, jid, data)
+    return (jid if stored else None), data
+
+async def resolve_resume(
+    upload: BinaryIO, client: "AsyncOpenAI", mode: str, use_cache: bool = True,
+    mime_type: Optional[str] = None, filename: Optional[str] = None,
+) -> Tuple[Optional[str], dict]:
+    """
+    (resume_id, parsed resume) for an uploaded file: from the store when the same file was
+    parsed in this mode before, else extracted, parsed and stored (id None if it wasn't).
+    """
+    rid = resume_id(await asyncio.to_thread(file_sha256, upload), mode)
+    if use_cache:
+        data = await asyncio.to_thread(parsed_store.get, rid)
+        if data is not None:
+            return rid, data
+    text, layout = await text_extractor.extract_text_with_layout(upload, mime_type)
+    data = await resume_parser.parse_resume(text, client, use_cache=use_cache, mode=mode, layout=layout)
+    stored = await asyncio.to_thread(remember, rid, data, filename=filename, mode=mode)
+    return (rid if stored else None), data
@@ -0,0 +1,184 @@
+# services/relevance.py
+"""
+Offline JD relevance for tailoring: which roles, bullets and projects of a resume speak to a JD.
+
+Every piece of text becomes a hashed TF-IDF vector (unigrams + bigrams, so phrases like
+"distributed systems" carry weight of their own; taxonomy synonyms folded to one spelling,
+so "k8s" meets "kubernetes"). All of a resume's units are stacked into one matrix and scored
+against the JD with a single matrix product. IDF comes from the resume's own units: words
+in every bullet ("developed", "team") count for little.
+
+The JD's term vector only depends on the JD, so it is built once and cached. No model
+download, no LLM call; a typical resume scores in well under a millisecond.
+"""
+import os, re, zlib, math
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .skill_index import index as skill_index
+
+RELEVANCE_DIM = int(os.getenv("RELEVANCE_DIM", "4096"))   # hashed feature space
+RELEVANCE_JD_CACHE = int(os.getenv("RELEVANCE_JD_CACHE", "256"))
+
+# Field weights for the JD vector: required skills matter most
+JD_FIELD_WEIGHTS = (("skills_required", 2.0), ("title", 1.0), ("nice_to_have", 1.0))
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in into is it its of on or our over that the their
+this to was were will with within using via per across than then so such
+""".split())
+
+
+def _np():
+    # numpy is imported on first use like the other heavy deps (see services/warmup.py)
+    import numpy
+    return numpy
+
+
+# ---------------- features ----------------
+@lru_cache(maxsize=1)
+def _canonical() -> Dict[str, str]:
+    # One spelling per synonym family, so all of them hash to the same feature
+    return {term: min(family) for term, family in skill_index.synonyms.items()}
+
+def terms(text: str) -> List[str]:
+    """
+    Unigrams and bigrams of `text`, stopwords dropped, synonyms folded.
+    """
+    canon = _canonical()
+    words = [w for w in _TOKEN_RE.findall(str(text or "").lower()) if w not in _STOPWORDS]
+    out = [canon.get(w, w) for w in words]
+    for a, b in zip(words, words[1:]):
+        pair = f"{a} {b}"
+        out.append(canon.get(pair, f"{canon.get(a, a)} {canon.get(b, b)}"))
+    return out
+
+@lru_cache(maxsize=16384)
+def _feature(term: str) -> int:
+    return zlib.crc32(term.encode("utf-8")) % RELEVANCE_DIM
+
+def _weighted(counts: Counter, weight: float = 1.0) -> Iterable[Tuple[int, float]]:
+    # Sublinear TF: the tenth mention of "java" adds much less than the first
+    for term, n in counts.items():
+        yield _feature(term), weight * (1.0 + math.log(n))
+
+@lru_cache(maxsize=8192)
+def _features(text: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    # The same resume is usually rendered more than once (styles, formats, JDs)
+    pairs = list(_weighted(Counter(terms(text))))
+    return tuple(i for i, _ in pairs), tuple(w for _, w in pairs)
+
+
+# ---------------- JD ----------------
+def _jd_parts(jd: dict) -> Tuple[Tuple[str, float], ...]:
+    parts = []
+    for field, weight in JD_FIELD_WEIGHTS:
+        value = (jd or {}).get(field)
+        items = value if isinstance(value, list) else [value]
+        parts.extend((str(v), weight) for v in items if v)
+    return tuple(parts)
+
+@lru_cache(maxsize=RELEVANCE_JD_CACHE)
+def _jd_vector(parts: Tuple[Tuple[str, float], ...]):
+    np = _np()
+    q = np.zeros(RELEVANCE_DIM, dtype=np.float32)
+    for text, weight in parts:
+        for idx, w in zip(*_features(text)):
+            q[idx] += weight * w
+    q.flags.writeable = False   # shared between requests
+    return q
+
+def jd_vector(jd: dict):
+    """
+    The JD's term-frequency vector (cached per JD), or None if the JD has nothing to match.
+    """
+    parts = _jd_parts(jd)
+    return _jd_vector(parts) if parts else None
+
+
+# ---------------- scoring ----------------
+def score_texts(texts: Sequence[str], jd: dict) -> List[float]:
+    """
+    Cosine similarity of each text to the JD, TF-IDF weighted. All zeros without a JD.
+    """
+    q = jd_vector(jd)
+    if q is None or not texts:
+        return [0.0] * len(texts)
+
+    np = _np()
+    rows, cols, vals = [], [], []
+    for row, text in enumerate(texts):
+        idxs, weights = _features(text)
+        rows.extend([row] * len(idxs))
+        cols.extend(idxs)
+        vals.extend(weights)
+    n = len(texts)
+    if not cols:
+        return [0.0] * n
+
+    # Only the features the resume uses get a column: n x k with k in the hundreds, not n x DIM.
+    # Duplicate (row, col) pairs from hash collisions add up, which is what TF wants.
+    used, col = np.unique(np.asarray(cols, dtype=np.int64), return_inverse=True)
+    k = len(used)
+    m = np.bincount(np.asarray(rows, dtype=np.int64) * k + col, weights=vals,
+                    minlength=n * k).astype(np.float32).reshape(n, k)
+
+    df = np.count_nonzero(m, axis=0)
+    idf = np.log((1.0 + n) / (1.0 + df)).astype(np.float32) + 1.0
+    m *= idf
+    qu = q[used]
+    qw = qu * idf
+    # |JD| over all its features; the ones the resume never uses have df = 0
+    idf0 = math.log(1.0 + n) + 1.0
+    rest = max(0.0, float(q @ q) - float(qu @ qu))
+    qnorm = math.sqrt(float(qw @ qw) + idf0 * idf0 * rest)
+    norms = np.linalg.norm(m, axis=1) * qnorm
+    scores = (m @ qw) / np.where(norms > 0, norms, 1.0)
+    return scores.tolist()
+
+def _rank(items: List, scores: Sequence[float]) -> List:
+    # Stable: equal scores (e.g. nothing relevant at all) keep the resume's order
+    order = sorted(range(len(items)), key=lambda i: -scores[i])
+    return [items[i] for i in order]
+
+
+def _entry_text(entry: dict, fields: Tuple[str, ...]) -> str:
+    parts = []
+    for f in fields:
+        value = entry.get(f)
+        parts.extend(value if isinstance(value, list) else [value])
+    return "\n".join(str(p) for p in parts if p)
+
+_ROLE_FIELDS = ("title", "company", "bullets", "impact")
+_PROJECT_FIELDS = ("name", "description", "tech", "bullets")
+
+
+def tailor(experience: Optional[List[dict]], projects: Optional[List[dict]], jd: dict) -> Tuple[List[dict], List[dict]]:
+    """
+    Roles and projects ordered by relevance to the JD, each one's bullets too, so trimming
+    to a page keeps the most relevant ones. One scoring pass over the whole resume.
+    """
+    experience = [dict(e) for e in experience or [] if isinstance(e, dict)]
+    projects = [dict(p) for p in projects or [] if isinstance(p, dict)]
+    if jd_vector(jd) is None:
+        return experience, projects
+
+    # Every unit in one matrix: each entry as a whole, then every bullet
+    texts: List[str] = []
+    spans = []
+    for entry, fields in [(e, _ROLE_FIELDS) for e in experience] + [(p, _PROJECT_FIELDS) for p in projects]:
+        bullets = [b for b in entry.get("bullets") or [] if b] if isinstance(entry.get("bullets"), list) else []
+        spans.append((len(texts), bullets))
+        texts.append(_entry_text(entry, fields))
+        texts.extend(str(b) for b in bullets)
+    scores = score_texts(texts, jd)
+
+    entry_scores = []
+    for entry, (start, bullets) in zip(experience + projects, spans):
+        entry_scores.append(scores[start])
+        if bullets:
+            entry["bullets"] = _rank(bullets, scores[start + 1:start + 1 + len(bullets)])
+    n = len(experience)
+    return _rank(experience, entry_scores[:n]), _rank(projects, entry_scores[n:])
@@ -1,5 +1,25 @@
-import os, json, re
-from openai import AsyncOpenAI
+import os, json, re, logging
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional, Tuple
+
+from utils.json_stream import JSONObjectStream
+from models.common import validated
+from models.resume import ParsedResume
+from .parse_cache import parse_cache, make_key
+from . import local_extractor
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the prompt below (or ParsedResume) changes so cached results are not reused
+PROMPT_VERSION = "2"
+
+# full:   every field from the LLM; local extraction only backfills empty contact fields
+# hybrid: name/email/phone/links/skills extracted locally, the LLM only gets the structured sections
+# fast:   no LLM call at all
+PARSE_MODES = ("full", "hybrid", "fast")
+PARSE_MODE = os.getenv("PARSE_MODE", "full").lower()
 
 # Regex to detect valid emails
 _EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
@@ -44,35 +64,116 @@ def _best_email_from_text(text: str, parsed_email: str | None = None) -> str:
     return sorted(candidates, key=score, reverse=True)[0]
 
 
-async def parse_resume(text: str, client: AsyncOpenAI) -> dict:
-    prompt = f"""
+_FIELDS = {
+    "name":           "- name",
+    "email":          "- email",
+    "phone":          "- phone",
+    "summary":        "- summary",
+    "skills":         "- skills (list)",
+    "experience":     "- experience (list of objects: title, company, dates, bullets, location optional, impact optional)",
+    "education":      "- education (list of objects: school, degree, dates, location optional, details optional)",
+    "projects":       "- projects (list of objects: name, dates, description optional, bullets optional)",
+    "achievements":   "- achievements (list of strings)",
+    "certifications": "- certifications (list of objects: name, authority optional, date optional)",
+    "awards":         "- awards (list of objects: title, issuer optional, date optional)",
+    "publications":   "- publications (list of objects: title, publisher optional, date optional)",
+    "languages":      "- languages (list of strings)",
+    "hobbies":        "- hobbies (list of strings)",
+}
+# Filled by local_extractor in hybrid/fast mode
+_LOCAL_FIELDS = ("name", "email", "phone", "linkedin", "github", "skills")
+
+
+def _build_prompt(text: str, fields: Optional[List[str]] = None) -> str:
+    field_lines = "\n".join(_FIELDS[f] for f in (fields or _FIELDS))
+    return f"""
 Extract the following fields from this resume and return valid JSON only.
 If a field is not present, return it as an empty list or empty string, do not omit it.
 
 Fields:
-- name
-- email
-- phone
-- summary
-- skills (list)
-- experience (list of objects: title, company, dates, bullets, location optional, impact optional)
-- education (list of objects: school, degree, dates, location optional, details optional)
-- projects (list of objects: name, dates, description optional, bullets optional)
-- achievements (list of strings)
-- certifications (list of objects: name, authority optional, date optional)
-- awards (list of objects: title, issuer optional, date optional)
-- publications (list of objects: title, publisher optional, date optional)
-- languages (list of strings)
-- hobbies (list of strings)
+{field_lines}
 
 Resume text:
 {text}
 """
-    resp = await client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"},
-    )
+
+
+# ---------------- Local extraction ----------------
+
+def _api_error():
+    # openai is imported lazily; by the time a call has failed it is loaded
+    import openai
+    return openai.APIError
+
+def resolve_mode(mode: Optional[str]) -> str:
+    mode = (mode or PARSE_MODE).lower()
+    if mode not in PARSE_MODES:
+        raise ValueError(f"Unknown parse mode: {mode!r} (expected one of {', '.join(PARSE_MODES)})")
+    return mode
+
+def _local_fields(text: str, layout: Optional[str] = None) -> dict:
+    local = local_extractor.extract_local(text, layout)
+    local["email"] = _best_email_from_text(text)
+    return local
+
+def _llm_fields(local: dict) -> List[str]:
+    # Hybrid mode: structured sections, plus any easy field the local pass couldn't find
+    return [f for f in _FIELDS if f not in _LOCAL_FIELDS or not local.get(f)]
+
+def _local_only(local: dict, degraded: bool = False) -> dict:
+    return validated(ParsedResume, {**local, "degraded": degraded})
+
+def _merge_local(data: dict, text: str, local: dict, mode: str) -> dict:
+    """
+    Combine LLM output with local extraction. In hybrid mode local values win when present;
+    in full mode they only fill what the LLM left empty. The result is validated against
+    ParsedResume (a ParseFailure dict if it doesn't fit).
+    """
+    if not isinstance(data, dict):
+        return validated(ParsedResume, data, json.dumps(data))
+    for field in ("name", "phone", "linkedin", "github", "links", "skills"):
+        if local.get(field) and (mode == "hybrid" or not data.get(field)):
+            data[field] = local[field]
+    data["email"] = local["email"] if mode == "hybrid" and local.get("email") \
+        else _best_email_from_text(text, data.get("email"))
+    return validated(ParsedResume, data)
+
+def _cache_key(text: str, model: str, mode: str) -> str:
+    # hybrid answers depend on what the local pass found, so its version is part of the key
+    kind = "resume" if mode == "full" else f"resume:{mode}:{local_extractor.EXTRACTOR_VERSION}"
+    return make_key(kind, text, model, PROMPT_VERSION)
+
+async def parse_resume(text: str, client: "AsyncOpenAI", use_cache: bool = True, mode: Optional[str] = None,
+                       layout: Optional[str] = None) -> dict:
+    """
+    Parse cleaned resume text. layout is the same text before cleaning (see
+    text_extractor.extract_text_with_layout); local extraction reads section headers from it.
+    """
+    mode = resolve_mode(mode)
+    local = _local_fields(text, layout)
+    if mode == "fast":
+        return _local_only(local)
+
+    fields = _llm_fields(local) if mode == "hybrid" else None
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = _cache_key(text, model, mode)
+    if use_cache:
+        cached = await parse_cache.aget(key)
+        if cached is not None:
+            return cached
+    else:
+        parse_cache.note_bypass()
+
+    try:
+        resp = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": _build_prompt(text, fields)}],
+            response_format={"type": "json_object"},
+        )
+    except _api_error() as e:
+        # API down / out of retries: answer with what we can extract locally
+        logger.warning("Resume LLM call failed (%s); returning local extraction", e)
+        return _local_only(local, degraded=True)
     raw = resp.choices[0].message.content
 
     try:
@@ -80,4 +181,95 @@ Resume text:
     except Exception:
         return {"raw": raw, "error": "JSON parse failed"}
 
+    data = _merge_local(data, text, local, mode)
+    if "error" in data:
+        return data
+    await parse_cache.aset(key, data)
     return data
+
+
+async def parse_resume_stream(
+    text: str, client: "AsyncOpenAI", use_cache: bool = True, mode: Optional[str] = None,
+    layout: Optional[str] = None,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of parse_resume.
+    Yields (field, value) pairs as soon as the model finishes emitting each top-level field;
+    in hybrid/fast mode the locally extracted fields come first. Fields corrected by the local
+    pass are yielded again at the end. On malformed output it yields ("raw", ...) and
+    ("error", ...), mirroring parse_resume.
+    """
+    mode = resolve_mode(mode)
+    local = _local_fields(text, layout)
+    if mode == "fast":
+        for field, value in _local_only(local).items():
+            yield field, value
+        return
+
+    fields = _llm_fields(local) if mode == "hybrid" else None
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = _cache_key(text, model, mode)
+    if use_cache:
+        cached = await parse_cache.aget(key)
+        if cached is not None:
+            for field, value in cached.items():
+                yield field, value
+            return
+    else:
+        parse_cache.note_bypass()
+
+    sent = {}
+    if mode == "hybrid":
+        for field in _LOCAL_FIELDS:
+            if local.get(field):
+                sent[field] = local[field]
+                yield field, local[field]
+
+    parser = JSONObjectStream()
+    chunks = []
+    stream = None
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": _build_prompt(text, fields)}],
+            response_format={"type": "json_object"},
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            chunks.append(delta)
+            for field, value in parser.feed(delta):
+                sent[field] = value
+                yield field, value
+    except _api_error() as e:
+        logger.warning("Resume LLM stream failed (%s); returning local extraction", e)
+        for field, value in _local_only(local, degraded=True).items():
+            if field not in sent:
+                yield field, value
+        return
+    finally:
+        # hands the scheduler slot back even if our consumer stopped early
+        close = getattr(stream, "close", None)
+        if close is not None:
+            await close()
+
+    raw = "".join(chunks)
+    try:
+        data = json.loads(raw)
+    except Exception:
+        yield "raw", raw
+        yield "error", "JSON parse failed"
+        return
+
+    data = _merge_local(data, text, local, mode)
+    if "error" in data:
+        yield "raw", data["raw"]
+        yield "error", data["error"]
+        return
+    # fields the local pass or validation changed (or filled in) go out again
+    for field, value in data.items():
+        if sent.get(field) != value:
+            yield field, value
+    await parse_cache.aset(key, data)
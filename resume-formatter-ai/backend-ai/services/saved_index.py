@@ -0,0 +1,321 @@
+# services/saved_index.py
+"""
+SQLite metadata index of the files under ALLOWED_SAVE_ROOT, backing /api/saved.
+
+Listing a directory is an indexed range query (keyset pagination), so a page costs the same
+whether the directory holds 50 files or 500k. The index is kept current by:
+- write hooks: anything that creates or deletes a saved file calls record() / forget()
+- a directory mtime check on every listing: if the directory changed since it was last
+  indexed (files added, removed or renamed behind our back), that one directory is rescanned
+- a full reconcile scan in the background every SAVED_RECONCILE_INTERVAL seconds, which also
+  picks up files rewritten in place (same name, new size/mtime)
+
+Contains-search (pattern=) can't use an index; it walks the directory in sort order until a
+page of matches is found. Prefix search is a range on the name index.
+"""
+import os, json, time, base64, sqlite3, asyncio, logging, threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SAVED_INDEX_PATH         = os.getenv("SAVED_INDEX_PATH", "./.saved_index.sqlite3")
+SAVED_RECONCILE_INTERVAL = float(os.getenv("SAVED_RECONCILE_INTERVAL", "300"))   # seconds; 0 disables
+SAVED_PAGE_LIMIT         = int(os.getenv("SAVED_PAGE_LIMIT", "100"))
+SAVED_PAGE_MAX           = int(os.getenv("SAVED_PAGE_MAX", "1000"))
+
+SORT_COLUMNS = {"modified": "mtime", "size": "size", "name": "name_lower"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS entries (
+    path       TEXT PRIMARY KEY,
+    parent     TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    is_dir     INTEGER NOT NULL,
+    size       INTEGER NOT NULL,
+    mtime      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_by_mtime ON entries (parent, is_dir, mtime, path);
+CREATE INDEX IF NOT EXISTS entries_by_size  ON entries (parent, is_dir, size, path);
+CREATE INDEX IF NOT EXISTS entries_by_name  ON entries (parent, is_dir, name_lower, path);
+"""
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _rel(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+def _subtree_bounds(rel: str) -> Tuple[str, str]:
+    # every path under rel/ sorts inside [rel/, rel0) since "0" follows "/"
+    return rel + "/", rel + "0"
+
+
+class SavedIndex:
+    def __init__(self, root: str, db_path: str = SAVED_INDEX_PATH):
+        self.root = os.path.realpath(root)
+        self.db_path = os.path.abspath(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'root'").fetchone()
+        if row is None or row[0] != self.root:
+            # index was built for another root: start over
+            with self._tx():
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("DELETE FROM dirs")
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('root', ?)", (self.root,))
+        self.last_reconcile = 0.0
+        self.last_reconcile_stats: dict = {}
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    def _tx(self):
+        conn = self._conn
+        class _Tx:
+            def __enter__(_):
+                conn.execute("BEGIN IMMEDIATE")
+            def __exit__(_, exc_type, *a):
+                conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return _Tx()
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, *rel.split("/")) if rel else self.root
+
+    def _skip(self, abs_path: str) -> bool:
+        # the index itself may live under the root
+        return abs_path.startswith(self.db_path)
+
+    # ---------------- scanning ----------------
+    def _scan_dir(self, rel: str) -> Tuple[Optional[float], Dict[str, tuple]]:
+        """
+        (directory mtime, {name: (is_dir, size, mtime)}), or (None, {}) if it's gone.
+        """
+        path = self._abs(rel)
+        try:
+            dir_mtime = os.stat(path).st_mtime
+            found = {}
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self._skip(entry.path):
+                        continue
+                    try:
+                        st = entry.stat()
+                        found[entry.name] = (int(entry.is_dir()), st.st_size, st.st_mtime)
+                    except OSError:
+                        continue   # vanished mid-scan or dangling symlink
+            return dir_mtime, found
+        except (FileNotFoundError, NotADirectoryError):
+            return None, {}
+
+    def _apply_dir(self, rel: str, dir_mtime: Optional[float], found: Dict[str, tuple]) -> int:
+        """
+        Make the index rows for rel's direct children match found. Returns rows written.
+        """
+        conn = self._conn
+        current = {name: (is_dir, size, mtime) for name, is_dir, size, mtime in conn.execute(
+            "SELECT name, is_dir, size, mtime FROM entries WHERE parent = ?", (rel,))}
+        stale = [name for name in current if name not in found]
+        changed = [(_rel(rel, name), rel, name, name.lower(), *meta)
+                   for name, meta in found.items() if current.get(name) != meta]
+        with self._tx():
+            for name in stale:
+                path = _rel(rel, name)
+                lo, hi = _subtree_bounds(path)
+                conn.execute("DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)", (path, lo, hi))
+                conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, lo, hi))
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+            if dir_mtime is None:
+                conn.execute("DELETE FROM dirs WHERE path = ?", (rel,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?)", (rel, dir_mtime))
+        return len(stale) + len(changed)
+
+    def refresh_dir(self, rel: str) -> bool:
+        """
+        Rescan rel if its mtime moved since it was indexed. Returns True if it was rescanned.
+        """
+        try:
+            mtime = os.stat(self._abs(rel)).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM dirs WHERE path = ?", (rel,)).fetchone()
+            if row is not None and row[0] == mtime:
+                return False
+            self._apply_dir(rel, *self._scan_dir(rel))
+        return True
+
+    def reconcile(self) -> dict:
+        """
+        Full scan of the root: index every directory, drop rows for anything that's gone.
+        """
+        started = time.monotonic()
+        written = dirs = 0
+        seen = set()
+        pending = [""]
+        while pending:
+            rel = pending.pop()
+            dir_mtime, found = self._scan_dir(rel)
+            if dir_mtime is None:
+                continue
+            seen.add(rel)
+            dirs += 1
+            with self._lock:
+                written += self._apply_dir(rel, dir_mtime, found)
+            for name, (is_dir, _, _) in found.items():
+                # don't follow directory symlinks: they can loop or leave the root
+                if is_dir and not os.path.islink(self._abs(_rel(rel, name))):
+                    pending.append(_rel(rel, name))
+        with self._lock:
+            gone = [(p,) for (p,) in self._conn.execute("SELECT path FROM dirs") if p not in seen]
+            with self._tx():
+                self._conn.executemany("DELETE FROM dirs WHERE path = ?", gone)
+                self._conn.executemany("DELETE FROM entries WHERE parent = ?", gone)
+        self.last_reconcile = time.time()
+        self.last_reconcile_stats = {"dirs": dirs, "rows_written": written, "dirs_removed": len(gone),
+                                     "seconds": round(time.monotonic() - started, 3)}
+        return self.last_reconcile_stats
+
+    def maybe_reconcile(self) -> None:
+        """
+        Start a background reconcile if the last one is older than SAVED_RECONCILE_INTERVAL.
+        """
+        if SAVED_RECONCILE_INTERVAL <= 0 or time.time() - self.last_reconcile < SAVED_RECONCILE_INTERVAL:
+            return
+        if self._reconcile_task is None or self._reconcile_task.done():
+            self.last_reconcile = time.time()   # don't start another while this one runs
+            self._reconcile_task = asyncio.create_task(asyncio.to_thread(self._safe_reconcile))
+
+    def _safe_reconcile(self) -> None:
+        try:
+            self.reconcile()
+        except Exception:
+            logger.exception("Saved-files reconcile failed")
+
+    # ---------------- write hooks ----------------
+    def record(self, abs_path: str) -> None:
+        """
+        Call after creating or rewriting a file under the root.
+        """
+        rel = os.path.relpath(os.path.abspath(abs_path), self.root).replace(os.sep, "/")
+        parent, _, name = rel.rpartition("/")
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return self.forget(abs_path)
+        with self._lock, self._tx():
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (rel, parent, name, name.lower(), int(os.path.isdir(abs_path)),
+                                st.st_size, st.st_mtime))
+            self._touch_parent(parent)
+
+    def forget(self, abs_path: str) -> None:
+        """
+        Call after deleting a file or directory under the root.
+        """
+        rel = os.path.relpath(os.path.abspath(abs_path), self.root).replace(os.sep, "/")
+        lo, hi = _subtree_bounds(rel)
+        with self._lock, self._tx():
+            self._conn.execute("DELETE FROM entries WHERE path = ? OR (path >= ? AND path < ?)", (rel, lo, hi))
+            self._conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (rel, lo, hi))
+            self._touch_parent(rel.rpartition("/")[0])
+
+    def _touch_parent(self, parent: str) -> None:
+        # the hook already applied the change the parent's new mtime reflects, so record it
+        # rather than rescanning the directory on the next listing
+        try:
+            mtime = os.stat(self._abs(parent)).st_mtime
+        except OSError:
+            return
+        self._conn.execute("UPDATE dirs SET mtime = ? WHERE path = ?", (mtime, parent))
+
+    # ---------------- queries ----------------
+    def list_dir(self, rel: str, *, include_dirs: bool = False, sort: str = "modified", order: str = "desc",
+                 prefix: Optional[str] = None, pattern: Optional[str] = None,
+                 limit: int = SAVED_PAGE_LIMIT, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of rel's direct children (directories first) as {path, name, is_dir, size, mtime}
+        rows, and the cursor for the next page (None on the last page).
+        """
+        col = SORT_COLUMNS[sort]
+        desc = order == "desc"
+        filters, params = [], []
+        if prefix:
+            filters.append("name_lower >= ? AND name_lower < ?")
+            params += [prefix.lower(), prefix.lower() + "\U0010ffff"]
+        if pattern:
+            escaped = pattern.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            filters.append("name_lower LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        after = self._decode_cursor(cursor, sort, order) if cursor else None
+        phases = [1, 0] if include_dirs else [0]
+        if after is not None:
+            phases = [p for p in phases if p <= after[0]]   # dirs (1) are listed before files (0)
+
+        rows: List[tuple] = []
+        with self._lock:
+            for is_dir in phases:
+                where = ["parent = ?", "is_dir = ?", *filters]
+                args: list = [rel, is_dir, *params]
+                if after is not None and after[0] == is_dir:
+                    where.append(f"({col}, path) {'<' if desc else '>'} (?, ?)")
+                    args += [after[1], after[2]]
+                direction = "DESC" if desc else "ASC"
+                rows += self._conn.execute(
+                    f"SELECT path, name, is_dir, size, mtime, {col} FROM entries WHERE {' AND '.join(where)} "
+                    f"ORDER BY {col} {direction}, path {direction} LIMIT ?",
+                    (*args, limit + 1 - len(rows)),
+                ).fetchall()
+                if len(rows) > limit:
+                    break
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_cursor(sort, order, last[2], last[5], last[0])
+        return [dict(zip(("path", "name", "is_dir", "size", "mtime"), r[:5])) for r in rows], next_cursor
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def _encode_cursor(sort: str, order: str, is_dir: int, value, path: str) -> str:
+        raw = json.dumps([sort, order, is_dir, value, path], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            c_sort, c_order, is_dir, value, path = json.loads(raw)
+        except (ValueError, TypeError):
+            raise CursorError("Invalid cursor.")
+        if (c_sort, c_order) != (sort, order):
+            raise CursorError("Cursor was issued for a different sort order.")
+        return int(is_dir), value, path
+
+
+_indexes: Dict[str, SavedIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_index(root: str) -> SavedIndex:
+    """
+    The shared index for a save root, opened on first use.
+    """
+    key = os.path.realpath(root)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            os.makedirs(key, exist_ok=True)
+            idx = _indexes[key] = SavedIndex(key)
+        return idx
@@ -0,0 +1,228 @@
+# services/skill_index.py
+"""
+Skill taxonomy index shared by the DOCX and LaTeX formatters.
+
+The taxonomy (group keywords + synonyms) is loaded once at import and compiled into an
+Aho-Corasick automaton, so grouping a skill is a single pass over the text instead of one
+substring test per keyword; per-skill results are cached. JD matchers are compiled once per
+JD. Below SKILL_AUTOMATON_MIN_PATTERNS patterns (a typical JD) CPython's C-level `in` beats a
+pure-Python scan, so small pattern sets use substring tests instead; the bundled taxonomy
+(about 70 patterns with synonyms) is above it.
+
+Matching rules:
+- group keywords and JD skills match as substrings (the behaviour the formatters always had:
+  "go" groups "MongoDB" under Backend as well as Databases)
+- synonyms ("k8s" -> kubernetes) only match as whole words, since short aliases like "js"
+  or "ts" would otherwise hit inside unrelated words
+"""
+import os, json, logging
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SKILL_TAXONOMY_PATH = os.getenv(
+    "SKILL_TAXONOMY_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "skill_taxonomy.json"),
+)
+# Measured crossover on skill-sized texts where one automaton pass beats a loop of `pattern in text`
+SKILL_AUTOMATON_MIN_PATTERNS = int(os.getenv("SKILL_AUTOMATON_MIN_PATTERNS", "40"))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: one scan of the text reports every occurrence of every pattern.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[int, Any]]] = [[]]
+        for word, value in patterns:
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append((len(word), value))
+
+        # Failure links, breadth first; outputs of the fallback state are inherited
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yield (start, end, value) for every pattern occurrence.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+# Characters that glue tokens together: "js" must not match inside "next.js" or "c#"
+_WORD_JOINERS = set("._+#-")
+
+def _is_edge(ch: str) -> bool:
+    return not ch.isalnum() and ch not in _WORD_JOINERS
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    return (start == 0 or _is_edge(text[start - 1])) and (end == len(text) or _is_edge(text[end]))
+
+
+class PatternMatcher:
+    """
+    Which values' patterns occur in a text. Patterns are (word, value, whole_word);
+    several patterns may share a value.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any, bool]]):
+        self._patterns = [(w, v, whole) for w, v, whole in patterns if w]
+        self._automaton = None
+        if len(self._patterns) >= SKILL_AUTOMATON_MIN_PATTERNS:
+            self._automaton = AhoCorasick((w, (v, whole)) for w, v, whole in self._patterns)
+
+    def values(self, text: str) -> Set[Any]:
+        found = set()
+        if self._automaton is not None:
+            for start, end, (value, whole_word) in self._automaton.iter(text):
+                if value not in found and (not whole_word or _is_word(text, start, end)):
+                    found.add(value)
+            return found
+
+        for word, value, whole_word in self._patterns:
+            if value in found:
+                continue
+            if not whole_word:
+                if word in text:
+                    found.add(value)
+                continue
+            start = text.find(word)
+            while start != -1:
+                if _is_word(text, start, start + len(word)):
+                    found.add(value)
+                    break
+                start = text.find(word, start + 1)
+        return found
+
+
+class JDMatcher:
+    """
+    Counts which JD skills occur in a piece of text. Duplicated JD skills count once each,
+    like the old `sum(1 for js in jd_skills if js in text)`.
+    """
+
+    def __init__(self, jd_skills: Tuple[str, ...], synonyms: Dict[str, Set[str]]):
+        patterns = []
+        self._always: Set[int] = set()   # "" is a substring of everything
+        for idx, js in enumerate(jd_skills):
+            term = str(js).lower()
+            if not term:
+                self._always.add(idx)
+                continue
+            patterns.append((term, idx, False))
+            patterns.extend((alias, idx, True) for alias in synonyms.get(term, ()) if alias != term)
+        self._matcher = PatternMatcher(patterns)
+
+    def matched(self, text: str) -> Set[int]:
+        """
+        Indexes of the JD skills found in text.
+        """
+        return self._matcher.values(str(text or "").lower()) | self._always
+
+    def count(self, text: str) -> int:
+        return len(self.matched(text))
+
+
+class SkillIndex:
+    def __init__(self, taxonomy: dict):
+        groups: Dict[str, List[str]] = taxonomy.get("groups") or {}
+        self.labels: List[str] = list(groups)
+
+        # Every spelling in a synonym family points at all the others
+        self.synonyms: Dict[str, Set[str]] = {}
+        for canonical, aliases in (taxonomy.get("synonyms") or {}).items():
+            family = {canonical.lower(), *(a.lower() for a in aliases)}
+            for term in family:
+                self.synonyms.setdefault(term, set()).update(family)
+
+        patterns = []
+        for label_idx, keywords in enumerate(groups.values()):
+            for kw in keywords:
+                kw = kw.lower()
+                patterns.append((kw, label_idx, False))
+                patterns.extend((alias, label_idx, True) for alias in self.synonyms.get(kw, ()) if alias != kw)
+        self._matcher = PatternMatcher(patterns)
+        self.groups_for = lru_cache(maxsize=4096)(self._groups_for)
+        self.jd_matcher = lru_cache(maxsize=256)(self._jd_matcher)
+
+    @classmethod
+    def load(cls, path: str) -> "SkillIndex":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (OSError, ValueError):
+            logger.exception("Could not load skill taxonomy from %s; skills will not be grouped", path)
+            return cls({})
+
+    def _groups_for(self, skill: str) -> Tuple[int, ...]:
+        return tuple(sorted(self._matcher.values(skill.lower())))
+
+    def _jd_matcher(self, jd_skills: Tuple[str, ...]) -> JDMatcher:
+        return JDMatcher(jd_skills, self.synonyms)
+
+    def group_skills(self, skills: List[str]) -> List[dict]:
+        """
+        Auto-group a flat list of skills into the taxonomy categories, in taxonomy order;
+        anything unmatched goes under "Other".
+        """
+        result = []
+        if not skills:
+            return result
+
+        buckets: List[List[str]] = [[] for _ in self.labels]
+        leftover = []
+        for s in skills:
+            label_ids = self.groups_for(str(s))
+            for i in label_ids:
+                buckets[i].append(s)
+            if not label_ids:
+                leftover.append(s)
+
+        result = [{"label": label, "items": items} for label, items in zip(self.labels, buckets) if items]
+        if leftover:
+            result.append({"label": "Other", "items": leftover})
+        return result
+
+
+index = SkillIndex.load(SKILL_TAXONOMY_PATH)
+
+def group_skills(skills: List[str]) -> List[dict]:
+    return index.group_skills(skills)
+
+def jd_matcher(jd_skills: Iterable[str]) -> JDMatcher:
+    """
+    Compiled matcher for a JD's required skills (cached, the same JD is scored many times).
+    """
+    return index.jd_matcher(tuple(str(js) for js in jd_skills or []))
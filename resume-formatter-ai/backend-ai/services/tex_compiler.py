@@ -0,0 +1,300 @@
+# services/tex_compiler.py
+"""
+Async Tectonic compile service.
+
+- compiles run as asyncio subprocesses, never blocking the event loop
+- at most TECTONIC_CONCURRENCY compiles at once; each slot has its own persistent
+  work dir and Tectonic cache dir (TECTONIC_CACHE_DIR), so bundle files stay warm
+  across compiles and concurrent runs never share a cache. Work dirs are claimed with
+  an exclusive file lock, so processes sharing TECTONIC_WORK_ROOT never share one either
+- PDFs are cached by sha256 of the TeX bytes (memory LRU + disk, bounded by
+  TEX_PDF_CACHE_BYTES and TEX_PDF_CACHE_TTL); identical TeX compiled concurrently is
+  compiled once
+
+Offline / air-gapped hosts: point TECTONIC_BUNDLE at a local bundle (file or directory)
+and/or set TECTONIC_OFFLINE=1 (--only-cached), after running `python warm_tex.py` once.
+Warm-up compiles the template into a seed cache dir, which holds every bundle file the
+preamble needs plus the LaTeX format Tectonic builds on first use, and copies it into
+each worker's cache dir. Compiles after that load the cached format instead of
+rebuilding it, and they never touch the network.
+"""
+import os, time, shutil, asyncio, hashlib, logging, itertools
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:   # Windows: fall back to per-process work dirs
+    fcntl = None
+
+from utils.blob_cache import BlobCache
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Tunables (env overridable)
+TECTONIC_BIN         = os.getenv("TECTONIC_BIN", "tectonic")
+TECTONIC_CONCURRENCY = int(os.getenv("TECTONIC_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+TECTONIC_TIMEOUT     = float(os.getenv("TECTONIC_TIMEOUT", "60"))            # seconds per compile
+TECTONIC_WORK_ROOT   = os.getenv("TECTONIC_WORK_ROOT", "./.tectonic")          # per-worker dirs
+TEX_PDF_CACHE_DIR    = os.getenv("TEX_PDF_CACHE_DIR", "./.tex_cache")          # "" disables disk tier
+TEX_PDF_CACHE_ENTRIES = int(os.getenv("TEX_PDF_CACHE_ENTRIES", "64"))         # in-memory PDFs
+TEX_PDF_CACHE_BYTES  = int(os.getenv("TEX_PDF_CACHE_BYTES", str(256 * 1024 * 1024)))  # disk tier size
+TEX_PDF_CACHE_TTL    = float(os.getenv("TEX_PDF_CACHE_TTL", str(7 * 24 * 3600)))    # seconds, 0 = forever
+TEX_FAILURE_TTL      = float(os.getenv("TEX_FAILURE_TTL", "300"))             # don't retry a failing TeX for this long
+TECTONIC_BUNDLE      = os.getenv("TECTONIC_BUNDLE", "")                         # local bundle path or URL
+TECTONIC_OFFLINE     = os.getenv("TECTONIC_OFFLINE", "0").lower() in ("1", "true", "yes")
+
+
+def tectonic_available() -> bool:
+    return shutil.which(TECTONIC_BIN) is not None
+
+def _read_bytes(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def tex_key(tex_bytes: bytes) -> str:
+    return hashlib.sha256(tex_bytes).hexdigest()
+
+
+class TexCompiler:
+    def __init__(self, concurrency: int = TECTONIC_CONCURRENCY, work_root: str = TECTONIC_WORK_ROOT,
+                 cache_dir: str = TEX_PDF_CACHE_DIR, mem_entries: int = TEX_PDF_CACHE_ENTRIES):
+        self.concurrency = max(1, concurrency)
+        self.work_root = work_root
+        self.cache = BlobCache(cache_dir, mem_entries, suffix=".pdf",
+                               max_disk_bytes=TEX_PDF_CACHE_BYTES, ttl=TEX_PDF_CACHE_TTL)
+        self._slots: Optional[asyncio.Queue] = None   # created lazily, on the running loop
+        self._failed: Dict[str, float] = {}
+        self._dirs: Dict[int, str] = {}     # slot -> claimed work dir
+        self._dir_locks: Dict[int, int] = {}   # slot -> fd holding its lock
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "joined": 0, "compiles": 0,
+                         "failures": 0, "timeouts": 0, "skipped_failed": 0}
+        self.compile_seconds = {"total": 0.0, "max": 0.0, "last": 0.0}
+
+    # ---------------- worker slots ----------------
+    def _worker_dir(self, slot: int) -> str:
+        """
+        This process's work dir for slot. Every process pointed at work_root (uvicorn
+        --workers N) draws from the same dirs, so each is claimed with an exclusive lock held
+        for the life of the process: slot i takes the first free of worker-i,
+        worker-(i + concurrency), ... and keeps its warm cache across restarts.
+        """
+        workdir = self._dirs.get(slot)
+        if workdir is None:
+            workdir = self._dirs[slot] = self._claim_dir(slot)
+        return workdir
+
+    def _claim_dir(self, slot: int) -> str:
+        os.makedirs(self.work_root, exist_ok=True)
+        if fcntl is None:
+            return os.path.abspath(os.path.join(self.work_root, f"worker-{os.getpid()}-{slot}"))
+        for n in itertools.count(slot, self.concurrency):
+            fd = os.open(os.path.join(self.work_root, f"worker-{n}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)   # another process owns it
+                continue
+            self._dir_locks[slot] = fd
+            return os.path.abspath(os.path.join(self.work_root, f"worker-{n}"))
+
+    @property
+    def seed_cache(self) -> str:
+        return os.path.abspath(os.path.join(self.work_root, "seed-cache"))
+
+    def _prepare_worker(self, slot: int) -> Tuple[str, str]:
+        """
+        (work dir, cache dir) for slot, the cache seeded from the warm-up cache the first time it is used.
+        """
+        workdir = self._worker_dir(slot)
+        cache = os.path.join(workdir, "cache")
+        if not os.path.isdir(cache):
+            if os.path.isdir(self.seed_cache):
+                shutil.copytree(self.seed_cache, cache)
+            else:
+                os.makedirs(cache, exist_ok=True)
+                if TECTONIC_OFFLINE:
+                    logger.warning("TECTONIC_OFFLINE is set but %s is empty; run `python warm_tex.py` first",
+                                   self.seed_cache)
+        return workdir, cache
+
+    def _command(self, tex_path: str, workdir: str, offline: bool) -> list:
+        cmd = [TECTONIC_BIN, "-X", "compile", tex_path, "--outdir", workdir, "--keep-logs"]
+        if TECTONIC_BUNDLE:
+            cmd += ["--bundle", TECTONIC_BUNDLE]
+        if offline:
+            cmd.append("--only-cached")
+        return cmd
+
+    def _get_slots(self) -> asyncio.Queue:
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            for i in range(self.concurrency):
+                self._slots.put_nowait(i)
+        return self._slots
+
+    # ---------------- compile ----------------
+    async def _run_tectonic(self, tex_bytes: bytes) -> Optional[bytes]:
+        slots = self._get_slots()
+        self.queued += 1
+        try:
+            with span("tectonic_queue"):
+                slot = await slots.get()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            workdir, cache = await asyncio.to_thread(self._prepare_worker, slot)
+            with span("tectonic"):
+                pdf, _ = await self._tectonic(tex_bytes, workdir, cache, TECTONIC_OFFLINE)
+            if pdf is None:
+                self.counters["timeouts"] += 1
+                return None
+            self.counters["compiles"] += 1
+            return pdf or None
+        finally:
+            elapsed = time.monotonic() - started
+            self.compile_seconds["total"] += elapsed
+            self.compile_seconds["last"] = elapsed
+            self.compile_seconds["max"] = max(self.compile_seconds["max"], elapsed)
+            self.in_flight -= 1
+            slots.put_nowait(slot)
+
+    @staticmethod
+    def _stage(tex_bytes: bytes, workdir: str) -> Tuple[str, str]:
+        # (tex path, pdf path) in workdir, with the TeX written and any previous PDF gone
+        os.makedirs(workdir, exist_ok=True)
+        tex_path = os.path.join(workdir, "resume.tex")
+        pdf_path = os.path.join(workdir, "resume.pdf")
+        with open(tex_path, "wb") as f:
+            f.write(tex_bytes)
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+        return tex_path, pdf_path
+
+    async def _tectonic(self, tex_bytes: bytes, workdir: str, cache: str, offline: bool):
+        """
+        One tectonic run in workdir. Returns (pdf bytes | b"" on failure | None on timeout, log).
+        """
+        tex_path, pdf_path = await asyncio.to_thread(self._stage, tex_bytes, workdir)
+        proc = await asyncio.create_subprocess_exec(
+            *self._command(tex_path, workdir, offline),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, cwd=workdir,
+            env={**os.environ, "TECTONIC_CACHE_DIR": cache},
+        )
+        try:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout=TECTONIC_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            logger.warning("tectonic timed out after %.0fs", TECTONIC_TIMEOUT)
+            return None, ""
+
+        log = (out or b"").decode("utf-8", "replace")
+        pdf = await asyncio.to_thread(_read_bytes, pdf_path) if proc.returncode == 0 else None
+        if pdf is None:
+            logger.warning("tectonic failed (exit %s): %s", proc.returncode, log[-2000:])
+            return b"", log
+        return pdf, log
+
+    async def compile(self, tex_bytes: bytes) -> Optional[bytes]:
+        """
+        PDF bytes for tex_bytes, or None if Tectonic is missing or the compile failed.
+        """
+        self.counters["requests"] += 1
+        key = tex_key(tex_bytes)
+        pdf = await self.cache.aget(key)
+        if pdf is not None:
+            return pdf
+        if not tectonic_available():
+            return None
+
+        failed_at = self._failed.get(key)
+        if failed_at is not None and time.monotonic() - failed_at < TEX_FAILURE_TTL:
+            self.counters["skipped_failed"] += 1
+            return None
+
+        # Identical TeX already compiling: wait for that run. The compile is its own task so a
+        # cancelled request doesn't abort it for everyone else.
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compile_and_store(key, tex_bytes))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        else:
+            self.counters["joined"] += 1
+        return await asyncio.shield(task)
+
+    async def _compile_and_store(self, key: str, tex_bytes: bytes) -> Optional[bytes]:
+        try:
+            pdf = await self._run_tectonic(tex_bytes)
+        except Exception:
+            logger.exception("tectonic compile crashed")
+            pdf = None
+        if pdf is None:
+            self.counters["failures"] += 1
+            now = time.monotonic()
+            self._failed = {k: t for k, t in self._failed.items() if now - t < TEX_FAILURE_TTL}
+            self._failed[key] = now
+            return None
+        self._failed.pop(key, None)
+        await asyncio.to_thread(self.cache.put, key, pdf)
+        return pdf
+
+    # ---------------- warm-up ----------------
+    async def warm(self, tex_bytes: bytes) -> dict:
+        """
+        Compile tex_bytes into the seed cache, then copy the seed into every worker's cache dir.
+        Needs network access unless TECTONIC_BUNDLE is a local bundle.
+        """
+        if not tectonic_available():
+            return {"ok": False, "detail": f"{TECTONIC_BIN} not found on PATH"}
+        started = time.monotonic()
+        seed_work = os.path.abspath(os.path.join(self.work_root, "seed-work"))
+        os.makedirs(self.seed_cache, exist_ok=True)
+        pdf, log = await self._tectonic(tex_bytes, seed_work, self.seed_cache, offline=False)
+        if not pdf:
+            return {"ok": False, "detail": "timed out" if pdf is None else log[-2000:]}
+
+        def _copy_to_workers() -> None:
+            for slot in range(self.concurrency):
+                cache = os.path.join(self._worker_dir(slot), "cache")
+                shutil.rmtree(cache, ignore_errors=True)
+                shutil.copytree(self.seed_cache, cache)
+
+        await asyncio.to_thread(_copy_to_workers)
+        self._failed.clear()
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(self.seed_cache) for f in files)
+        return {"ok": True, "seconds": round(time.monotonic() - started, 2), "workers": self.concurrency,
+                "cache_dir": self.seed_cache, "cache_bytes": size}
+
+    def stats(self) -> dict:
+        compiles = self.counters["compiles"] + self.counters["timeouts"]
+        return {
+            "tectonic_available": tectonic_available(),
+            "bundle": TECTONIC_BUNDLE or "default",
+            "offline": TECTONIC_OFFLINE,
+            "warmed": os.path.isdir(self.seed_cache),
+            "concurrency": self.concurrency,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "counters": {**self.counters, "mem_hits": self.cache.mem_hits, "disk_hits": self.cache.disk_hits,
+                         "evictions": self.cache.evictions},
+            "compile_seconds": {
+                "total": round(self.compile_seconds["total"], 3),
+                "avg": round(self.compile_seconds["total"] / compiles, 3) if compiles else 0.0,
+                "max": round(self.compile_seconds["max"], 3),
+                "last": round(self.compile_seconds["last"], 3),
+            },
+            "mem_entries": len(self.cache),
+        }
+
+
+tex_compiler = TexCompiler()
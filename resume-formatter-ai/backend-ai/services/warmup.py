@@ -0,0 +1,96 @@
+# services/warmup.py
+"""
+Optional start-up warm-up: loads the lazily imported libraries and compiles templates before
+the worker takes traffic, so the first request doesn't pay for it.
+
+STARTUP_WARMUP=0           nothing; heavy deps load on first use (fastest boot)
+STARTUP_WARMUP=1           warm inside the lifespan hook; the worker accepts connections when done
+STARTUP_WARMUP=background  start serving immediately, warm in a thread; /api/ready says 503 until done
+"""
+import os, time, asyncio, logging
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "0").lower()
+
+_SAMPLE_TEXT = "J o h n  D o e\nC G P A : 8 . 6 / 1 0\nAug2020\nSKILLS Python, React\n9 8 7 6 5 4 3 2 1 0"
+
+
+def _regexes() -> None:
+    from utils.text_normalizer import clean_extracted_text
+    from services.local_extractor import extract_local
+    from utils.prompt_compactor import compact_jd_text
+    extract_local(clean_extracted_text(_SAMPLE_TEXT), _SAMPLE_TEXT)
+    compact_jd_text("Requirements:\nPython\nBenefits:\nCoffee")
+
+def _skills() -> None:
+    from services.skill_index import group_skills
+    group_skills(["Python", "React"])
+
+def _relevance() -> None:
+    from services.relevance import score_texts
+    score_texts(["Built Python APIs"], {"skills_required": ["Python"]})   # numpy import
+
+def _templates() -> None:
+    from services.latex_renderer import get_env
+    get_env().get_template("resume_modern.tex.j2")
+
+def _pdf() -> None:
+    import pypdf  # noqa: F401
+
+def _docx() -> None:
+    import docx2txt  # noqa: F401
+    from services.docx_builder import get_prototype
+    get_prototype().new().to_bytes()   # loads the base template once
+
+def _pandoc() -> None:
+    from utils.file_converter import ensure_pandoc
+    if ensure_pandoc() is None:
+        raise RuntimeError("pandoc unavailable")
+
+def _openai(app) -> Callable[[], None]:
+    def step() -> None:
+        client = getattr(app.state, "openai_client", None)
+        if client is not None:
+            getattr(client, "chat")   # builds the SDK client if it was deferred
+    return step
+
+
+def steps(app) -> List[Tuple[str, Callable[[], None]]]:
+    return [
+        ("regexes", _regexes),
+        ("skills", _skills),
+        ("relevance", _relevance),
+        ("templates", _templates),
+        ("pdf", _pdf),
+        ("docx", _docx),
+        ("pandoc", _pandoc),
+        ("openai", _openai(app)),
+    ]
+
+def _run_steps(app) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for name, step in steps(app):
+        started = time.perf_counter()
+        try:
+            step()
+            results[name] = {"ok": True}
+        except Exception as e:
+            # a missing optional converter shouldn't keep the worker from serving
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            results[name] = {"ok": False, "detail": str(e)}
+        results[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return results
+
+async def run(app) -> None:
+    """
+    Run every warm-up step off the event loop and mark the app ready.
+    """
+    started = time.perf_counter()
+    app.state.warmup = {"status": "running"}
+    results = await asyncio.to_thread(_run_steps, app)
+    app.state.warmup = {"status": "done", "steps": results,
+                        "total_ms": round((time.perf_counter() - started) * 1000, 1)}
+    app.state.ready = True
+    logger.info("Warm-up finished in %.0f ms", app.state.warmup["total_ms"])
@@ -0,0 +1,40 @@
+# tests/conftest.py
+import os, sys, tempfile
+
+import pytest
+
+# The app imports its packages from backend-ai/ (utils, services, models, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches and stores read their directories at import: point them at scratch space before any
+# test module imports them, and never let a test reach the real API
+_SCRATCH = tempfile.mkdtemp(prefix="resume-tests-")
+for var, sub in (("PARSE_CACHE_DIR", "parse_cache"), ("PARSED_STORE_DIR", "parsed_store"),
+                 ("CONVERT_CACHE_DIR", "convert_cache"), ("TEX_PDF_CACHE_DIR", "tex_cache"),
+                 ("TECTONIC_WORK_ROOT", "tectonic"), ("BATCH_DIR", "batches"),
+                 ("SAVED_GZIP_CACHE_DIR", "saved_gz"), ("ALLOWED_SAVE_ROOT", "saved")):
+    os.environ[var] = os.path.join(_SCRATCH, sub)
+os.environ["SAVED_INDEX_PATH"] = os.path.join(_SCRATCH, "saved_index.sqlite3")
+os.environ["OPENAI_API_KEY"] = "sk-test-fake"
+os.environ["OPENAI_MODEL"] = "gpt-4o-mini"
+os.environ["STARTUP_WARMUP"] = "0"
+os.environ["LLM_RPM"] = "0"
+os.environ["LLM_TPM"] = "0"
+
+
+@pytest.fixture
+def fake_llm():
+    from benchmarks.fake_llm import FakeOpenAI
+    return FakeOpenAI()
+
+@pytest.fixture
+def api(fake_llm):
+    """
+    TestClient for the app with FakeOpenAI behind the real LLM scheduler.
+    """
+    from fastapi.testclient import TestClient
+    import main
+    from services.llm_scheduler import ScheduledOpenAI
+    main.app.state.openai_client = ScheduledOpenAI(lambda: fake_llm, main.app.state.llm_scheduler)
+    with TestClient(main.app) as client:
+        yield client
@@ -0,0 +1,120 @@
+# tests/test_batch.py
+"""
+/api/parse/batch: every file gets a result event, the ranking is by score with upload order
+breaking ties, a finished batch replays from disk, and a re-upload only re-parses what has no
+result yet. Uploads are capped per batch, and old batch directories are swept.
+"""
+import io, os, json, time, zipfile
+
+import pytest
+
+from benchmarks.corpus import docx_bytes
+from services import batch_runner
+
+DOCX_MT = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# hybrid mode keeps the locally extracted skills, so each file scores by its own SKILLS line
+# against the fake JD's Python, PostgreSQL, Docker, AWS
+SKILLS = [("ann", "Python"), ("bob", "Python, Docker, AWS"), ("cy", "Go"), ("dee", "Python")]
+
+
+def _files(skills=SKILLS):
+    return [("resumes", (f"{n}.docx", docx_bytes([n.title() + " Doe", "SKILLS", s]), DOCX_MT)) for n, s in skills]
+
+def _events(r) -> list:
+    assert r.status_code == 200, r.text
+    return [json.loads(line) for line in r.text.splitlines() if line.strip()]
+
+def _batch(api, jd: str, files=None, **data):
+    return api.post("/api/parse/batch", files=files or _files(),
+                    data={"jd_text": jd, "mode": "hybrid", **data})
+
+
+def test_ranking_by_score_then_upload_order(api):
+    events = _events(_batch(api, "Backend Engineer\nRequirements:\nPython (ranking)"))
+    assert [e["event"] for e in events[:2]] == ["batch", "job"]
+    results = [e for e in events if e["event"] == "result"]
+    assert sorted(e["index"] for e in results) == [0, 1, 2, 3]
+    assert all(e["status"] == "ok" and e["resume_id"] for e in results)
+    done = events[-1]
+    assert done["event"] == "done"
+    assert (done["total"], done["ok"], done["degraded"], done["failed"]) == (4, 4, 0, 0)
+    assert [(r["filename"], r["score"]) for r in done["ranking"]] == \
+        [("bob.docx", 3), ("ann.docx", 1), ("dee.docx", 1), ("cy.docx", 0)]
+
+
+def test_same_filename_twice_is_two_results(api):
+    files = [("resumes", ("resume.docx", docx_bytes([n, "SKILLS", "Python"]), DOCX_MT)) for n in ("A One", "B Two")]
+    done = _events(_batch(api, "Backend Engineer\nRequirements:\nPython (names)", files))[-1]
+    assert [r["index"] for r in done["ranking"]] == [0, 1]
+
+
+def test_replay_and_resume(api, fake_llm):
+    jd = "Backend Engineer\nRequirements:\nPython (replay)"
+    r = _batch(api, jd)
+    events, batch_id = _events(r), r.headers["x-batch-id"]
+
+    replay = _events(api.get(f"/api/parse/batch/{batch_id}", params={"offset": 2}))
+    assert replay == events[2:]
+
+    # forget the in-memory job, as after a restart: the re-upload reuses every stored result
+    batch_runner._jobs.clear()
+    assert _events(api.get(f"/api/parse/batch/{batch_id}")) == events
+    calls = fake_llm.calls
+    again = _events(_batch(api, jd))
+    assert again[0]["resumed"] == 4
+    assert all(e["resumed"] for e in again if e["event"] == "result")
+    assert again[-1]["ranking"] == events[-1]["ranking"]
+    assert fake_llm.calls == calls   # the JD comes from the parse cache, the resumes from the log
+
+
+@pytest.mark.parametrize("batch_id", ["0" * 24, "../etc"])
+def test_unknown_batch_is_404(api, batch_id):
+    assert api.get(f"/api/parse/batch/{batch_id}").status_code == 404
+
+
+def test_unsupported_file_is_400(api):
+    r = _batch(api, "Backend Engineer (txt)", [("resumes", ("cv.txt", b"Jane Doe", "text/plain"))])
+    assert r.status_code == 400
+
+
+def _zip(names) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for i, name in enumerate(names):
+            zf.writestr(name, docx_bytes([f"Person {i}", "SKILLS", "Python"]))
+    return buf.getvalue()
+
+def test_archive(api):
+    archive = _zip(["a/one.docx", "two.docx", "__MACOSX/._one.docx", "notes.txt"])
+    r = api.post("/api/parse/batch", files={"archive": ("cvs.zip", archive, "application/zip")},
+                 data={"jd_text": "Backend Engineer (zip)"})
+    assert [r["filename"] for r in _events(r)[-1]["ranking"]] == ["a/one.docx", "two.docx"]
+
+
+def test_total_bytes_limit_is_413(api, monkeypatch):
+    one = len(_files()[0][1][1])
+    monkeypatch.setattr(batch_runner, "BATCH_MAX_TOTAL_BYTES", 2 * one + one // 2)
+    r = _batch(api, "Backend Engineer (too big)")
+    assert r.status_code == 413
+    archive = _zip(["1.docx", "2.docx", "3.docx"])
+    r = api.post("/api/parse/batch", files={"archive": ("cvs.zip", archive, "application/zip")},
+                 data={"jd_text": "Backend Engineer (too big zip)"})
+    assert r.status_code == 413
+    assert not [n for n in os.listdir(batch_runner.BATCH_DIR) if n.startswith(".staging-")]
+
+
+def test_sweep_removes_old_batches(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_runner, "BATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(batch_runner, "BATCH_TTL", 3600)
+    old = time.time() - 7200
+    for name in ("old", "running", "fresh", ".staging-x"):
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / "results.ndjson").write_text("{}\n")
+        if name != "fresh":
+            os.utime(tmp_path / name / "results.ndjson", (old, old))
+            os.utime(tmp_path / name, (old, old))
+    assert sorted(batch_runner._sweep({"running"})) == [".staging-x", "old"]
+    assert sorted(os.listdir(tmp_path)) == ["fresh", "running"]
+
+    monkeypatch.setattr(batch_runner, "BATCH_TTL", 0)
+    assert batch_runner._sweep(set()) == []
@@ -0,0 +1,257 @@
+# tests/test_llm_scheduler.py
+"""
+LLM scheduler on a fake clock with a scripted client, so no test waits in real time: FIFO
+admission against the token buckets, the shared pause after a 429, the budget refunded when a
+call is cancelled before it is sent, and a streamed completion giving its slot back however it
+ends (exhausted, cancelled, or dropped without close()).
+"""
+import gc, math, asyncio
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from services import llm_scheduler
+from services.llm_scheduler import LLMScheduler, TokenBucket, estimate_tokens
+
+MESSAGES = [{"role": "user", "content": "x" * 400}]   # 100 + 4 + 3 prompt tokens
+_real_sleep = asyncio.sleep
+
+
+class Clock:
+    """
+    Stands in for the scheduler's `time`, `asyncio` and `random` modules (only its own
+    references are swapped; the event loop keeps the real clock). Sleeping advances time.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float, result=None):
+        if delay > 0:
+            # like a real sleep, always move time on, even when delay is below float resolution
+            self.now = max(self.now + delay, math.nextafter(self.now, math.inf))
+        await _real_sleep(0)
+        return result
+
+    def uniform(self, a: float, b: float) -> float:
+        return a   # no jitter
+
+class _Module:
+    def __init__(self, real, **overrides):
+        self._real = real
+        self.__dict__.update(overrides)
+
+    def __getattr__(self, name):
+        return getattr(self._real, name)
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(llm_scheduler, "time", _Module(llm_scheduler.time, monotonic=c.monotonic))
+    monkeypatch.setattr(llm_scheduler, "asyncio", _Module(asyncio, sleep=c.sleep))
+    monkeypatch.setattr(llm_scheduler, "random", _Module(llm_scheduler.random, uniform=c.uniform))
+    return c
+
+
+class Client:
+    """
+    chat.completions.create stand-in: answers from `script` in order ("ok", 429, 500 or
+    "hang"), then "ok". Streams yield `chunks` pieces of text, then a usage chunk.
+    """
+
+    def __init__(self, *script, chunks: int = 2):
+        self.script = list(script)
+        self.calls = []
+        self.chunks = chunks
+        self.gate = asyncio.Event()
+
+    def _error(self, status: int):
+        headers = {"retry-after-ms": "2000"} if status == 429 else {}
+        response = SimpleNamespace(status_code=status, headers=headers, request=None)
+        cls = openai.RateLimitError if status == 429 else openai.InternalServerError
+        return cls(f"fake {status}", response=response, body=None)
+
+    async def create(self, stream: bool = False, **kwargs):
+        self.calls.append(llm_scheduler.time.monotonic())
+        step = self.script.pop(0) if self.script else "ok"
+        if step == "hang":
+            await self.gate.wait()
+        elif step != "ok":
+            raise self._error(step)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10)
+        if stream:
+            return self._stream(usage)
+        return SimpleNamespace(usage=usage, choices=[])
+
+    async def _stream(self, usage):
+        for i in range(self.chunks):
+            if i == 1:
+                await self.gate.wait()   # the second chunk waits until the test lets it go
+            delta = SimpleNamespace(content="abcd")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(MESSAGES, 50) == 107 + 50
+    assert estimate_tokens(MESSAGES) == 107 + llm_scheduler.LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def test_token_bucket(clock):
+    b = TokenBucket(60)
+    b.take(60)
+    assert b.wait_time(1) == pytest.approx(1.0)
+    clock.now += 0.5
+    assert b.wait_time(1) == pytest.approx(0.5)
+    b.adjust(10)
+    assert b.wait_time(10) == 0.0
+    assert b.wait_time(1000) == pytest.approx(49.5)   # capped at one minute of budget
+    b.drain()
+    assert b.snapshot()["available"] == 0
+    assert TokenBucket(0).wait_time(10 ** 9) == 0.0
+
+
+def test_admission_waits_for_the_request_bucket_in_order(clock):
+    async def main():
+        s, client = LLMScheduler(rpm=2, tpm=0, max_concurrency=0), Client()
+        await asyncio.gather(*(s.run(client.create, model="m", messages=MESSAGES) for _ in range(4)))
+        return client.calls
+    assert _run(main()) == [1000.0, 1000.0, 1030.0, 1060.0]
+
+
+def test_admission_waits_for_the_token_bucket(clock):
+    async def main():
+        s, client = LLMScheduler(rpm=0, tpm=600, max_concurrency=0), Client("hang", "hang", "hang")
+        # 157 estimated each; the first three stay in flight, so nothing is reconciled yet
+        tasks = [asyncio.create_task(s.run(client.create, model="m", messages=MESSAGES, max_tokens=50))
+                 for _ in range(4)]
+        while len(client.calls) < 4:
+            await _real_sleep(0)
+        client.gate.set()
+        await asyncio.gather(*tasks)
+        return s, client.calls
+    s, calls = _run(main())
+    assert calls[:3] == [1000.0] * 3
+    assert calls[3] == pytest.approx(1000.0 + (157 - (600 - 3 * 157)) / 10)
+    assert s.tokens_by_model["m"] == {"prompt_tokens": 400, "completion_tokens": 40}
+
+
+def test_429_pauses_every_caller(clock):
+    async def main():
+        s, client = LLMScheduler(rpm=0, tpm=0, max_concurrency=1), Client(429)
+        await asyncio.gather(*(s.run(client.create, model="m", messages=MESSAGES) for _ in range(2)))
+        return s, client.calls
+    s, calls = _run(main())
+    # the first call is limited; its retry and the queued call both wait out retry-after-ms
+    assert calls == [1000.0, 1002.0, 1002.0]
+    assert s.counters["rate_limited"] == 1 and s.counters["retries"] == 1
+    assert s.counters["completed"] == 2 and s.in_flight == 0
+
+
+def test_429_drains_the_token_bucket(clock):
+    async def main():
+        s, client = LLMScheduler(rpm=0, tpm=6000, max_concurrency=1), Client(429)
+        await s.run(client.create, model="m", messages=MESSAGES)
+        return client.calls
+    # the retry waits out the pause, then for the 1107 estimated tokens to refill at 100/s
+    assert _run(main()) == [1000.0, pytest.approx(1011.07)]
+
+
+def test_non_retryable_error_releases_the_slot(clock):
+    async def main():
+        s = LLMScheduler(rpm=0, tpm=0, max_concurrency=1, max_retries=1)
+        with pytest.raises(openai.InternalServerError):
+            await s.run(Client(500, 500).create, model="m", messages=MESSAGES)
+        await s.run(Client().create, model="m", messages=MESSAGES)
+        return s
+    s = _run(main())
+    assert s.counters["failed"] == 1 and s.counters["retries"] == 1 and s.in_flight == 0
+
+
+def test_cancelled_before_sending_refunds_the_budget(clock):
+    async def main():
+        s, client = LLMScheduler(rpm=60, tpm=6000, max_concurrency=1), Client("hang")
+        first = asyncio.create_task(s.run(client.create, model="m", messages=MESSAGES))
+        await _real_sleep(0)
+        budget = (s.requests.tokens, s.tokens.tokens)
+        second = asyncio.create_task(s.run(client.create, model="m", messages=MESSAGES))
+        await _real_sleep(0)
+        assert s.tokens.tokens < budget[1]   # admitted, waiting for the slot
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        after = (s.requests.tokens, s.tokens.tokens)
+        client.gate.set()
+        await first
+        return budget, after, len(client.calls)
+    budget, after, calls = _run(main())
+    assert after == budget
+    assert calls == 1
+
+
+def _stream_scheduler():
+    return LLMScheduler(rpm=0, tpm=0, max_concurrency=1), Client()
+
+async def _open(s, client):
+    return await s.run(client.create, model="m", messages=MESSAGES, stream=True)
+
+
+def test_stream_holds_the_slot_until_exhausted(clock):
+    async def main():
+        s, client = _stream_scheduler()
+        stream = await _open(s, client)
+        assert s.in_flight == 1
+        client.gate.set()
+        assert [c async for c in stream][-1].usage.prompt_tokens == 100
+        return s
+    s = _run(main())
+    assert s.in_flight == 0 and s.counters["completed"] == 1
+    assert s.tokens_by_model["m"] == {"prompt_tokens": 100, "completion_tokens": 10}
+
+
+def test_cancelled_stream_releases_the_slot(clock):
+    async def main():
+        s, client = _stream_scheduler()
+        stream = await _open(s, client)
+
+        async def consume():
+            async for _ in stream:
+                pass
+        task = asyncio.create_task(consume())
+        await _real_sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert s.in_flight == 0 and s.counters["failed"] == 1
+        await asyncio.wait_for(_open(s, client), 1)   # the slot is free again
+        return s
+    _run(main())
+
+
+def test_closed_stream_releases_the_slot(clock):
+    async def main():
+        s, client = _stream_scheduler()
+        async with await _open(s, client) as stream:
+            await stream.__anext__()
+        assert s.in_flight == 0 and s.counters["completed"] == 1
+    _run(main())
+
+
+def test_abandoned_stream_releases_the_slot(clock):
+    async def main():
+        s, client = _stream_scheduler()
+        stream = await _open(s, client)
+        await stream.__anext__()
+        del stream
+        gc.collect()
+        assert s.in_flight == 0 and s.counters["failed"] == 1
+        await asyncio.wait_for(_open(s, client), 1)
+    _run(main())
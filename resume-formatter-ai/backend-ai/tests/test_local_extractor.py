@@ -0,0 +1,79 @@
+# tests/test_local_extractor.py
+"""
+Local extraction reads section headers from whole lines of the text before cleaning: a known
+label in ALL CAPS or ending in ":". Prose that mentions "Skills" or "Experience" must not open
+a section, since hybrid mode trusts the local skills and never asks the LLM for them.
+"""
+import pytest
+
+from utils.text_normalizer import clean_extracted_text
+from services.local_extractor import extract_local
+from benchmarks.corpus import make_corpus
+
+
+def _local(layout: str) -> dict:
+    return extract_local(clean_extracted_text(layout), layout)
+
+def _sections(local: dict) -> list:
+    return [s["section"] for s in local["sections"]]
+
+
+PROSE_CASES = [
+    "Jane Doe\nSUMMARY\nstrong Communication Skills and 5 years Experience.\nSKILLS\nPython, Go\nEXPERIENCE\nAcme",
+    "Jane Doe\nSummary:\nI list my Skills: below and my Education after that.\nSkills:\nPython, Go\nEducation:\nMIT",
+    "Jane Doe\nSKILLS\nPython, Go\nEXPERIENCE\nLed Projects and Certifications work for the team.\nPROJECTS\nParser",
+]
+
+@pytest.mark.parametrize("layout", PROSE_CASES)
+def test_prose_mentioning_section_words_is_not_a_header(layout):
+    local = _local(layout)
+    assert local["skills"] == ["Python", "Go"]
+    assert local["name"] == "Jane Doe"
+
+
+def test_summary_sentence_does_not_open_sections():
+    layout = "Jane Doe\nSUMMARY\nstrong Communication Skills and 5 years Experience.\nEXPERIENCE\nAcme"
+    local = _local(layout)
+    assert local["skills"] == []
+    assert _sections(local) == ["summary", "experience"]
+
+
+@pytest.mark.parametrize("line", ["Skills", "Technical Skills", "Experience"])
+def test_title_case_line_without_colon_is_not_a_header(line):
+    assert _sections(_local(f"Jane Doe\n{line}\nPython, Go")) == []
+
+
+@pytest.mark.parametrize("line", ["SKILLS", "Skills:", "TECHNICAL SKILLS", "Key Skills :", "S\nK\nI\nL\nL\nS"])
+def test_header_lines(line):
+    local = _local(f"Jane Doe\n{line}\nPython, Go\nEDUCATION\nMIT")
+    assert _sections(local) == ["skills", "education"]
+    assert local["skills"] == ["Python", "Go"]
+
+
+def test_languages_label_inside_skills_is_not_a_section():
+    local = _local("Jane Doe\nSKILLS\nFrameworks: React\nLanguages:\nJava, Python\nEDUCATION\nMIT")
+    assert _sections(local) == ["skills", "education"]
+    assert local["skills"] == ["React", "Java", "Python"]
+
+
+def test_skill_lists_one_per_line_and_wrapped():
+    assert _local("A B\nSKILLS\nPython\nMachine Learning\nGo")["skills"] == ["Python", "Machine Learning", "Go"]
+    assert _local("A B\nSKILLS\nPython, Machine\nLearning, Go")["skills"] == ["Python", "Machine Learning", "Go"]
+
+
+def test_cleaned_text_alone_finds_no_sections():
+    # without the layout there are no lines to read headers from; hybrid mode then asks the LLM
+    text = clean_extracted_text("Jane Doe\nSKILLS\nPython, Go")
+    assert extract_local(text)["skills"] == []
+
+
+def test_contact_fields():
+    local = _local("Jane Doe | jane@example.com | +1 415 555 0100 | linkedin.com/in/janedoe\nSKILLS\nGo")
+    assert local["name"] == "Jane Doe"
+    assert local["phone"] == "+1 415 555 0100"
+    assert local["linkedin"] == "linkedin.com/in/janedoe"
+
+
+def test_corpus_skills_match_ground_truth():
+    for sample in make_corpus(12, 7)["samples"]:
+        assert _local(sample["text"])["skills"] == sample["resume"]["skills"], sample["id"]
@@ -0,0 +1,79 @@
+# tests/test_models.py
+"""
+Response models: whatever shape the model's JSON comes in (nulls, numbers, a bare string for
+a list, a dict of groups, a string for an object), validation hands back the documented
+shape with defaults filled in. What can't be coerced (not an object at all) becomes a
+ParseFailure, and /api/parse serializes either one.
+"""
+import json
+
+import pytest
+
+from benchmarks.corpus import docx_bytes
+from benchmarks.fake_llm import FakeProfile
+from models.common import ParseFailure, validated
+from models.jd import ParsedJD
+from models.resume import Education, Experience, ParsedResume
+
+TEXT_CASES = [(None, ""), ("  Jane  ", "Jane"), (42, "42"), (["Go", None, "", "Python"], "Go, Python"),
+              ({"city": "Austin", "state": "TX"}, "Austin, TX"), ([], "")]
+
+@pytest.mark.parametrize("value, expected", TEXT_CASES)
+def test_text(value, expected):
+    assert ParsedResume.model_validate({"name": value}).name == expected
+
+
+TEXT_LIST_CASES = [
+    (None, []), ("", []), ("Python", ["Python"]), (["Python", None, " Go ", 3], ["Python", "Go", "3"]),
+    ({"Languages": ["Python", "Go"], "Tools": "Docker"}, ["Python", "Go", "Docker"]),
+    ([["a", "b"], {"x": "c"}], ["a, b", "c"]),
+]
+
+@pytest.mark.parametrize("value, expected", TEXT_LIST_CASES)
+def test_text_list(value, expected):
+    assert ParsedResume.model_validate({"skills": value}).skills == expected
+
+
+def test_item_list_and_items_from_strings():
+    r = ParsedResume.model_validate({
+        "experience": "Backend Engineer",
+        "education": [None, "", {}, "MIT", {"school": "CMU", "degree": None, "details": "Dean's list"}],
+        "projects": {"name": "Parser", "tech": "Python", "unknown": 1},
+    })
+    assert r.experience == [Experience(title="Backend Engineer")]
+    assert [e.school for e in r.education] == ["MIT", "CMU"]
+    assert r.education[1] == Education(school="CMU", details=["Dean's list"])
+    assert r.projects[0].name == "Parser" and r.projects[0].tech == ["Python"]
+
+
+def test_defaults_and_unknown_keys():
+    data = validated(ParsedResume, {"name": "Jane", "favourite_colour": "green"})
+    assert data["name"] == "Jane" and "favourite_colour" not in data
+    assert data["skills"] == [] and data["experience"] == [] and data["degraded"] is False
+    assert set(data) == set(ParsedResume.model_fields)
+    assert set(validated(ParsedJD, {})) == set(ParsedJD.model_fields)
+
+
+@pytest.mark.parametrize("data", [["not", "an", "object"], "text", None, 3, {"degraded": "maybe"}])
+def test_parse_failure(data):
+    out = validated(ParsedResume, data, raw="the raw answer")
+    assert ParseFailure.model_validate(out) == ParseFailure(raw="the raw answer", error=out["error"])
+    assert out["error"].startswith("Schema validation failed")
+
+def test_parse_failure_without_raw_keeps_the_data():
+    out = validated(ParsedJD, ["x"])
+    assert json.loads(out["raw"]) == ["x"]
+
+
+def test_parse_endpoint_serializes_a_failure(api, fake_llm):
+    # the fake answers the JD prompt with a list: the job comes back as a ParseFailure
+    fake_llm.profile = FakeProfile(canned={"jd": ["not", "an", "object"]})
+    resume = docx_bytes(["Jane Doe", "SKILLS", "Python"])
+    r = api.post("/api/parse", data={"jd_text": "Backend Engineer (failure)"},
+                 files={"resume": ("cv.docx", resume,
+                                   "application/vnd.openxmlformats-officedocument.wordprocessingml.document")})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert set(body["job"]) == {"raw", "error"}
+    assert json.loads(body["job"]["raw"]) == ["not", "an", "object"]
+    assert set(body["resume"]) == set(ParsedResume.model_fields)
@@ -0,0 +1,166 @@
+# tests/test_parse_cache.py
+"""
+Parse cache tiers: a value set by one process is a memory hit there and a disk hit for any
+other instance on the same directory. One TTL, counted from the write, applies to memory,
+disk reads and the sweep alike; past the size cap the sweep removes least recently used files
+first. The async API answers memory hits inline and leaves every file operation to a thread.
+"""
+import os, asyncio, threading
+from types import SimpleNamespace
+
+import pytest
+
+from services import parse_cache as pc
+from services.parse_cache import ParseCache, make_key
+
+VALUE = {"name": "Jane Doe", "skills": ["Python", "Go"]}
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(pc, "time", SimpleNamespace(time=c.time))
+    return c
+
+def _cache(path, **kw) -> ParseCache:
+    args = {"ttl": 3600, "max_entries": 8, "max_disk_bytes": 10 ** 6, **kw}
+    return ParseCache(str(path), **args)
+
+def _files(path) -> list:
+    return sorted(name for _, _, files in os.walk(path) for name in files)
+
+
+def test_key_covers_kind_model_and_prompt_version():
+    base = make_key("resume", "text", "gpt-4o-mini", "1")
+    assert base == make_key("resume", "text", "gpt-4o-mini", "1")
+    others = [make_key("jd", "text", "gpt-4o-mini", "1"), make_key("resume", "text", "gpt-4o", "1"),
+              make_key("resume", "text", "gpt-4o-mini", "2"), make_key("resume", "text2", "gpt-4o-mini", "1")]
+    assert base not in others
+
+
+def test_memory_then_disk_hits(tmp_path, clock):
+    key = make_key("resume", "text", "m", "1")
+    writer = _cache(tmp_path)
+    assert writer.get(key) is None
+    writer.set(key, VALUE)
+    hit = writer.get(key)
+    assert hit == VALUE
+    hit["skills"].append("mutated")          # callers get a copy
+    assert writer.get(key) == VALUE
+    assert (writer.counters["misses"], writer.counters["mem_hits"]) == (1, 2)
+
+    reader = _cache(tmp_path)                 # another worker on the same directory
+    assert reader.get(key) == VALUE
+    assert reader.get(key) == VALUE
+    assert (reader.counters["disk_hits"], reader.counters["mem_hits"]) == (1, 1)
+    assert reader.stats()["hit_rate"] == 1.0
+
+
+@pytest.mark.parametrize("age, hit", [(3599, True), (3601, False)])
+def test_one_ttl_for_both_tiers_and_the_sweep(tmp_path, clock, age, hit):
+    key = make_key("resume", "text", "m", "1")
+    writer = _cache(tmp_path)
+    writer.set(key, VALUE)
+    clock.now += age
+    assert (writer.get(key) == VALUE) is hit         # memory
+    assert (_cache(tmp_path).get(key) == VALUE) is hit  # disk, counted from the write not the read
+    if hit:
+        # a disk read refreshes atime only: the entry still expires at the same moment
+        clock.now += 2
+        assert _cache(tmp_path).get(key) is None
+    assert _files(tmp_path) == []                    # expired files are removed when read
+
+
+def test_sweep_removes_expired_files(tmp_path, clock):
+    cache = _cache(tmp_path)
+    cache.set(make_key("a", "", "m", "1"), VALUE)
+    clock.now += 1800
+    cache.set(make_key("b", "", "m", "1"), VALUE)
+    clock.now += 1801
+    assert cache.evict() == 1
+    assert _files(tmp_path) == [make_key("b", "", "m", "1") + ".json"]
+
+
+def test_memory_tier_is_lru(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=2)
+    a, b, c = (make_key(k, "", "m", "1") for k in "abc")
+    cache.set(a, {"v": "a"})
+    cache.set(b, {"v": "b"})
+    cache.get(a)
+    cache.set(c, {"v": "c"})
+    assert list(cache._mem) == [a, c]
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path, clock):
+    a, b, c = (make_key(k, "", "m", "1") for k in "abc")
+    cache = _cache(tmp_path)
+    for key in (a, b, c):
+        clock.now += 1
+        cache.set(key, VALUE)
+    size = os.path.getsize(cache._path(a))
+    clock.now += 1
+    assert _cache(tmp_path).get(a) == VALUE          # a disk read makes `a` the most recent
+    cache.max_disk_bytes = 2 * size
+    assert cache.evict() == 1
+    assert _files(tmp_path) == sorted([a + ".json", c + ".json"])
+    assert cache.counters["evictions"] == 1
+
+
+def test_writes_trigger_the_sweep(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(pc, "_EVICT_EVERY", 2)
+    cache = _cache(tmp_path, max_disk_bytes=1)
+    cache.set(make_key("a", "", "m", "1"), VALUE)
+    assert len(_files(tmp_path)) == 1
+    cache.set(make_key("b", "", "m", "1"), VALUE)
+    assert _files(tmp_path) == [] and cache.counters["evictions"] == 2
+
+
+def test_unreadable_entry_is_dropped(tmp_path):
+    key = make_key("resume", "text", "m", "1")
+    cache = _cache(tmp_path)
+    cache.set(key, VALUE)
+    with open(cache._path(key), "w") as f:
+        f.write("{not json")
+    assert _cache(tmp_path).get(key) is None
+    assert not os.path.exists(cache._path(key))
+
+
+def test_disabled_cache(tmp_path):
+    cache = _cache(tmp_path, enabled=False)
+    cache.set("k", VALUE)
+    assert cache.get("k") is None
+    assert asyncio.run(cache.aget("k")) is None
+    assert _files(tmp_path) == []
+
+
+def test_async_api_does_file_io_off_the_loop(tmp_path, monkeypatch):
+    key = make_key("resume", "text", "m", "1")
+    threads = []
+    for name in ("_get_disk", "_write"):
+        real = getattr(ParseCache, name)
+        def spy(self, *args, _real=real, _name=name):
+            threads.append((_name, threading.get_ident()))
+            return _real(self, *args)
+        monkeypatch.setattr(ParseCache, name, spy)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        writer, reader = _cache(tmp_path), _cache(tmp_path)
+        assert await reader.aget(key) is None
+        write = asyncio.create_task(writer.aset(key, VALUE))
+        await asyncio.sleep(0)
+        assert await writer.aget(key) == VALUE      # in memory before the file is written
+        await write
+        assert await reader.aget(key) == VALUE      # disk
+        assert await reader.aget(key) == VALUE      # memory, no thread
+        return loop_thread
+    loop_thread = asyncio.run(main())
+    assert [n for n, _ in threads] == ["_get_disk", "_write", "_get_disk"]
+    assert all(t != loop_thread for _, t in threads)
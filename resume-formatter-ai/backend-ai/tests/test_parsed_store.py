@@ -0,0 +1,79 @@
+# tests/test_parsed_store.py
+"""
+Stored parses and format-by-id: ids are stable for the same content and change with the model
+or prompt version; /api/format with ids renders without an LLM call; unknown and malformed
+ids are a 404, never a 500 or a path outside the store.
+"""
+import pytest
+
+from benchmarks.corpus import docx_bytes
+from services import parsed_store, resume_parser, jd_parser, local_extractor
+
+DOCX_MT = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+RESUME = docx_bytes(["Jane Doe", "jane@example.com | +1 415 555 0100", "SKILLS", "Python, Go",
+                     "EXPERIENCE", "Backend Engineer - Acme    2020 - 2023", "- Built the billing service"])
+JD = "Backend Engineer\nRequirements:\nPython, PostgreSQL"
+
+
+def test_ids_are_stable():
+    assert parsed_store.resume_id("ab" * 32, "full") == parsed_store.resume_id("ab" * 32, "full")
+    assert parsed_store.resume_id("ab" * 32, "full") != parsed_store.resume_id("ab" * 32, "hybrid")
+    assert parsed_store.job_id(JD) == parsed_store.job_id(JD)
+
+
+@pytest.mark.parametrize("module, attr, value", [
+    (None, "OPENAI_MODEL", "gpt-4o"),
+    (resume_parser, "PROMPT_VERSION", "test"),
+    (jd_parser, "PROMPT_VERSION", "test"),
+    (local_extractor, "EXTRACTOR_VERSION", "test"),
+])
+def test_ids_change_with_model_and_versions(monkeypatch, module, attr, value):
+    before = (parsed_store.resume_id("ab" * 32, "full"), parsed_store.job_id(JD))
+    if module is None:
+        monkeypatch.setenv(attr, value)
+    else:
+        monkeypatch.setattr(module, attr, value)
+    after = (parsed_store.resume_id("ab" * 32, "full"), parsed_store.job_id(JD))
+    changed = {None: (True, True), resume_parser: (True, False), jd_parser: (False, True),
+               local_extractor: (True, False)}[module]
+    assert (after[0] != before[0], after[1] != before[1]) == changed
+
+
+def _parse(api):
+    r = api.post("/api/parse", files={"resume": ("cv.docx", RESUME, DOCX_MT)}, data={"jd_text": JD})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_format_by_id_hit(api, fake_llm):
+    parsed = _parse(api)
+    meta = parsed["meta"]
+    calls = fake_llm.calls
+    r = api.post("/api/format", data={"resume_id": meta["resume_id"], "job_id": meta["job_id"],
+                                      "style": "docx_default", "format": "docx"})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] == DOCX_MT
+    assert r.headers["x-resume-id"] == meta["resume_id"]
+    assert r.headers["x-job-id"] == meta["job_id"]
+    assert fake_llm.calls == calls   # no extraction, no parse
+    assert api.get(f"/api/parsed/{meta['resume_id']}").json() == parsed["resume"]
+    assert api.get(f"/api/parsed/{meta['job_id']}").json() == parsed["job"]
+
+
+@pytest.mark.parametrize("field, item_id", [
+    ("resume_id", "r_" + "0" * 32),
+    ("job_id", "j_" + "0" * 32),
+])
+def test_format_unknown_id_is_404(api, field, item_id):
+    meta = _parse(api)["meta"]
+    data = {"resume_id": meta["resume_id"], "job_id": meta["job_id"], "style": "docx_default", field: item_id}
+    r = api.post("/api/format", data=data)
+    assert r.status_code == 404
+    assert "Unknown or expired" in r.json()["detail"]
+
+
+@pytest.mark.parametrize("item_id", ["r_123", "r_../../etc/passwd", "x_" + "0" * 32, "r_" + "G" * 32, ""])
+def test_format_malformed_id_is_404(api, item_id):
+    r = api.post("/api/format", data={"resume_id": item_id or " ", "jd_text": JD, "style": "docx_default"})
+    assert r.status_code == 404
+    assert parsed_store.parsed_store.get(item_id) is None
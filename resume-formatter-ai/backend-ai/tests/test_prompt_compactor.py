@@ -0,0 +1,129 @@
+# tests/test_prompt_compactor.py
+"""
+Regression corpus for prompt compaction: whatever a parser reads from a JD or resume must
+read the same after compaction. JDs carry the fields their prompt asks for (every value has
+to survive verbatim, title line included); resumes go through the local extractor with and
+without compaction. Each fixture also names the boilerplate that should be gone, so a
+compactor that drops nothing doesn't pass by accident.
+"""
+import pytest
+
+from utils.prompt_compactor import TAILORING_MARKER, compact_jd_text, compact_resume_pages
+from services.local_extractor import extract_local
+
+JD_CORPUS = [
+    {
+        "text": "PRIVACY ENGINEER\nAcme Corp is hiring a privacy engineer.\nPython, GDPR, threat modelling.\n",
+        "fields": {"title": "PRIVACY ENGINEER", "company": "Acme Corp",
+                   "skills_required": ["Python", "GDPR", "threat modelling"]},
+        "dropped": [],
+    },
+    {
+        "text": "Benefits Analyst\nRequirements:\n- Excel and SQL\n- Workday\n"
+                "Benefits:\n- Dental and vision\n- 401(k) match\n",
+        "fields": {"title": "Benefits Analyst", "skills_required": ["Excel", "SQL", "Workday"]},
+        "dropped": ["Dental and vision", "401(k) match"],
+    },
+    {
+        "text": "Compensation Manager\nResponsibilities:\n- Run annual salary reviews and pay range benchmarking\n"
+                "Requirements:\n- Compensation analytics, Excel\n",
+        "fields": {"title": "Compensation Manager", "skills_required": ["Compensation analytics", "Excel"]},
+        "dropped": [],
+    },
+    {
+        "text": "Senior Backend Engineer - Globex\n\nABOUT THE ROLE\nBuild payment APIs at Globex.\n\n"
+                "REQUIREMENTS\n- 5+ years of Go or Java\n- Kubernetes, PostgreSQL\n\n"
+                "NICE TO HAVE\n- Kafka\n\nWHAT WE OFFER\n- Remote-first\n- Learning budget\n\n"
+                "EEO STATEMENT\nGlobex is an equal opportunity employer. All qualified applicants will "
+                "receive consideration without regard to race, religion or sex.\n",
+        "fields": {"title": "Senior Backend Engineer", "company": "Globex",
+                   "skills_required": ["Go", "Java", "Kubernetes", "PostgreSQL"], "nice_to_have": ["Kafka"]},
+        "dropped": ["Remote-first", "Learning budget", "equal opportunity employer"],
+    },
+    {
+        "text": "Data Scientist\nInitech | Austin, TX\nQualifications:\n- Python, pandas, scikit-learn\n"
+                "- Experience with diversity metrics and inclusion surveys\nPreferred:\n- Spark\n"
+                "How to apply:\nSend your CV to jobs@initech.example\n"
+                "Initech is an Equal Opportunity Employer.\n",
+        "fields": {"title": "Data Scientist", "company": "Initech",
+                   "skills_required": ["Python", "pandas", "scikit-learn", "diversity metrics"],
+                   "nice_to_have": ["Spark"]},
+        "dropped": ["jobs@initech.example", "Equal Opportunity Employer"],
+    },
+    {
+        "text": "Privacy Counsel\nHooli\nResponsibilities:\nMaintain our privacy policy and privacy notice "
+                "for EU users.\nRequirements:\nGDPR, CCPA\nPrivacy Notice:\nWe process applicant data "
+                "under our candidate privacy notice.\n",
+        "fields": {"title": "Privacy Counsel", "company": "Hooli", "skills_required": ["GDPR", "CCPA"],
+                   "achievements": ["privacy policy and privacy notice"]},
+        "dropped": ["candidate privacy notice"],
+    },
+    {
+        # a header the JD header rules miss (Title case, no colon) ends the benefits section
+        "text": "Platform Engineer\nBenefits:\n- Dental and vision\n- Gym stipend\nMust Have\n- Python\n"
+                "- Kubernetes\nPerks:\nFree lunch on Fridays\n\nGood To Know\nOn-call rotation with Terraform\n",
+        "fields": {"title": "Platform Engineer", "skills_required": ["Python", "Kubernetes"],
+                   "nice_to_have": ["Terraform"]},
+        "dropped": ["Dental and vision", "Gym stipend", "Free lunch"],
+    },
+]
+
+RESUME_CORPUS = [
+    {
+        "pages": ["Jane Doe\njane@example.com | +1 415 555 0100 | linkedin.com/in/janedoe\n"
+                  "SKILLS\nPython, Go, Kubernetes\nEXPERIENCE\nBackend Engineer, Acme (2020 - Present)\n"
+                  "- Built the billing service\nPage 1 of 2",
+                  "Jane Doe\njane@example.com | +1 415 555 0100 | linkedin.com/in/janedoe\n"
+                  "EDUCATION\nB.S. Computer Science, State University\nREFERENCES\nAvailable on request\n"
+                  "Page 2 of 2"],
+        "kept": ["Built the billing service", "B.S. Computer Science"],
+        "dropped": ["Page 1 of 2", "Available on request"],
+    },
+    {
+        "pages": ["Ravi Kumar\nPhone: 9876543210\ngithub.com/ravik\nSUMMARY\nData engineer.\n"
+                  "TECHNICAL SKILLS\nSpark, Airflow, SQL\nPROJECTS\nBenefits portal - claims pipeline\n"
+                  "DECLARATION\nI hereby declare that the above information is true.\nRavi Kumar"],
+        "kept": ["Benefits portal - claims pipeline"],
+        "dropped": ["I hereby declare"],
+    },
+]
+
+
+def _parsed(text: str) -> dict:
+    fields = extract_local(text)
+    fields["sections"] = [s["section"] for s in fields["sections"]]   # offsets move, names mustn't
+    return fields
+
+
+@pytest.mark.parametrize("case", JD_CORPUS, ids=lambda c: c["text"].splitlines()[0])
+def test_jd_fields_survive_compaction(case):
+    compacted = compact_jd_text(case["text"])
+    for field, values in case["fields"].items():
+        for value in values if isinstance(values, list) else [values]:
+            assert value in case["text"]
+            assert value in compacted, f"{field} {value!r} lost"
+    assert compacted.splitlines()[0] == case["text"].strip().splitlines()[0]
+    for gone in case["dropped"]:
+        assert gone not in compacted
+
+
+def test_jd_tailoring_instructions_untouched():
+    tail = f"{TAILORING_MARKER}\nBenefits:\nKeep every bullet"
+    compacted = compact_jd_text("Benefits Analyst\nBenefits:\nDental\n\n" + tail)
+    assert compacted.startswith("Benefits Analyst")
+    assert "Dental" not in compacted
+    assert compacted.endswith(tail)
+
+
+@pytest.mark.parametrize("case", RESUME_CORPUS, ids=lambda c: c["pages"][0].splitlines()[0])
+def test_resume_fields_survive_compaction(case):
+    original = "\n".join(case["pages"])
+    compacted = compact_resume_pages(case["pages"])
+    before, after = _parsed(original), _parsed(compacted)
+    dropped_sections = {"references", "declaration"}
+    before["sections"] = [s for s in before["sections"] if s not in dropped_sections]
+    assert after == before
+    for kept in case["kept"]:
+        assert kept in compacted
+    for gone in case["dropped"]:
+        assert gone not in compacted
@@ -0,0 +1,84 @@
+# tests/test_skill_index.py
+"""
+Skill grouping and JD matching: group keywords and JD skills match as substrings, synonyms
+only as whole words. The Aho-Corasick automaton and the substring loop are two ways of
+computing the same thing, so each input must give the same answer on both.
+"""
+import pytest
+
+from benchmarks.corpus import make_corpus
+from services import skill_index
+from services.skill_index import AhoCorasick, JDMatcher, PatternMatcher, group_skills, index, jd_matcher
+
+TEXTS = [
+    "", "Python", "MongoDB", "mongo", "k8s", "K8S on AWS", "Next.js", "nextjs", "js", "next.js",
+    "c#", "C# / .NET", "csharp", "ts", "TypeScript", "its", "Figma", "Scrum master",
+    "continuous integration and delivery", "micro-services", "dsa", "vs code", "go", "Golang",
+    "node.js, express, postgres (psql)", "Deployed on k8s with Golang and js",
+]
+
+
+def _labels(groups) -> dict:
+    return {g["label"]: g["items"] for g in groups}
+
+
+def test_taxonomy_grouping_uses_the_automaton():
+    assert len(index._matcher._patterns) >= skill_index.SKILL_AUTOMATON_MIN_PATTERNS
+    assert index._matcher._automaton is not None
+
+
+def test_group_skills():
+    groups = group_skills(["Python", "MongoDB", "k8s", "Next.js", "Figma", "ts", "its"])
+    assert [g["label"] for g in groups] == ["Frontend", "Backend", "Frameworks", "Databases", "Tools", "Other"]
+    labels = _labels(groups)
+    assert labels["Frontend"] == ["ts"]              # synonym, whole word
+    assert labels["Backend"] == ["Python", "MongoDB"]   # "go" is a substring of MongoDB
+    assert labels["Databases"] == ["MongoDB"]
+    assert labels["Tools"] == ["k8s"]
+    assert labels["Other"] == ["Figma", "its"]         # "ts" inside "its" is not a word
+    assert group_skills([]) == []
+
+
+def test_jd_matcher():
+    m = jd_matcher(["Kubernetes", "Go", "JavaScript", "Go", ""])
+    assert m.matched("Deployed on k8s with Golang") == {0, 1, 3, 4}
+    assert m.matched("Built it in next.js") == {4}   # "js" glued to "next." is not JavaScript
+    assert m.count("js and kubernetes") == 3
+    assert m.count(None) == 1
+    assert jd_matcher(["Kubernetes"]) is jd_matcher(("Kubernetes",))
+
+
+def test_aho_corasick_reports_every_occurrence():
+    ac = AhoCorasick([("he", 1), ("she", 2), ("hers", 3), ("his", 4)])
+    assert sorted(ac.iter("ushers")) == [(1, 4, 2), (2, 4, 1), (2, 6, 3)]
+
+
+def _both(patterns):
+    patterns = list(patterns)
+    skill_index.SKILL_AUTOMATON_MIN_PATTERNS = len(patterns) + 1
+    loop = PatternMatcher(patterns)
+    skill_index.SKILL_AUTOMATON_MIN_PATTERNS = 0
+    automaton = PatternMatcher(patterns)
+    assert loop._automaton is None and automaton._automaton is not None
+    return loop, automaton
+
+def _corpus_texts() -> list:
+    texts = list(TEXTS)
+    for sample in make_corpus(8, 3)["samples"]:
+        resume = sample["resume"]
+        texts.extend(resume["skills"])
+        texts.extend(b for e in resume.get("experience", []) for b in e.get("bullets", []))
+    return [t.lower() for t in texts]
+
+
+@pytest.mark.parametrize("name", ["taxonomy", "jd"])
+def test_automaton_matches_substring_loop(monkeypatch, name):
+    monkeypatch.setattr(skill_index, "SKILL_AUTOMATON_MIN_PATTERNS", skill_index.SKILL_AUTOMATON_MIN_PATTERNS)
+    if name == "taxonomy":
+        patterns = index._matcher._patterns
+    else:
+        jd = ("Kubernetes", "Go", "JavaScript", "TypeScript", "C#", "CI/CD", "Agile", "postgres", "Data Structures")
+        patterns = JDMatcher(jd, index.synonyms)._matcher._patterns
+    loop, automaton = _both(patterns)
+    for text in _corpus_texts():
+        assert automaton.values(text) == loop.values(text), text
@@ -0,0 +1,107 @@
+# tests/test_text_normalizer.py
+"""
+Golden outputs for the shared text normalizer. Every expected value was recorded from the
+implementations it replaced (clean_extracted_text in utils/text_extractor.py,
+_normalize_cgpa_gpa_line and the date fix in services/formatter_overleaf_modern.py, as of
+the commit before the normalizer was introduced), so these pin today's behaviour, quirks
+included: "A u g 2 0 2 0" is not rejoined, and a GPA value swallows the space after it.
+"""
+import pytest
+
+from utils.text_normalizer import clean_extracted_text, normalize_dates, normalize_gpa_line
+from services.formatter_overleaf_modern import _normalize_cgpa_gpa_line
+
+CLEAN_GOLDEN = [
+    ("",
+     ""),
+    ("C G P A : 8 . 6 / 1 0",
+     "CGPA: 8.6/10"),
+    ("c g p a: 9 . 1 / 1 0",
+     "CGPA: 9.1/10"),
+    ("G P A - 3 . 8 / 4 . 0",
+     "GPA: 3.8/4.0"),
+    ("CGPA 8.6/10 GPA 3.5 / 4",
+     "CGPA: 8.6/10GPA: 3.5/4"),
+    ("J\no\nh\nn\nD\no\ne\nSoftware Engineer",
+     "JohnDoe Software Engineer"),
+    ("•\nP\ny\nt\nh\no\nn\n●",
+     "Python"),
+    ("Phone: 8 0 7 4 1 5 8 9 8 5",
+     "Phone: 8074158985"),
+    ("+91 9 8 7 6 5 4 3 2 1 0 | jane@x.com",
+     "+919876543210 | jane@x.com"),
+    ("Call 1 2 3 4 5 now",
+     "Call 1 2 3 4 5 now"),
+    ("Aug2020 - May2024",
+     "Aug 2020 - May 2024"),
+    ("A u g 2 0 2 0",
+     "Aug 2 0 2 0"),
+    ("September2019 to Present",
+     "September 2019 to Present"),
+    ("Jan 2021",
+     "Jan 2021"),
+    ("J o h n  D o e\nC G P A : 8 . 6 / 1 0\nAug2020\nSKILLS Python, React\n9 8 7 6 5 4 3 2 1 0",
+     "John Doe CGPA: 8.6/10Aug 2020 SKILLS Python, React 9876543210"),
+    ("Line one\n\n\n   \nLine   two    with   spaces\t\ttabs",
+     "Line one Line two with spaces tabs"),
+    ("Experience\n• Built APIs in Python\n● Led a team of 5",
+     "Experience Built APIs in Python Led a team of 5"),
+    ("B.Tech in CSE, GPA: 8 . 0 5 / 1 0 (2016-2020)",
+     "B.Tech in CSE, GPA: 8.05/10(2016-2020)"),
+    ("I am a d e v e l o p e r at X Y Z",
+     "I am adeveloper at XYZ"),
+    ("Skills: C, C++, Go, R",
+     "Skills: C, C++, Go, R"),
+]
+
+GPA_GOLDEN = [
+    ("",
+     ""),
+    ("C G P A : 8 . 6 / 1 0",
+     "CGPA: 8.6/10"),
+    ("• CGPA - 9.1/10 ●",
+     "CGPA: 9.1/10"),
+    ("g p a 3 . 7 5 / 4",
+     "GPA: 3.75/4"),
+    ("GPA: 3.5 / 4.0   Dean's list",
+     "GPA: 3.5/4.0Dean's list"),
+    ("Roll 1 2 3 4 5 6 7",
+     "Roll 1234567"),
+    ("Relevant coursework: OS, DBMS",
+     "Relevant coursework: OS, DBMS"),
+    ("cgpa:8.6/10",
+     "CGPA: 8.6/10"),
+]
+
+DATES_GOLDEN = [
+    ("Aug2020",
+     "Aug 2020"),
+    ("Aug 2020",
+     "Aug 2020"),
+    ("September2019 - May2021",
+     "September 2019 - May 2021"),
+    ("2019 - 2021",
+     "2019 - 2021"),
+    ("A u g 2 0 2 0",
+     "A u g 2 0 2 0"),
+    ("Summer2022",
+     "Summer 2022"),
+]
+
+
+@pytest.mark.parametrize("text, expected", CLEAN_GOLDEN)
+def test_clean_extracted_text(text, expected):
+    assert clean_extracted_text(text) == expected
+
+@pytest.mark.parametrize("text, expected", GPA_GOLDEN)
+def test_normalize_gpa_line(text, expected):
+    assert normalize_gpa_line(text) == expected
+    assert _normalize_cgpa_gpa_line(text) == expected
+
+@pytest.mark.parametrize("text, expected", DATES_GOLDEN)
+def test_normalize_dates(text, expected):
+    assert normalize_dates(text) == expected
+
+def test_clean_is_reexported_by_extractor():
+    from utils import text_extractor
+    assert text_extractor.clean_extracted_text is clean_extracted_text
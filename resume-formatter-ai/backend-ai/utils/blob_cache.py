@@ -0,0 +1,153 @@
+# utils/blob_cache.py
+"""
+Content-addressed byte cache: a small in-memory LRU in front of a sharded directory
+(<dir>/<key[:2]>/<key><suffix>). Used for compiled/converted PDFs.
+
+The disk tier is bounded like the parse cache: a file's mtime is when it was written and its
+atime when it was last read, and every few writes a sweep drops files older than ttl, then the
+least recently used ones until the directory fits max_disk_bytes.
+
+get/put touch the disk; async code uses aget and runs put in a thread.
+"""
+import os, time, asyncio, logging, tempfile, threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How many disk writes between eviction sweeps
+_EVICT_EVERY = 32
+
+
+class BlobCache:
+    def __init__(self, directory: str, mem_entries: int = 64, suffix: str = ".bin",
+                 max_disk_bytes: int = 0, ttl: float = 0):
+        self.directory = directory      # "" disables the disk tier
+        self.mem_entries = mem_entries  # 0 disables the memory tier
+        self.suffix = suffix
+        self.max_disk_bytes = max_disk_bytes   # 0 = unbounded
+        self.ttl = ttl                         # seconds; 0 = forever
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._sweeping = False
+        self.mem_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if self.mem_entries <= 0:
+            return
+        with self._lock:
+            self._mem[key] = data
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.mem_entries:
+                self._mem.popitem(last=False)
+
+    def get_mem(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.mem_hits += 1
+        return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self.get_mem(key)
+        return data if data is not None else self._get_disk(key)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """
+        get for async code: memory hits inline, the disk read in a worker thread.
+        """
+        data = self.get_mem(key)
+        return data if data is not None else await asyncio.to_thread(self._get_disk, key)
+
+    def _get_disk(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            mtime = os.stat(path).st_mtime
+            if self.ttl > 0 and time.time() - mtime > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, (time.time(), mtime))   # atime = last use, mtime stays = written
+        except OSError:
+            return None
+        self.disk_hits += 1
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not write cache entry %s", path, exc_info=True)
+            return
+
+        with self._lock:
+            self._writes += 1
+            sweep = (self.ttl > 0 or self.max_disk_bytes > 0) and self._writes % _EVICT_EVERY == 0 \
+                and not self._sweeping
+            if sweep:
+                self._sweeping = True
+        if sweep:
+            try:
+                self.evict()
+            finally:
+                with self._lock:
+                    self._sweeping = False
+
+    def evict(self) -> int:
+        """
+        Remove expired files, then the least recently used ones until the disk tier fits
+        max_disk_bytes. Returns the number removed. Walks the whole directory: call it off
+        the event loop.
+        """
+        entries, total = [], 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                p = os.path.join(root, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_atime, st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+        removed = 0
+        entries.sort()
+        now = time.time()
+        for _, mtime, size, p in entries:
+            stale = p.endswith(".part") and now - mtime > 60
+            expired = self.ttl > 0 and now - mtime > self.ttl
+            too_big = self.max_disk_bytes > 0 and total > self.max_disk_bytes
+            if not (stale or expired or too_big):
+                continue
+            try:
+                os.remove(p)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._mem)
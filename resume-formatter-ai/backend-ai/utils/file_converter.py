@@ -1,39 +1,255 @@
-import pypandoc, tempfile, os
-try:
-    from docx2pdf import convert as docx2pdf_convert
-    HAS_DOCX2PDF = True
-except ImportError:
-    HAS_DOCX2PDF = False
-
-try:
-    pypandoc.get_pandoc_path()
-except OSError:
+# utils/file_converter.py
+"""
+DOCX -> PDF conversion service.
+
+- pandoc runs as an asyncio subprocess with a timeout (CONVERT_TIMEOUT), at most
+  CONVERT_CONCURRENCY at a time; docx2pdf (Word, Windows/macOS only) is the fallback
+- results are cached by sha256 of the DOCX bytes (memory LRU + disk, bounded by
+  CONVERT_CACHE_BYTES and CONVERT_CACHE_TTL), and identical
+  documents converted concurrently are converted once
+- failures raise ConversionError instead of handing back the DOCX
+"""
+import os, time, shutil, signal, asyncio, hashlib, logging, tempfile, threading
+from typing import Dict, Optional
+
+from .blob_cache import BlobCache
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+# pypandoc / docx2pdf are imported on first conversion, and pandoc is only downloaded
+# when explicitly allowed, so importing this module never touches the network.
+PANDOC_AUTO_DOWNLOAD  = os.getenv("PANDOC_AUTO_DOWNLOAD", "0").lower() in ("1", "true", "yes")
+PANDOC_PDF_ENGINE     = os.getenv("PANDOC_PDF_ENGINE", "")   # default: tectonic if installed, else pandoc's default
+CONVERT_CONCURRENCY   = int(os.getenv("CONVERT_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2))))
+CONVERT_TIMEOUT       = float(os.getenv("CONVERT_TIMEOUT", "60"))
+CONVERT_CACHE_DIR     = os.getenv("CONVERT_CACHE_DIR", "./.convert_cache")   # "" disables disk tier
+CONVERT_CACHE_ENTRIES = int(os.getenv("CONVERT_CACHE_ENTRIES", "64"))
+CONVERT_CACHE_BYTES   = int(os.getenv("CONVERT_CACHE_BYTES", str(256 * 1024 * 1024)))
+CONVERT_CACHE_TTL     = float(os.getenv("CONVERT_CACHE_TTL", str(7 * 24 * 3600)))   # seconds, 0 = forever
+
+
+class ConversionError(RuntimeError):
+    pass
+
+
+_pandoc_lock = threading.Lock()
+_pandoc_checked = False
+_docx2pdf = None
+
+def ensure_pandoc():
+    """
+    Import pypandoc and make sure a pandoc binary is available (downloading it only if
+    PANDOC_AUTO_DOWNLOAD=1). Returns the pypandoc module, or None if pandoc is unusable.
+    """
+    global _pandoc_checked
     try:
-        pypandoc.download_pandoc()
-    except Exception:
-        pass
+        import pypandoc
+    except ImportError:
+        return None
+    with _pandoc_lock:
+        if not _pandoc_checked:
+            try:
+                pypandoc.get_pandoc_path()
+            except OSError:
+                if not PANDOC_AUTO_DOWNLOAD:
+                    logger.warning("pandoc not found; set PANDOC_AUTO_DOWNLOAD=1 to fetch it")
+                    return None
+                try:
+                    pypandoc.download_pandoc()
+                except Exception:
+                    logger.warning("pandoc download failed", exc_info=True)
+                    return None
+            _pandoc_checked = True
+    return pypandoc
 
-async def convert_to_pdf(docx_bytes: bytes) -> bytes:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_docx:
-        tmp_docx.write(docx_bytes)
-        tmp_docx_path = tmp_docx.name
-    tmp_pdf_path = tmp_docx_path.replace(".docx", ".pdf")
+def pandoc_path() -> Optional[str]:
+    pypandoc = ensure_pandoc()
+    if pypandoc is not None:
+        try:
+            return pypandoc.get_pandoc_path()
+        except OSError:
+            return None
+    return shutil.which("pandoc")
+
+def _docx2pdf_convert():
+    global _docx2pdf
+    if _docx2pdf is None:
+        try:
+            from docx2pdf import convert
+            _docx2pdf = convert
+        except ImportError:
+            _docx2pdf = False
+    return _docx2pdf or None
+
+def _read_bytes(path: str) -> Optional[bytes]:
     try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class DocxConverter:
+    def __init__(self, concurrency: int = CONVERT_CONCURRENCY, cache_dir: str = CONVERT_CACHE_DIR,
+                 mem_entries: int = CONVERT_CACHE_ENTRIES):
+        self.concurrency = max(1, concurrency)
+        self.cache = BlobCache(cache_dir, mem_entries, suffix=".pdf",
+                               max_disk_bytes=CONVERT_CACHE_BYTES, ttl=CONVERT_CACHE_TTL)
+        self._sem: Optional[asyncio.Semaphore] = None   # created lazily, on the running loop
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "joined": 0, "pandoc": 0, "docx2pdf": 0, "failures": 0, "timeouts": 0}
+        self.convert_seconds = {"total": 0.0, "max": 0.0}
+
+    def _get_sem(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return self._sem
+
+    # ---------------- backends ----------------
+    async def _pandoc(self, docx_path: str, pdf_path: str) -> None:
+        exe = await asyncio.to_thread(pandoc_path)
+        if not exe:
+            raise ConversionError("pandoc is not installed")
+        cmd = [exe, docx_path, "-o", pdf_path]
+        engine = PANDOC_PDF_ENGINE or ("tectonic" if shutil.which("tectonic") else "")
+        if engine:
+            cmd.append(f"--pdf-engine={engine}")
+
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            cwd=os.path.dirname(docx_path), start_new_session=(os.name == "posix"),
+        )
         try:
-            pypandoc.convert_file(tmp_docx_path, "pdf", outputfile=tmp_pdf_path)
-            with open(tmp_pdf_path, "rb") as f:
-                return f.read()
-        except Exception:
-            if HAS_DOCX2PDF:
+            out, _ = await asyncio.wait_for(proc.communicate(), timeout=CONVERT_TIMEOUT)
+        except asyncio.TimeoutError:
+            # pandoc runs the PDF engine as a child; kill the whole group so nothing is left
+            # holding the output pipe (or burning CPU) after we give up
+            try:
+                if os.name == "posix":
+                    os.killpg(proc.pid, signal.SIGKILL)
+                else:
+                    proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            self.counters["timeouts"] += 1
+            raise ConversionError(f"pandoc timed out after {CONVERT_TIMEOUT:.0f}s")
+        if proc.returncode != 0:
+            log = (out or b"").decode("utf-8", "replace")[-1000:]
+            raise ConversionError(f"pandoc failed (exit {proc.returncode}): {log}")
+
+    async def _docx2pdf(self, docx_path: str, pdf_path: str) -> None:
+        convert = _docx2pdf_convert()
+        if convert is None:
+            raise ConversionError("docx2pdf is not installed")
+        try:
+            # Word automation can't be killed from here; the timeout only stops waiting for it
+            await asyncio.wait_for(asyncio.to_thread(convert, docx_path, pdf_path), timeout=CONVERT_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise ConversionError(f"docx2pdf timed out after {CONVERT_TIMEOUT:.0f}s")
+        except Exception as e:
+            raise ConversionError(f"docx2pdf failed: {e}")
+
+    @staticmethod
+    def _stage(docx_bytes: bytes) -> str:
+        workdir = tempfile.mkdtemp(prefix="convert-")
+        with open(os.path.join(workdir, "resume.docx"), "wb") as f:
+            f.write(docx_bytes)
+        return workdir
+
+    async def _convert(self, key: str, docx_bytes: bytes) -> bytes:
+        self.queued += 1
+        try:
+            with span("convert_queue"):
+                await self._get_sem().acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        started = time.monotonic()
+        errors = []
+        workdir = None
+        try:
+            # temp dir, DOCX write, PDF read and cleanup all run in threads, off the event loop
+            workdir = await asyncio.to_thread(self._stage, docx_bytes)
+            docx_path = os.path.join(workdir, "resume.docx")
+            pdf_path = os.path.join(workdir, "resume.pdf")
+            for name, backend in (("pandoc", self._pandoc), ("docx2pdf", self._docx2pdf)):
                 try:
-                    docx2pdf_convert(tmp_docx_path, tmp_pdf_path)
-                    with open(tmp_pdf_path, "rb") as f:
-                        return f.read()
-                except Exception:
-                    pass
-            # final fallback: return original docx if pdf conversion fails
-            with open(tmp_docx_path, "rb") as f:
-                return f.read()
-    finally:
-        if os.path.exists(tmp_docx_path): os.remove(tmp_docx_path)
-        if os.path.exists(tmp_pdf_path):  os.remove(tmp_pdf_path)
+                    with span(name):
+                        await backend(docx_path, pdf_path)
+                except ConversionError as e:
+                    errors.append(str(e))
+                    continue
+                pdf = await asyncio.to_thread(_read_bytes, pdf_path)
+                if pdf is None:
+                    errors.append(f"{name} produced no output")
+                    continue
+                self.counters[name] += 1
+                break
+            else:
+                self.counters["failures"] += 1
+                raise ConversionError("DOCX to PDF conversion failed: " + "; ".join(errors))
+        finally:
+            elapsed = time.monotonic() - started
+            self.convert_seconds["total"] += elapsed
+            self.convert_seconds["max"] = max(self.convert_seconds["max"], elapsed)
+            self.in_flight -= 1
+            self._get_sem().release()
+            if workdir:
+                await asyncio.to_thread(shutil.rmtree, workdir, True)
+
+        await asyncio.to_thread(self.cache.put, key, pdf)
+        return pdf
+
+    # ---------------- public API ----------------
+    async def convert(self, docx_bytes: bytes) -> bytes:
+        """
+        PDF bytes for docx_bytes. Raises ConversionError if no backend could convert it.
+        """
+        self.counters["requests"] += 1
+        key = hashlib.sha256(docx_bytes).hexdigest()
+        pdf = await self.cache.aget(key)
+        if pdf is not None:
+            return pdf
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._convert(key, docx_bytes))
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if not t.cancelled():
+                    t.exception()   # retrieved here so an abandoned failure isn't logged as unhandled
+            task.add_done_callback(_done)
+        else:
+            self.counters["joined"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        done = self.counters["pandoc"] + self.counters["docx2pdf"] + self.counters["failures"]
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "counters": {**self.counters, "mem_hits": self.cache.mem_hits, "disk_hits": self.cache.disk_hits,
+                         "evictions": self.cache.evictions},
+            "convert_seconds": {
+                "total": round(self.convert_seconds["total"], 3),
+                "avg": round(self.convert_seconds["total"] / done, 3) if done else 0.0,
+                "max": round(self.convert_seconds["max"], 3),
+            },
+        }
+
+
+converter = DocxConverter()
+
+async def convert_to_pdf(docx_bytes: bytes) -> bytes:
+    """
+    Convert DOCX bytes to PDF bytes. Raises ConversionError on failure.
+    """
+    return await converter.convert(docx_bytes)
@@ -0,0 +1,209 @@
+# utils/http_cache.py
+"""
+HTTP validators and precompressed variants for file downloads.
+
+- strong ETags from inode + mtime_ns + size ("stat", default; free) or from the content's
+  sha256 ("content"; stable across replicas and copies, hashed once per file version)
+- If-None-Match / If-Modified-Since evaluation (RFC 9110 13.2.2 order)
+- gzip variants of compressible files, built once per file version into GZIP_CACHE_DIR
+  (never next to the file itself, so they don't show up in listings); the directory is
+  bounded like the other caches: variants older than GZIP_CACHE_TTL go, then the least
+  recently served ones until it fits GZIP_CACHE_BYTES
+
+Byte ranges and If-Range are left to Starlette's FileResponse.
+"""
+import os, time, gzip, hashlib, logging, tempfile, threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ETAG_MODE            = os.getenv("SAVED_ETAG_MODE", "stat").lower()           # stat | content
+CACHE_MAX_AGE        = int(os.getenv("SAVED_CACHE_MAX_AGE", "0"))              # 0 = always revalidate
+GZIP_EXTENSIONS      = {e.strip().lower() for e in os.getenv("SAVED_GZIP_EXTENSIONS", ".tex,.docx").split(",") if e.strip()}
+GZIP_CACHE_DIR       = os.getenv("SAVED_GZIP_CACHE_DIR", "./.saved_gz")        # "" disables variants
+GZIP_MAX_BYTES       = int(os.getenv("SAVED_GZIP_MAX_BYTES", str(20 * 1024 * 1024)))
+GZIP_CACHE_BYTES     = int(os.getenv("SAVED_GZIP_CACHE_BYTES", str(256 * 1024 * 1024)))
+GZIP_CACHE_TTL       = float(os.getenv("SAVED_GZIP_CACHE_TTL", str(30 * 24 * 3600)))   # seconds, 0 = forever
+GZIP_MIN_SAVING      = 0.10   # keep a variant only if it's at least 10% smaller
+
+# How many variants built between eviction sweeps, and how long a served variant is safe
+# from the size sweep (a response may still be about to open it)
+_GZIP_EVICT_EVERY = 32
+_GZIP_IN_USE_SECONDS = 60
+
+_hash_lock = threading.Lock()
+_content_hashes: "OrderedDict[Tuple[int, int, int, int], str]" = OrderedDict()
+_CONTENT_HASH_ENTRIES = 4096
+
+
+def _version(st: os.stat_result) -> Tuple[int, int, int, int]:
+    return (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _content_hash(path: str, st: os.stat_result) -> str:
+    key = _version(st)
+    with _hash_lock:
+        digest = _content_hashes.get(key)
+        if digest is not None:
+            _content_hashes.move_to_end(key)
+            return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:32]
+    with _hash_lock:
+        _content_hashes[key] = digest
+        while len(_content_hashes) > _CONTENT_HASH_ENTRIES:
+            _content_hashes.popitem(last=False)
+    return digest
+
+def file_etag(path: str, st: os.stat_result) -> str:
+    """
+    Strong ETag (quoted) for the file's current version. Blocking in "content" mode on first
+    sight of a version; call from a thread.
+    """
+    if ETAG_MODE == "content":
+        return f'"{_content_hash(path, st)}"'
+    return f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+def variant_etag(etag: str, coding: str) -> str:
+    # each representation needs its own strong validator
+    return f'{etag[:-1]}-{coding}"'
+
+def last_modified(st: os.stat_result) -> str:
+    return formatdate(st.st_mtime, usegmt=True)
+
+def cache_control() -> str:
+    return f"private, max-age={CACHE_MAX_AGE}" if CACHE_MAX_AGE > 0 else "private, no-cache"
+
+
+def _etag_list(header: str) -> Iterable[str]:
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]   # If-None-Match uses weak comparison
+        if tag:
+            yield tag
+
+def not_modified(headers, etag: str, st: os.stat_result) -> bool:
+    """
+    True if a GET/HEAD with these request headers should get 304 for this representation.
+    If-Modified-Since is only consulted when there's no If-None-Match.
+    """
+    inm = headers.get("if-none-match")
+    if inm is not None:
+        return any(tag == "*" or tag == etag for tag in _etag_list(inm))
+    ims = headers.get("if-modified-since")
+    if ims:
+        try:
+            since = parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError, IndexError):
+            return False
+        return int(st.st_mtime) <= since
+    return False
+
+def accepts_gzip(headers) -> bool:
+    for part in headers.get("accept-encoding", "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip() in ("gzip", "*"):
+            q = params.strip()
+            try:
+                return not (q.startswith("q=") and float(q[2:] or 0) == 0)
+            except ValueError:
+                return False
+    return False
+
+
+_gzip_lock = threading.Lock()
+_gzip_writes = 0
+_gzip_sweeping = False
+
+def _touch(path: str) -> bool:
+    # atime = last served, mtime stays = built; False if the variant is gone
+    try:
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+        return True
+    except OSError:
+        return False
+
+def gzip_variant(path: str, etag: str, st: os.stat_result) -> Optional[str]:
+    """
+    Path of a gzip-encoded copy of path for this version, building it on first request, or
+    None if the type isn't compressible, the file is too big, or gzip doesn't pay off.
+    Blocking; call from a thread.
+    """
+    if not GZIP_CACHE_DIR or os.path.splitext(path)[1].lower() not in GZIP_EXTENSIONS:
+        return None
+    if st.st_size == 0 or st.st_size > GZIP_MAX_BYTES:
+        return None
+    key = hashlib.sha256(etag.encode("utf-8")).hexdigest()
+    base = os.path.join(GZIP_CACHE_DIR, key[:2], key)
+    if _touch(base + ".gz"):
+        return base + ".gz"
+    if _touch(base + ".raw"):
+        return None   # tried before: not worth compressing
+
+    with open(path, "rb") as f:
+        data = f.read()
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    keep = len(packed) <= len(data) * (1 - GZIP_MIN_SAVING)
+    target = base + (".gz" if keep else ".raw")
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(packed if keep else b"")
+        os.replace(tmp, target)
+    except OSError:
+        logger.warning("Could not write gzip variant for %s", path, exc_info=True)
+        return None
+
+    global _gzip_writes, _gzip_sweeping
+    with _gzip_lock:
+        _gzip_writes += 1
+        sweep = _gzip_writes % _GZIP_EVICT_EVERY == 0 and not _gzip_sweeping
+        if sweep:
+            _gzip_sweeping = True
+    if sweep:
+        try:
+            evict_gzip_variants()
+        finally:
+            with _gzip_lock:
+                _gzip_sweeping = False
+    return target if keep else None
+
+def evict_gzip_variants() -> int:
+    """
+    Remove variants built more than GZIP_CACHE_TTL ago, then the least recently served ones
+    until GZIP_CACHE_DIR fits GZIP_CACHE_BYTES, sparing any served in the last minute.
+    Returns the number of files removed. Walks the whole directory; call from a thread.
+    """
+    entries, total = [], 0
+    for root, _, files in os.walk(GZIP_CACHE_DIR):
+        for name in files:
+            p = os.path.join(root, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_atime, st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+    removed = 0
+    entries.sort()
+    now = time.time()
+    for atime, mtime, size, p in entries:
+        stale = p.endswith(".part") and now - mtime > 60
+        expired = GZIP_CACHE_TTL > 0 and now - mtime > GZIP_CACHE_TTL
+        too_big = GZIP_CACHE_BYTES > 0 and total > GZIP_CACHE_BYTES
+        if not (stale or ((expired or too_big) and now - atime > _GZIP_IN_USE_SECONDS)):
+            continue
+        try:
+            os.remove(p)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
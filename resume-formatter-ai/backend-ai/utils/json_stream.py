@@ -0,0 +1,77 @@
+# utils/json_stream.py
+import json
+from typing import Any, List, Tuple
+
+
+class JSONObjectStream:
+    """
+    Incremental parser for a single streamed JSON object.
+    Feed it text chunks as they arrive; it returns each top-level (key, value)
+    pair as soon as that value is complete, e.g.
+
+        '{"name": "Ada", "skil' -> [("name", "Ada")]
+        'ls": ["x"]}'            -> [("skills", ["x"])]
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_start = None
+        self._key_end = None
+        self._value_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        if not chunk or self.done:
+            return []
+        self._text += chunk
+        out: List[Tuple[str, Any]] = []
+        text = self._text
+        i = self._pos
+
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        self._key_end = i + 1
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = i
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    self._emit(text, i, out)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if ch == ":" and self._value_start is None:
+                    self._value_start = i + 1
+                elif ch == ",":
+                    self._emit(text, i, out)
+            i += 1
+            if self.done:
+                break
+
+        self._pos = i
+        return out
+
+    def _emit(self, text: str, end: int, out: List[Tuple[str, Any]]) -> None:
+        if self._key_start is not None and self._key_end is not None and self._value_start is not None:
+            try:
+                key = json.loads(text[self._key_start:self._key_end])
+                value = json.loads(text[self._value_start:end])
+                out.append((key, value))
+            except ValueError:
+                pass
+        self._key_start = self._key_end = self._value_start = None
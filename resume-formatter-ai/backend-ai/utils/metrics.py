@@ -0,0 +1,188 @@
+# utils/metrics.py
+"""
+Stage timings and Prometheus text exposition, without a client library.
+
+- span("extract"): times a block (sync or async code) into the stage_seconds histogram and,
+  when it runs inside a request, into that request's Server-Timing header
+- ServerTimingMiddleware: starts the per-request span list, adds Server-Timing (spans with the
+  same name are summed) and records request latency per route template
+- Histogram / family() / render(): the text format served by /metrics
+
+Spans in code that runs on another thread only reach Server-Timing if the caller's context
+was copied there (asyncio.to_thread does this; run_in_executor doesn't). Spans inside worker
+processes are not recorded. The histograms are per process.
+"""
+import os, re, time, bisect, threading, contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+SERVER_TIMING   = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+PREFIX          = "resume_formatter_"
+
+# Seconds; covers cache hits (sub-ms) through cold LLM calls and Tectonic compiles
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_spans", default=None)
+
+
+# ---------------- text format ----------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def family(name: str, kind: str, help: str, samples: Iterable[Tuple[dict, float]]) -> List[str]:
+    """
+    Exposition lines for one metric family from (labels, value) pairs; no lines if it's empty.
+    """
+    lines = [f"{PREFIX}{name}{_labels(labels.keys(), labels.values())} {_number(value)}" for labels, value in samples]
+    if not lines:
+        return []
+    return [f"# HELP {PREFIX}{name} {help}", f"# TYPE {PREFIX}{name} {kind}", *lines]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by label values. Thread-safe.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...], buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        if not snapshot:
+            return []
+        full = PREFIX + self.name
+        lines = [f"# HELP {full} {self.help}", f"# TYPE {full} histogram"]
+        for labelvalues, series in sorted(snapshot.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                running += count
+                le = _labels(self.labelnames + ("le",), labelvalues + (_number(bound),))
+                lines.append(f"{full}_bucket{le} {running}")
+            base = _labels(self.labelnames, labelvalues)
+            lines.append(f"{full}_sum{base} {series[-1]!r}")
+            lines.append(f"{full}_count{base} {running}")
+        return lines
+
+
+stage_seconds = Histogram("stage_seconds", "Time spent per processing stage.", ("stage",))
+request_seconds = Histogram("http_request_seconds", "HTTP request latency by route template.",
+                            ("method", "route", "status"))
+
+
+# ---------------- spans ----------------
+def record(stage: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+@contextmanager
+def span(stage: str):
+    """
+    Time the enclosed block as `stage`. Works around awaits too (it's a plain context manager).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+# ---------------- middleware ----------------
+_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    merged: Dict[str, List[float]] = {}
+    for stage, seconds in spans:
+        m = merged.setdefault(stage, [0.0, 0])
+        m[0] += seconds
+        m[1] += 1
+    parts = []
+    for stage, (seconds, count) in merged.items():
+        part = f"{_TOKEN.sub('_', stage)};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _route_template(scope) -> str:
+    # The template, not the raw path, keeps label cardinality bounded. FastAPI sets
+    # scope["route"]; versions that keep included routes unprefixed carry the full template
+    # on the effective route context instead.
+    fastapi_scope = scope.get("fastapi")
+    ctx = fastapi_scope.get("effective_route_context") if isinstance(fastapi_scope, dict) else None
+    return getattr(ctx, "path", None) or getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class ServerTimingMiddleware:
+    """
+    Per-request span collection, Server-Timing headers and request latency histograms.
+    Streaming responses only report the spans finished before their headers went out.
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED or scope["path"] in self.exclude:
+            return await self.app(scope, receive, send)
+
+        spans: List[Tuple[str, float]] = []
+        token = _request_spans.set(spans)
+        started = time.perf_counter()
+        status = 500
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    header = server_timing(spans, time.perf_counter() - started)
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"server-timing", header.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _request_spans.reset(token)
+            request_seconds.observe(time.perf_counter() - started, scope["method"], _route_template(scope), str(status))
+
+
+def render(extra: Iterable[List[str]] = ()) -> str:
+    lines = stage_seconds.render() + request_seconds.render()
+    for block in extra:
+        lines.extend(block)
+    return "\n".join(lines) + "\n"
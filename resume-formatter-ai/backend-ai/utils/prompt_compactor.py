@@ -0,0 +1,248 @@
+# utils/prompt_compactor.py
+"""
+Local, rule-based trimming of resume/JD text before it is put into an LLM prompt.
+
+Resumes: per-page headers/footers repeated across pages, page numbers, and
+Declaration/References sections. JDs: sections under a benefits/EEO/application-process
+header, stray EEO sentences and duplicated lines; the first line (the title) always stays.
+Only lines that never feed a prompted field are removed; anything ambiguous is kept.
+"""
+import os, re, threading
+from collections import Counter
+from typing import List, Tuple
+
+COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION", "1").lower() not in ("0", "false", "no")
+
+TAILORING_MARKER = "[TAILORING_INSTRUCTIONS]"
+
+# Lines that are only a page number: "Page 2", "Page 2 of 3", "2 of 3", "2/3", "- 2 -"
+_PAGE_NO_RE = re.compile(r"^(?:page\s*\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?|\d{1,3}\s*(?:of|/)\s*\d{1,3}|-\s*\d{1,3}\s*-)$", re.I)
+_BARE_NUMBER_RE = re.compile(r"^\d{1,3}$")
+_DIGITS_RE = re.compile(r"\d+")
+_WS_RE = re.compile(r"\s+")
+_HEADER_STRIP_RE = re.compile(r"[^a-z&/ ]+")
+
+_RESUME_SECTIONS = {
+    "summary", "professional summary", "profile", "objective", "career objective", "about me",
+    "experience", "work experience", "professional experience", "employment history", "internships",
+    "education", "academic details", "academics", "skills", "technical skills", "key skills", "core competencies",
+    "projects", "academic projects", "personal projects", "certifications", "certificates",
+    "achievements", "accomplishments", "awards", "honors", "awards & achievements", "publications",
+    "languages", "hobbies", "interests", "extracurricular activities", "personal details",
+    "personal information", "references", "declaration",
+}
+_RESUME_DROP_SECTIONS = {"references", "declaration"}
+
+# JD sections dropped whole, matched against the entire header (as _header_key normalises it),
+# so "Benefits Analyst" or "PRIVACY ENGINEER" are never mistaken for one
+_JD_DROP_SECTIONS = {
+    "benefits", "perks", "benefits & perks", "perks & benefits", "benefits and perks", "perks and benefits",
+    "what we offer", "what youll get", "what you get", "compensation", "compensation & benefits",
+    "compensation and benefits", "salary", "salary & benefits", "salary range", "pay range",
+    "eeo", "eeo statement", "equal opportunity", "equal employment opportunity", "equal opportunity employer",
+    "equal opportunity statement", "diversity & inclusion", "diversity and inclusion",
+    "diversity equity & inclusion", "diversity equity and inclusion", "accommodations",
+    "privacy", "privacy notice", "privacy policy", "how to apply", "application process",
+    "hiring process", "interview process", "disclaimer",
+}
+_JD_SECTION_HINT_RE = re.compile(
+    r"^(?:about|responsibilities|requirements|qualifications|what you.ll do|who you are|"
+    r"nice to have|preferred|skills|the role|role|job description|overview|benefits|perks|"
+    r"what we offer|compensation|equal|eeo|diversity|how to apply|location)\b",
+    re.I,
+)
+# EEO / legal sentences that show up outside any header; only phrases no requirement uses
+_JD_LIST_ITEM_RE = re.compile(r"^(?:[-*\u2022\u25cf\u25aa\u00b7\u2013]|\d{1,2}[.)])\s*")
+_JD_BOILERPLATE_LINE_RE = re.compile(
+    r"equal (?:employment )?opportunity employer|without regard to (?:race|age|sex|gender)|"
+    r"e-verify|protected veteran status|applicants? (?:will|must) receive consideration",
+    re.I,
+)
+
+_lock = threading.Lock()
+_stats = {
+    "resume": {"calls": 0, "tokens_in": 0, "tokens_out": 0, "lines_dropped": 0},
+    "jd":     {"calls": 0, "tokens_in": 0, "tokens_out": 0, "lines_dropped": 0},
+}
+
+
+def estimate_text_tokens(text: str) -> int:
+    # Same ~4 chars/token heuristic the LLM scheduler budgets with
+    return len(text or "") // 4
+
+
+def _record(kind: str, before: str, after: str, dropped: int) -> None:
+    with _lock:
+        s = _stats[kind]
+        s["calls"] += 1
+        s["tokens_in"] += estimate_text_tokens(before)
+        s["tokens_out"] += estimate_text_tokens(after)
+        s["lines_dropped"] += dropped
+
+def stats() -> dict:
+    """
+    Running totals per kind, including estimated tokens saved.
+    """
+    with _lock:
+        out = {k: dict(v) for k, v in _stats.items()}
+    for s in out.values():
+        s["tokens_saved"] = s["tokens_in"] - s["tokens_out"]
+        s["saved_pct"] = round(100.0 * s["tokens_saved"] / s["tokens_in"], 1) if s["tokens_in"] else 0.0
+    out["enabled"] = COMPACTION_ENABLED
+    return out
+
+
+def _norm(line: str) -> str:
+    return _WS_RE.sub(" ", _DIGITS_RE.sub("#", line.strip().lower()))
+
+def _header_key(line: str) -> str:
+    return _WS_RE.sub(" ", _HEADER_STRIP_RE.sub("", line.strip().lower())).strip()
+
+
+# ---------------- Sections ----------------
+
+def detect_sections(lines: List[str], known: set = _RESUME_SECTIONS) -> List[Tuple[str, int, int]]:
+    """
+    Return (header, start, end) line ranges for every known section header; the range
+    runs up to the next header. Text before the first header is reported as "header".
+    """
+    starts = []
+    for i, line in enumerate(lines):
+        s = line.strip()
+        if s and len(s) <= 40 and _header_key(s) in known:
+            starts.append((_header_key(s), i))
+    sections, prev_name, prev_start = [], "header", 0
+    for name, i in starts:
+        if i > prev_start or prev_name != "header":
+            sections.append((prev_name, prev_start, i))
+        prev_name, prev_start = name, i
+    sections.append((prev_name, prev_start, len(lines)))
+    return sections
+
+
+# ---------------- Resume ----------------
+
+def compact_resume_pages(pages: List[str]) -> str:
+    """
+    Join raw page texts, dropping page numbers, headers/footers repeated on most pages
+    (the first copy is kept, it's usually the name/contact line) and Declaration/References sections.
+    """
+    if not COMPACTION_ENABLED:
+        return "\n".join(pages)
+
+    page_lines = [p.splitlines() for p in pages]
+    original = "\n".join(pages)
+    dropped = 0
+
+    # Headers/footers: first/last two non-empty lines of each page that recur on >= half the pages
+    repeated: set = set()
+    if len(page_lines) >= 2:
+        seen = Counter()
+        for lines in page_lines:
+            nonempty = [l for l in lines if l.strip()]
+            seen.update({_norm(l) for l in nonempty[:2] + nonempty[-2:]})
+        threshold = max(2, (len(page_lines) + 1) // 2)
+        repeated = {k for k, c in seen.items() if c >= threshold and k}
+
+    kept: List[str] = []
+    emitted_repeats: set = set()
+    for page_no, lines in enumerate(page_lines, start=1):
+        nonempty_idx = [i for i, l in enumerate(lines) if l.strip()]
+        edges = set(nonempty_idx[:2] + nonempty_idx[-2:])
+        for i, line in enumerate(lines):
+            s = line.strip()
+            if i in edges and s:
+                if _PAGE_NO_RE.match(s) or (_BARE_NUMBER_RE.match(s) and int(s) == page_no and len(page_lines) > 1):
+                    dropped += 1
+                    continue
+                key = _norm(s)
+                if key in repeated:
+                    if key in emitted_repeats:
+                        dropped += 1
+                        continue
+                    emitted_repeats.add(key)
+            kept.append(line)
+
+    # Sections that never feed a prompted field
+    out: List[str] = []
+    for name, start, end in detect_sections(kept):
+        if name in _RESUME_DROP_SECTIONS:
+            dropped += end - start
+            continue
+        out.extend(kept[start:end])
+
+    text = "\n".join(out)
+    _record("resume", original, text, dropped)
+    return text
+
+
+# ---------------- Job description ----------------
+
+def _is_jd_header(line: str) -> bool:
+    s = line.strip()
+    if not s or len(s) > 60:
+        return False
+    return s.endswith(":") or bool(_JD_SECTION_HINT_RE.match(s)) or (s.isupper() and len(s.split()) <= 6)
+
+def _is_standalone_header(line: str) -> bool:
+    # A short label with no sentence punctuation that isn't itself a list item: "Must Have"
+    s = line.strip()
+    return (bool(s) and len(s) <= 60 and len(s.split()) <= 6 and not _JD_LIST_ITEM_RE.match(s)
+            and s[-1] not in ".,;!?" and _header_key(s) not in _JD_DROP_SECTIONS)
+
+def _ends_drop(lines: List[str], i: int) -> bool:
+    """
+    Whether lines[i] starts a new section inside a dropped one although _is_jd_header doesn't
+    know it: a standalone label followed by list items, or any label after a blank line.
+    """
+    if not _is_standalone_header(lines[i]):
+        return False
+    if i > 0 and not lines[i - 1].strip():
+        return True
+    nxt = next((l.strip() for l in lines[i + 1:] if l.strip()), "")
+    return bool(_JD_LIST_ITEM_RE.match(nxt))
+
+def compact_jd_text(text: str) -> str:
+    """
+    Drop EEO/benefits/application-process sections, stray legal sentences and duplicated
+    lines from a JD. The first non-empty line (usually the title) is always kept, and
+    tailoring instructions appended by the router are never touched.
+    """
+    if not COMPACTION_ENABLED or not text:
+        return text
+
+    body, marker, tail = text.partition(TAILORING_MARKER)
+    out: List[str] = []
+    seen: set = set()
+    dropping = titled = False
+    dropped = 0
+    lines = body.splitlines()
+    for i, line in enumerate(lines):
+        s = line.strip()
+        if s and not titled:
+            out.append(line)   # the title
+            seen.add(_norm(s))
+            titled = True
+            continue
+        if _is_jd_header(s):
+            dropping = _header_key(s) in _JD_DROP_SECTIONS
+        elif dropping and _ends_drop(lines, i):
+            dropping = False
+        if dropping or (s and _JD_BOILERPLATE_LINE_RE.search(s)):
+            dropped += 1
+            continue
+        key = _norm(s)
+        if len(key) >= 20:
+            if key in seen:
+                dropped += 1
+                continue
+            seen.add(key)
+        if not s and out and not out[-1].strip():
+            continue   # collapse blank runs
+        out.append(line)
+
+    compacted = "\n".join(out).strip()
+    if marker:
+        compacted += f"\n\n{marker}{tail}"
+    _record("jd", text, compacted, dropped)
+    return compacted
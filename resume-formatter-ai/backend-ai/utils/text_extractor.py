@@ -1,93 +1,272 @@
-import re
-import docx2txt
-from pypdf import PdfReader
+import os, time, asyncio, logging, zipfile, functools, threading, contextvars, multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from io import BytesIO
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple, Union
 
+from .text_normalizer import clean_extracted_text
+from .prompt_compactor import compact_resume_pages
+from .metrics import span
 
-import re
+logger = logging.getLogger(__name__)
 
-def clean_extracted_text(text: str) -> str:
+# Extraction runs off the event loop on a bounded pool.
+# EXTRACT_POOL=process sidesteps the GIL for CPU-heavy PDFs at the cost of process startup.
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_POOL    = os.getenv("EXTRACT_POOL", "thread").lower()
+
+_executor: Executor | None = None
+_thread_executor: ThreadPoolExecutor | None = None
+
+def _get_thread_executor() -> ThreadPoolExecutor:
+    global _thread_executor
+    if _thread_executor is None:
+        _thread_executor = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract")
+    return _thread_executor
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS) if EXTRACT_POOL == "process" \
+            else _get_thread_executor()
+    return _executor
+
+
+# ---------------- PDF pages ----------------
+# Pages past PDF_MAX_PAGES are ignored and reading stops once PDF_MAX_CHARS are collected.
+# Documents under PDF_PARALLEL_MIN_PAGES pages are read in the calling thread; reading stops
+# at the first page boundary past PDF_PAGE_TIMEOUT per page. Longer ones are split into
+# PDF_PAGES_PER_TASK chunks on a process pool. A chunk gets PDF_PAGE_TIMEOUT per page, plus
+# the budgets of the tasks queued ahead of it spread over the workers, so waiting behind
+# other requests doesn't count as hanging. A chunk past its deadline is dropped and its pool
+# retired: new work goes to a fresh pool, and the old one is terminated once the other
+# requests' tasks on it have finished.
+PDF_MAX_PAGES          = int(os.getenv("PDF_MAX_PAGES", "60"))
+PDF_MAX_CHARS          = int(os.getenv("PDF_MAX_CHARS", "200000"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "12"))
+PDF_PAGES_PER_TASK     = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+PDF_PAGE_WORKERS       = int(os.getenv("PDF_PAGE_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGE_TIMEOUT       = float(os.getenv("PDF_PAGE_TIMEOUT", "10"))
+
+
+class PagePool:
     """
-    Clean up noisy text from PDF/DOCX extraction.
-    Fixes CGPA/GPA, phone numbers, dates, and collapses vertical character-by-character sequences.
+    A spawn pool for page extraction that can be retired without cancelling the tasks
+    already running on it.
     """
-    if not text:
-        return ""
-
-    # Collapse sequences like "C G P A" into "CGPA"
-    text = re.sub(r'\b(?:[A-Za-z]\s){2,}[A-Za-z]\b', lambda m: m.group(0).replace(" ", ""), text)
-
-    # Handle lines and merge them better, avoiding collapsing useful content
-    lines = text.splitlines()
-    merged_lines, buffer = [], []
-
-    for line in lines:
-        stripped = line.strip().replace("•", "").replace("●", "")
-        if not stripped:
-            continue
-        if len(stripped) == 1: 
-            buffer.append(stripped)
-        else:
-            if buffer:
-                merged_lines.append("".join(buffer))
-                buffer = []
-            merged_lines.append(stripped)
-
-    if buffer:
-        merged_lines.append("".join(buffer))
-
-    text = " ".join(merged_lines)
-
-    # Fix phone numbers with spaces (e.g. "8 0 7 4 1 5 8 9 8 5")
-    text = re.sub(r"(?:\d\s+){5,}\d", lambda m: m.group(0).replace(" ", ""), text)
-
-    # Normalize CGPA/GPA and remove unwanted space between values
-    text = re.sub(r"C\s*G\s*P\s*A", "CGPA", text, flags=re.I)
-    text = re.sub(r"G\s*P\s*A", "GPA", text, flags=re.I)
-    text = re.sub(
-        r"(CGPA|GPA)\s*[:\-\s]*([0-9\s\.]+/[0-9\s\.]+)",
-        lambda m: f"{m.group(1).upper()}: {m.group(2).replace(' ', '')}",
-        text,
-        flags=re.I,
-    )
-
-    # Fix dates like "A u g 2 0 2 0" -> "Aug 2020"
-    text = re.sub(
-        r"([A-Za-z]{3,9})\s*([0-9]{4})",
-        lambda m: f"{m.group(1)} {m.group(2)}",
-        text
-    )
-
-    text = re.sub(r"\s{2,}", " ", text).strip()
-    text = re.sub(r'\b(?:[A-Za-z]\s){2,}[A-Za-z]\b', lambda m: m.group(0).replace(" ", ""), text)
-    
-    return text
+
+    def __init__(self, workers: int):
+        # spawn: we're called from extraction threads, where fork is unsafe
+        self.pool = multiprocessing.get_context("spawn").Pool(workers)
+        self.workers = workers
+        self.retired = False
+        self._pending: Dict[object, float] = {}   # async result -> its budget
+        self._lock = threading.Lock()
+
+    def submit(self, fn, args, budget: float):
+        """
+        (async result, deadline): budget seconds to run, after waiting out the budgets of
+        the tasks already queued ahead of it (spread over the workers).
+        """
+        with self._lock:
+            ahead = sum(self._pending.values()) / self.workers
+            res = self.pool.apply_async(fn, args)
+            self._pending[res] = budget
+        return res, time.monotonic() + ahead + budget
+
+    def finished(self, res, timed_out: bool = False) -> None:
+        """
+        Mark a task collected (or abandoned, if it timed out; that retires the pool).
+        """
+        with self._lock:
+            self._pending.pop(res, None)
+            if timed_out:
+                self.retired = True
+            terminate = self.retired and not self._pending
+        if terminate:
+            self.pool.terminate()
 
 
+_page_pool: Optional[PagePool] = None
+_page_pool_lock = threading.Lock()
 
+def _get_page_pool() -> PagePool:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None or _page_pool.retired:
+            _page_pool = PagePool(PDF_PAGE_WORKERS)
+        return _page_pool
 
-async def extract_text(file_path: str, mime_type: str) -> str:
+# A document: a path, its bytes, or a seekable binary file object (e.g. an UploadFile's spool)
+Source = Union[str, bytes, BinaryIO]
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+def detect_file_type(f: BinaryIO) -> Optional[str]:
+    """
+    "pdf" or "docx" from the file's leading bytes (not its name or content type), else None.
+    Leaves f at position 0.
     """
-    Extract raw text from PDF or DOCX and clean it.
+    f.seek(0)
+    head = f.read(1024)
+    f.seek(0)
+    try:
+        if b"%PDF-" in head:   # the spec tolerates junk before the header within 1 KB
+            return "pdf"
+        if head.startswith(b"PK\x03\x04"):
+            with zipfile.ZipFile(f) as zf:
+                return "docx" if "word/document.xml" in zf.namelist() else None
+    except zipfile.BadZipFile:
+        return None
+    finally:
+        f.seek(0)
+    return None
+
+
+def _pdf_reader(src):
+    # pypdf is imported on first use so importing this module stays cheap
+    from pypdf import PdfReader
+    return PdfReader(BytesIO(src) if isinstance(src, bytes) else src)
+
+def _docx_text(src) -> str:
+    import docx2txt
+    return docx2txt.process(src)
+
+def _pdf_pages_text(src: Union[str, bytes], start: int, end: int) -> list[str]:
+    # Runs in a page-pool worker; src is a path or the whole PDF's bytes
+    reader = _pdf_reader(src)
+    return [reader.pages[i].extract_text() or "" for i in range(start, min(end, len(reader.pages)))]
+
+def _parallel_pdf_pages(src: Union[str, bytes], n_pages: int) -> Iterator[str]:
     """
-    mime_type = (mime_type or "").lower()
-    text = ""
-
-    if "pdf" in mime_type or file_path.endswith(".pdf"):
-        reader = PdfReader(file_path)
-        text = "\n".join([page.extract_text() or "" for page in reader.pages])
-
-    elif ("word" in mime_type
-          or "officedocument" in mime_type
-          or file_path.endswith(".docx")):
-        text = docx2txt.process(file_path)
-
-    elif mime_type == "application/octet-stream":
-        if file_path.endswith(".pdf"):
-            reader = PdfReader(file_path)
-            text = "\n".join([page.extract_text() or "" for page in reader.pages])
-        elif file_path.endswith(".docx"):
-            text = docx2txt.process(file_path)
+    Yield page texts in order, extracting one wave of chunks (one per worker) at a time
+    so an early stop doesn't pay for the rest of the document.
+    """
+    chunks = [(s, min(s + PDF_PAGES_PER_TASK, n_pages)) for s in range(0, n_pages, PDF_PAGES_PER_TASK)]
+    wave = max(1, PDF_PAGE_WORKERS)
+    for w in range(0, len(chunks), wave):
+        pool = _get_page_pool()
+        pending = [(s, e, *pool.submit(_pdf_pages_text, (src, s, e), PDF_PAGE_TIMEOUT * (e - s)))
+                   for s, e in chunks[w:w + wave]]
+        try:
+            for s, e, res, deadline in pending:
+                timed_out = False
+                try:
+                    pages = res.get(timeout=max(0.0, deadline - time.monotonic()))
+                except multiprocessing.TimeoutError:
+                    logger.warning("PDF pages %d-%d timed out", s + 1, e)
+                    timed_out = True
+                    pages = [""] * (e - s)
+                except Exception as ex:
+                    logger.warning("PDF pages %d-%d failed: %s", s + 1, e, ex)
+                    pages = [""] * (e - s)
+                pool.finished(res, timed_out)
+                yield from pages
+        finally:
+            # stopped early (char cap) or abandoned: don't keep a retired pool alive for these
+            for _, _, res, _ in pending:
+                pool.finished(res)
+
+def _inline_pdf_pages(reader, n_pages: int) -> Iterator[str]:
+    # A page can't be interrupted in-thread; stop at the first boundary past the budget
+    deadline = time.monotonic() + PDF_PAGE_TIMEOUT * n_pages
+    for i in range(n_pages):
+        if time.monotonic() > deadline:
+            logger.warning("PDF pages %d-%d skipped: over the %.0fs budget", i + 1, n_pages,
+                           PDF_PAGE_TIMEOUT * n_pages)
+            return
+        yield reader.pages[i].extract_text() or ""
+
+def _collect_capped(pages: Iterable[str]) -> list[str]:
+    parts, total = [], 0
+    for text in pages:
+        parts.append(text)
+        total += len(text) + 1
+        if PDF_MAX_CHARS > 0 and total >= PDF_MAX_CHARS:
+            break
+    return parts
+
+def _extract_pdf(f: BinaryIO, path: Optional[str] = None) -> list[str]:
+    reader = _pdf_reader(f)
+    n_pages = len(reader.pages)
+    if PDF_MAX_PAGES > 0:
+        n_pages = min(n_pages, PDF_MAX_PAGES)
+
+    # Small documents, or inside a process-pool worker (which can't have children)
+    if n_pages < PDF_PARALLEL_MIN_PAGES or multiprocessing.current_process().daemon:
+        return _collect_capped(_inline_pdf_pages(reader, n_pages))
+    # Page workers reopen the document: by path when there is one, else from its bytes
+    if path is None:
+        f.seek(0)
+        return _collect_capped(_parallel_pdf_pages(f.read(), n_pages))
+    return _collect_capped(_parallel_pdf_pages(path, n_pages))
+
+
+def _extract_stream(f: BinaryIO, mime_type: Optional[str], path: Optional[str] = None) -> str:
+    kind = detect_file_type(f)
+    if kind == "pdf":
+        pages = _extract_pdf(f, path)
+    elif kind == "docx":
+        pages = [_docx_text(f)]
     else:
-        raise ValueError(f"Unsupported file type: {mime_type}, path: {file_path}")
+        raise UnsupportedFileType(f"Unsupported file type (expected PDF or DOCX): {mime_type or path or 'upload'}")
+    with span("compact"):
+        text = compact_resume_pages(pages)
+    with span("clean"):
+        return clean_extracted_text(text), text
+
+def _extract_text_sync(source: Source, mime_type: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Blocking part of extract_text: read the PDF/DOCX, drop prompt-irrelevant lines and clean it.
+    Returns (cleaned text, compacted text with its line breaks).
+    The type comes from the file's magic bytes; mime_type is only used in error messages.
+    """
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return _extract_stream(f, mime_type, source)
+    if isinstance(source, (bytes, bytearray)):
+        return _extract_stream(BytesIO(bytes(source)), mime_type)
+    return _extract_stream(source, mime_type)
 
-    return clean_extracted_text(text)
+
+def _is_pdf(source: Source) -> bool:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return detect_file_type(f) == "pdf"
+    if isinstance(source, (bytes, bytearray)):
+        return detect_file_type(BytesIO(bytes(source[:1024]))) == "pdf"
+    return detect_file_type(source) == "pdf"
+
+
+async def extract_text(source: Source, mime_type: Optional[str] = None) -> str:
+    """
+    Extract raw text from a PDF or DOCX (path, bytes or binary file object) and clean it.
+    Runs on the extraction pool so large files don't stall the event loop.
+    """
+    text, _ = await extract_text_with_layout(source, mime_type)
+    return text
+
+
+async def extract_text_with_layout(source: Source, mime_type: Optional[str] = None) -> Tuple[str, str]:
+    """
+    extract_text plus the text before cleaning, line breaks intact: cleaning joins every
+    line, and local extraction needs whole lines to tell section headers from prose.
+    """
+    executor = _get_executor()
+    if isinstance(executor, ProcessPoolExecutor):
+        if await asyncio.to_thread(_is_pdf, source):
+            # long PDFs fan out to the page pool (with timeouts); drive it from a thread
+            executor = _get_thread_executor()
+        elif not isinstance(source, (str, bytes)):
+            # file objects don't cross process boundaries
+            source.seek(0)
+            source = await asyncio.to_thread(source.read)
+    loop = asyncio.get_running_loop()
+    fn = _extract_text_sync
+    if not isinstance(executor, ProcessPoolExecutor):
+        # run in the caller's context so the worker's spans land in this request's timings
+        fn = functools.partial(contextvars.copy_context().run, _extract_text_sync)
+    with span("extract"):
+        return await loop.run_in_executor(executor, fn, source, mime_type)
@@ -0,0 +1,125 @@
+# utils/text_normalizer.py
+"""
+Shared normalizer for noisy PDF/DOCX text (spaced-out letters, split phone numbers,
+"C G P A : 8 . 6 / 1 0", "A u g 2 0 2 0").
+
+All patterns are compiled once at import. Rewrites that can't interfere with each other
+are fused into a single alternation and applied in one scan, so clean_extracted_text
+does five linear passes instead of ten.
+"""
+import re
+
+# "C G P A" -> "CGPA" (runs of single letters separated by one whitespace char).
+# Same as r"\b(?:[A-Za-z]\s){2,}[A-Za-z]\b", but starting with a character class lets
+# the regex engine skip non-letters instead of trying every position.
+_CHAR_RUN_RE = re.compile(r"[A-Za-z](?<!\w[A-Za-z])(?:\s[A-Za-z]){2,}\b")
+
+# Fused pass: a digit-by-digit number ("8 0 7 4 1 5 8 9 8 5"), or a CGPA/GPA token with an
+# optional "x/y" value. The leading class is what the engine scans for; the lookbehinds
+# pick the branch for the character just consumed.
+_GPA_VALUE = r"(?:\s*[:\-\s]*([0-9\s\.]+/[0-9\s\.]+))?"
+_GPA_OR_DIGITS_RE = re.compile(
+    r"[\dCcGg](?:"
+    r"(?<=\d)((?:\s+\d){5,})"                       # 1: rest of the digit run
+    r"|(?<=[Cc])\s*[Gg]\s*[Pp]\s*[Aa]" + _GPA_VALUE +  # 2: CGPA value
+    r"|(?<=[Gg])\s*[Pp]\s*[Aa]" + _GPA_VALUE +          # 3: GPA value
+    r")"
+)
+
+# Fused pass: a word glued to a year ("Aug2020"), or a whitespace run.
+# The possessive form avoids backtracking through every letter of every word; it matches
+# exactly what the plain form does (a shorter letter run is always followed by a letter).
+try:
+    _DATE_OR_SPACE_RE = re.compile(r"([A-Za-z]{3,9}+)\s*+([0-9]{4})|\s{2,}")
+except re.error:   # Python < 3.11
+    _DATE_OR_SPACE_RE = re.compile(r"([A-Za-z]{3,9})\s*([0-9]{4})|\s{2,}")
+
+# Single-line helpers used by normalize_gpa_line / normalize_dates
+_WS_RE         = re.compile(r"\s+")
+_GPA_TOKEN_RE  = re.compile(r"(C\s*)?G\s*P\s*A", re.I)
+_DIGIT_RUN_RE  = re.compile(r"(?:\d\s+){5,}\d")
+_GPA_VALUE_RE  = re.compile(r"\b(CGPA|GPA)\b\s*[:\-\s]*([0-9\s\.]+/[0-9\s\.]+)", re.I)
+_DATE_RE       = re.compile(r"([A-Za-z]{3,9})\s*([0-9]{4})")
+
+
+def _drop_spaces(m: re.Match) -> str:
+    return m.group(0).replace(" ", "")
+
+def _gpa_token(m: re.Match) -> str:
+    return "CGPA" if m.group(1) is not None else "GPA"
+
+def _gpa_or_digits(m: re.Match) -> str:
+    if m.group(1) is not None:
+        return m.group(0).replace(" ", "")
+    token = "CGPA" if m.group(0)[0] in "Cc" else "GPA"
+    value = m.group(2) if m.group(2) is not None else m.group(3)
+    if value is None:
+        return token
+    return f"{token}: {value.replace(' ', '')}"
+
+
+def merge_lines(text: str) -> list[str]:
+    """
+    Non-empty lines of text, stripped and without bullets; runs of single-character lines
+    (vertical text) are glued into one line.
+    """
+    merged_lines, buffer = [], []
+    for line in (text or "").splitlines():
+        stripped = line.strip().replace("•", "").replace("●", "")
+        if not stripped:
+            continue
+        if len(stripped) == 1:
+            buffer.append(stripped)
+        else:
+            if buffer:
+                merged_lines.append("".join(buffer))
+                buffer = []
+            merged_lines.append(stripped)
+    if buffer:
+        merged_lines.append("".join(buffer))
+    return merged_lines
+
+
+def clean_extracted_text(text: str) -> str:
+    """
+    Clean up noisy text from PDF/DOCX extraction.
+    Fixes CGPA/GPA, phone numbers, dates, and collapses vertical character-by-character sequences.
+    """
+    if not text:
+        return ""
+
+    # Collapse sequences like "C G P A" into "CGPA"
+    text = _CHAR_RUN_RE.sub(_drop_spaces, text)
+
+    # Merge lines; runs of single-character lines (vertical text) are glued together
+    text = " ".join(merge_lines(text))
+
+    # Phone numbers with spaces ("8 0 7 4 1 5 8 9 8 5") and CGPA/GPA tokens + values in one scan
+    text = _GPA_OR_DIGITS_RE.sub(_gpa_or_digits, text)
+
+    # Dates like "Aug2020" -> "Aug 2020" and whitespace collapse in one scan
+    # (unmatched groups expand to "", so the whitespace branch becomes a single space)
+    text = _DATE_OR_SPACE_RE.sub(r"\1 \2", text).strip()
+
+    return _CHAR_RUN_RE.sub(_drop_spaces, text)
+
+
+def normalize_gpa_line(s: str) -> str:
+    """
+    Normalize CGPA/GPA tokens and values, fixing patterns like:
+    'C G P A : 8 . 6 / 1 0' -> 'CGPA: 8.6/10'
+    Also removes stray bullets/dots and shrinks whitespace.
+    """
+    if not s:
+        return s
+    s2 = _WS_RE.sub(" ", s.replace("•", " ").replace("●", " ")).strip()
+    s2 = _GPA_TOKEN_RE.sub(_gpa_token, s2)
+    s2 = _DIGIT_RUN_RE.sub(_drop_spaces, s2)
+    return _GPA_VALUE_RE.sub(lambda m: f"{m.group(1).upper()}: {m.group(2).replace(' ', '')}", s2)
+
+
+def normalize_dates(s: str) -> str:
+    """
+    'A u g 2 0 2 0' style dates -> 'Aug 2020' (separates a word from a glued 4-digit year).
+    """
+    return _DATE_RE.sub(r"\1 \2", s)
@@ -0,0 +1,88 @@
+# utils/uploads.py
+"""
+Resume upload limits.
+
+Starlette parses the whole multipart body before an endpoint runs, spooling each file in
+memory up to 1 MB and on disk past that. So the size limit has to be applied while the body
+is being received: UploadLimitMiddleware rejects an oversize Content-Length up front and
+aborts with 413 as soon as a chunked/unannounced body goes over, before the rest is read.
+Endpoints then read the spooled upload in place (no copy, no temp file of our own).
+"""
+import os, time, asyncio
+from typing import BinaryIO, Iterable
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+
+from .text_extractor import detect_file_type
+from .metrics import span, record
+
+UPLOAD_MAX_BYTES  = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+# Room for the other form fields (jd_text, prompt) and multipart framing on top of the file
+UPLOAD_FORM_SLACK = int(os.getenv("UPLOAD_FORM_SLACK", str(1024 * 1024)))
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes.")
+
+
+class UploadLimitMiddleware:
+    """
+    Cap request bodies on the given path prefixes at max_bytes.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = UPLOAD_MAX_BYTES + UPLOAD_FORM_SLACK):
+        self.app = app
+        self.paths = tuple(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(scope["path"] == p for p in self.paths):
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    response = JSONResponse({"detail": f"Upload exceeds {self.max_bytes} bytes."}, status_code=413)
+                    return await response(scope, receive, send)
+
+        received = 0
+        started = time.perf_counter()
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # raised inside form parsing: Starlette closes the spooled files and
+                    # FastAPI passes HTTPException through as the response
+                    raise _too_large(self.max_bytes)
+                if not message.get("more_body", False):
+                    # receiving + spooling the body, which happens before the endpoint runs
+                    record("upload", time.perf_counter() - started)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def open_upload(upload: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> BinaryIO:
+    """
+    The upload's spooled file, rewound, after checking its size and that it really is a
+    PDF or DOCX (by magic bytes; the client's content type and filename aren't trusted).
+    """
+    with span("upload_check"):
+        f = upload.file
+        size = upload.size
+        if size is None:
+            size = await asyncio.to_thread(lambda: f.seek(0, os.SEEK_END))
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+        if await asyncio.to_thread(detect_file_type, f) is None:
+            raise HTTPException(status_code=415, detail="Unsupported file type: upload a PDF or DOCX.")
+        return f
@@ -0,0 +1,40 @@
+import os, sys, json, asyncio, argparse
+
+# Pre-populate the Tectonic cache (bundle files + LaTeX format) for offline PDF output.
+#   python warm_tex.py                          # default bundle, needs network once
+#   python warm_tex.py --bundle /opt/tex/bundle.zip
+# Then run the API with TECTONIC_OFFLINE=1 (and the same TECTONIC_BUNDLE, if any).
+
+SAMPLE_RESUME = {
+    "name": "Warm Up", "email": "warm@example.com", "phone": "000", "linkedin": "linkedin.com/in/x",
+    "github": "github.com/x", "location": "Nowhere",
+    "skills": ["Python", "Docker", "SQL"],
+    "experience": [{"title": "Engineer", "company": "Acme", "dates": "2020 - 2022", "location": "Remote",
+                    "bullets": ["Shipped things"]}],
+    "education": [{"school": "University", "degree": "B.Sc", "dates": "2016 - 2020", "details": ["GPA: 3.9/4"]}],
+    "projects": [{"name": "Project", "dates": "2021", "description": "Demo", "bullets": ["Built it"]}],
+    "certifications": [{"name": "Cert", "authority": "Org"}],
+}
+
+def main():
+    ap = argparse.ArgumentParser(description="Warm the Tectonic cache used for PDF output.")
+    ap.add_argument("--bundle", help="Local bundle path or URL (sets TECTONIC_BUNDLE)")
+    args = ap.parse_args()
+    if args.bundle:
+        os.environ["TECTONIC_BUNDLE"] = args.bundle
+
+    # imported after TECTONIC_BUNDLE is set; tunables are read at import
+    from services.formatter_overleaf_modern import build_context
+    from services.latex_renderer import _render_template
+    from services.tex_compiler import tex_compiler
+
+    tex = _render_template("resume_modern.tex.j2", build_context(SAMPLE_RESUME, {}))
+    result = asyncio.run(tex_compiler.warm(tex))
+    print(json.dumps(result, indent=2))
+    if not result.get("ok"):
+        print("❌ Warm-up failed")
+        sys.exit(1)
+    print("✅ Tectonic cache warmed; set TECTONIC_OFFLINE=1 to compile without network access.")
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import React, { useRef, useState } from "react";
 import Chat from "./components/Chat.jsx";
 import Preview from "./components/Preview.jsx";
 import TemplateSwitcher from "./components/TemplateSwitcher.jsx";
-import { parseResume } from "./api.js";
+import { parseResumeStream } from "./api.js";
 import { useReactToPrint } from "react-to-print";
 
 export default function App() {
@@ -34,7 +34,19 @@ export default function App() {
     addMessage({ role: "assistant", content: "Parsing & tailoring…", meta: { tips: "Switch templates on the right." } });
 
     try {
-      const json = await parseResume({ resumeFile: files.resumeFile, jdText, prompt });
+      // Render fields progressively as the server streams them
+      const partial = { resume: {}, job: {} };
+      const json = await parseResumeStream(
+        { resumeFile: files.resumeFile, jdText, prompt },
+        {
+          onEvent: (ev) => {
+            if (ev.event === "resume_field") partial.resume[ev.key] = ev.value;
+            else if (ev.event === "job") partial.job = ev.data || {};
+            else return;
+            setResumeData(normalizeData(partial));
+          },
+        }
+      );
       const merged = normalizeData(json);
       setResumeData(merged);
 
@@ -48,3 +48,70 @@ export async function parseResume({ resumeFile, jdText, prompt }, { timeout = 60
 }
 
 export const formatResume = parseResume;
+
+// Streaming variant: POST /api/parse/stream and call onEvent for every NDJSON event
+// ("text", "job", "resume_field", "done", "error", "ping"). Resolves with the "done" payload.
+// The timeout only fires if the server goes silent; keep-alive pings reset it.
+export async function parseResumeStream({ resumeFile, jdText, prompt }, { onEvent, idleTimeout = 60000 } = {}) {
+  const fd = new FormData();
+  if (resumeFile) fd.append("resume", resumeFile);
+  if (jdText) fd.append("jd_text", jdText);
+  if (prompt) fd.append("prompt", prompt);
+
+  const ctrl = new AbortController();
+  let timer = setTimeout(() => ctrl.abort(new Error("Request timeout")), idleTimeout);
+  const touch = () => {
+    clearTimeout(timer);
+    timer = setTimeout(() => ctrl.abort(new Error("Request timeout")), idleTimeout);
+  };
+
+  let res;
+  try {
+    res = await fetch("/api/parse/stream", { method: "POST", body: fd, signal: ctrl.signal });
+  } catch (err) {
+    clearTimeout(timer);
+    throw new Error(`Network error: ${err.message}`);
+  }
+
+  if (!res.ok || !res.body) {
+    clearTimeout(timer);
+    let msg = `parse failed (${res.status})`;
+    try {
+      const errJson = await res.json();
+      msg = errJson.detail || msg;
+    } catch {
+      // keep default message
+    }
+    throw new Error(msg);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let done = null;
+  let error = null;
+
+  try {
+    for (;;) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      touch();
+      buffer += decoder.decode(value, { stream: true });
+      let nl;
+      while ((nl = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, nl).trim();
+        buffer = buffer.slice(nl + 1);
+        if (!line) continue;
+        const event = JSON.parse(line);
+        if (event.event === "done") done = event;
+        if (event.event === "error" && !error) error = event;
+        if (onEvent) onEvent(event);
+      }
+    }
+  } finally {
+    clearTimeout(timer);
+  }
+
+  if (!done) throw new Error(error?.detail || "Stream ended before parsing finished");
+  return done;
+}